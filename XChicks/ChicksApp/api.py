@@ -0,0 +1,240 @@
+"""JSON API (v1) for the sales-agent mobile clients.
+
+Listings take ``?fields=a,b`` (projected straight into ``.values()``), keyset cursors (``after``/
+``before``/``per_page`` as in the HTML pages) and answer ``If-None-Match`` with 304 before touching the
+listing: the ETag comes from the DataVersion counters of the tables behind the resource.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_http_methods
+
+from .models import ChickRequest, Customer, FeedAllocation
+from .pagination import keyset_paginate
+from .search import search_filter
+from .stock_levels import chick_levels
+from .versions import version_key
+
+
+def api_role_required(role):
+    """Like ``views.role_required`` but answers with JSON 401/403 instead of redirecting to the login page."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return api_error('Authentication required.', status=401)
+            if getattr(request.user, 'role', None) != role:
+                return api_error('Not allowed for this account.', status=403)
+            return view_func(request, *args, **kwargs)
+        return _wrapped
+    return decorator
+
+
+def api_error(message, status=400, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+
+def api_response(payload, status=200, etag=None):
+    response = JsonResponse(payload, status=status, encoder=DjangoJSONEncoder,
+                            json_dumps_params={'separators': (',', ':')})
+    if etag:
+        response['ETag'] = etag
+        # Clients may keep the body but must revalidate before reusing it
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def resource_etag(request, models):
+    """Weak ETag for ``request`` given the versions of ``models``; changes whenever one of them is written."""
+    params = sorted(request.GET.lists())
+    raw = f'{version_key(models)}|{request.user.pk}|{request.path}|{params}'
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:32]}"'
+
+
+def not_modified(request, etag):
+    """A 304 response if the client's ``If-None-Match`` matches ``etag``, else ``None``."""
+    wanted = parse_etags(request.headers.get('If-None-Match', ''))
+    # gzip turns strong ETags weak, so compare ignoring the W/ prefix
+    if '*' in wanted or etag.removeprefix('W/') in {e.removeprefix('W/') for e in wanted}:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    return None
+
+
+# Public field name -> ORM lookup, per resource. The first entries are the default projection.
+CHICK_REQUEST_FIELDS = {
+    'id': 'id',
+    'chick_request_id': 'chick_request_id',
+    'farmer': 'farmer_id',
+    'farmer_name': 'farmer__farmer_name',
+    'chick_type': 'chick_type',
+    'chick_breed': 'chick_breed',
+    'quantity': 'quantity',
+    'status': 'status',
+    'request_date': 'request_date',
+    'delivered': 'delivered',
+    'approved_on': 'approved_on',
+    'farmer_type': 'farmer_type',
+    'feed_taken': 'feed_taken',
+    'feed_name': 'feed_name',
+    'payment_terms': 'payment_terms',
+    'received_through': 'received_through',
+}
+FEED_REQUEST_FIELDS = {
+    'id': 'id',
+    'feed_request_id': 'feed_request_id',
+    'chick_request_id': 'chick_request__chick_request_id',
+    'farmer_name': 'chick_request__farmer__farmer_name',
+    'feed_name': 'feed_name',
+    'bags_allocated': 'bags_allocated',
+    'amount_due': 'amount_due',
+    'status': 'status',
+    'payment_status': 'payment_status',
+    'delivered': 'delivered',
+    'feed_type': 'feed_type',
+    'feed_brand': 'feed_brand',
+    'payment_due_date': 'payment_due_date',
+}
+FARMER_FIELDS = {
+    'id': 'id',
+    'farmer_id': 'farmer_id',
+    'farmer_name': 'farmer_name',
+    'phone_number': 'phone_number',
+    'location': 'location',
+    'registration_date': 'registration_date',
+    'gender': 'gender',
+    'age': 'age',
+    'date_of_birth': 'date_of_birth',
+    'nin': 'nin',
+}
+DEFAULT_FIELD_COUNT = 9
+
+
+def _listing(request, qs, field_map, keys, models):
+    """ETag check, ``?fields=`` projection and keyset page for one listing resource."""
+    etag = resource_etag(request, models)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    requested = [f for f in request.GET.get('fields', '').split(',') if f]
+    unknown = [f for f in requested if f not in field_map]
+    if unknown:
+        return api_error(f"Unknown field(s): {', '.join(unknown)}.", allowed=list(field_map))
+    fields = requested or list(field_map)[:DEFAULT_FIELD_COUNT]
+    # The cursor needs the key columns even when the client did not ask for them
+    lookups = list(dict.fromkeys([field_map[f] for f in fields] + list(keys)))
+    page = keyset_paginate(request, qs.values(*lookups), keys)
+    results = [{f: row[field_map[f]] for f in fields} for row in page]
+    return api_response({
+        'results': results,
+        'next': request.path + page.next_query if page.has_next else None,
+        'previous': request.path + page.prev_query if page.has_previous else None,
+    }, etag=etag)
+
+
+@require_GET
+@gzip_page
+@api_role_required('sales_agent')
+def chick_requests(request):
+    qs = ChickRequest.objects.filter(created_by=request.user)
+    if request.GET.get('status'):
+        qs = qs.filter(status=request.GET['status'])
+    return _listing(request, qs, CHICK_REQUEST_FIELDS, ('request_date', 'id'), ['chickrequest', 'customer'])
+
+
+@require_GET
+@gzip_page
+@api_role_required('sales_agent')
+def feed_requests(request):
+    qs = FeedAllocation.objects.filter(chick_request__created_by=request.user)
+    if request.GET.get('status'):
+        qs = qs.filter(status=request.GET['status'])
+    return _listing(request, qs, FEED_REQUEST_FIELDS, ('id',), ['feedallocation', 'chickrequest', 'customer'])
+
+
+@require_GET
+@gzip_page
+@api_role_required('sales_agent')
+def farmers(request):
+    qs = Customer.objects.filter(Q(sales_agent=request.user) | Q(registered_by=request.user.username))
+    if request.GET.get('q', '').strip():
+        qs = search_filter(qs, 'farmer', request.GET['q'])
+    return _listing(request, qs, FARMER_FIELDS, ('registration_date', 'id'), ['customer'])
+
+
+@require_http_methods(['GET', 'POST'])
+@gzip_page
+@api_role_required('sales_agent')
+def chick_request_form(request):
+    """GET: what the new-request form needs (stock per type/breed, the agent's approved feeds).
+    POST: create a chick request from a JSON body with the AddChickRequest form fields."""
+    if request.method == 'POST':
+        return _create_chick_request(request)
+    etag = resource_etag(request, ['chickstock', 'feedallocation'])
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    approved_feeds = FeedAllocation.objects.filter(
+        chick_request__created_by=request.user, status='approved',
+    ).order_by('-id').values('id', 'feed_request_id', 'feed_name')
+    return api_response({'stock': chick_levels(), 'approved_feeds': list(approved_feeds)}, etag=etag)
+
+
+def _create_chick_request(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return api_error('Body must be JSON.')
+    if not isinstance(data, dict):
+        return api_error('Body must be a JSON object.')
+    try:
+        farmer = Customer.objects.filter(pk=int(data.get('farmer'))).first()
+    except (TypeError, ValueError):
+        farmer = None
+    if farmer is None:
+        return api_error('Unknown farmer.', errors={'farmer': ['Unknown farmer.']})
+    try:
+        quantity = int(data.get('quantity', 0))
+    except (TypeError, ValueError):
+        return api_error('Quantity must be a number.', errors={'quantity': ['Enter a whole number.']})
+    feed_taken = data.get('feed_taken', False)
+    if not isinstance(feed_taken, bool):
+        # bool() would read "false" or "no" as True
+        return api_error('feed_taken must be true or false.', errors={'feed_taken': ['Enter a JSON boolean.']})
+    farmer_type = data.get('farmer_type')
+    # Same limits as AddChickRequest
+    if farmer_type == 'starter' and quantity > 100:
+        return api_error('Starter farmers cannot request more than 100 chicks.')
+    if farmer_type == 'returning' and quantity > 500:
+        return api_error('Returning farmers cannot request more than 500 chicks.')
+    chick_request = ChickRequest(
+        farmer=farmer,
+        farmer_type=farmer_type,
+        chick_type=data.get('chick_type'),
+        chick_breed=data.get('chick_breed'),
+        quantity=quantity,
+        chick_period=1,
+        feed_taken=feed_taken,
+        feed_name=data.get('feed_name') or None,
+        payment_terms=data.get('payment_terms'),
+        received_through=data.get('received_through'),
+        created_by=request.user,
+    )
+    try:
+        chick_request.full_clean()
+    except ValidationError as e:
+        return api_error('Invalid chick request.', errors=e.message_dict)
+    with transaction.atomic():
+        chick_request.save()
+    row = ChickRequest.objects.filter(pk=chick_request.pk).values(*CHICK_REQUEST_FIELDS.values()).get()
+    return api_response({f: row[lookup] for f, lookup in CHICK_REQUEST_FIELDS.items()}, status=201)
@@ -0,0 +1,136 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import dashboard, live, rollups, stock_levels
+from .ledger import current_chick_price, record_chick_sales, record_feed_sale
+from .models import ChickRequest, FeedAllocation, StockLevel
+from .stock_levels import StockConflict, retry_on_conflict
+from .versions import bump_version
+
+
+def approve_chick_requests(request_ids):
+    """Approve many chick requests in one transaction, deducting stock per (type, breed).
+
+    Requests are filled oldest first; a request that the remaining stock of its group cannot
+    cover is skipped, and later (smaller) requests in the group may still be filled.
+    Returns ``(approved, failures)`` where ``approved`` is a list of requests and ``failures``
+    maps request pk to a reason for every id that was not approved.
+
+    No rows are locked: stock and request status change through conditional UPDATEs, and a lost
+    race (another manager approving the same requests or drawing the same stock) retries the whole
+    batch against fresh data.
+    """
+    ids = {int(i) for i in request_ids}
+    try:
+        return retry_on_conflict(lambda: _approve_chick_requests(ids))
+    except StockConflict:
+        return [], {pk: 'Stock changed while approving; please try again.' for pk in ids}
+
+
+def _approve_chick_requests(ids):
+    failures = {}
+    with transaction.atomic():
+        reqs = list(ChickRequest.objects.filter(id__in=ids).order_by('request_date', 'id'))
+        for missing in ids - {r.pk for r in reqs}:
+            failures[missing] = 'Request not found.'
+        pending = []
+        for r in reqs:
+            if r.status == 'pending':
+                pending.append(r)
+            else:
+                failures[r.pk] = f'Request is {r.status}, not pending.'
+        if not pending:
+            return [], failures
+
+        # Plan against the current levels, then take each group's total in one conditional UPDATE
+        groups = {(r.chick_type, r.chick_breed) for r in pending}
+        match = Q()
+        for chick_type, chick_breed in groups:
+            match |= Q(chick_type=chick_type, chick_breed=chick_breed)
+        available = {g: 0 for g in groups}
+        available.update({
+            (t, b): q for t, b, q in StockLevel.objects.filter(match).values_list('chick_type', 'chick_breed', 'quantity')
+        })
+
+        approved, totals, now = [], {}, timezone.now()
+        counts = dashboard.CONTRIBUTIONS[ChickRequest]
+        delta, rollup_delta = {}, {}
+        for r in pending:
+            group = (r.chick_type, r.chick_breed)
+            needed = int(r.quantity or 0)
+            if available[group] < needed:
+                failures[r.pk] = f'Insufficient stock: {available[group]} {r.chick_type}/{r.chick_breed} left, {needed} requested.'
+                continue
+            available[group] -= needed
+            totals[group] = totals.get(group, 0) + needed
+            before, rollup_before = counts(r), rollups.contribution(r)
+            r.status, r.approved_on = 'approved', now
+            for k, v in dashboard.diff_counts(before, counts(r)).items():
+                delta[k] = delta.get(k, 0) + v
+            rollups.add_rows(rollup_delta, rollups.diff_rows(rollup_before, rollups.contribution(r)))
+            approved.append(r)
+        if not approved:
+            return [], failures
+
+        # Claim the requests; fewer rows than expected means someone else approved or rejected one
+        claimed = ChickRequest.objects.filter(pk__in=[r.pk for r in approved], status='pending').update(
+            status='approved', approved_on=now,
+        )
+        if claimed != len(approved):
+            raise StockConflict('Chick requests changed during approval.')
+        # Price the sale before drawing on the batches
+        prices = {g: current_chick_price(*g) for g in totals}
+        for (chick_type, chick_breed), total in totals.items():
+            if not stock_levels.reserve_chicks(chick_type, chick_breed, total):
+                raise StockConflict(f'{chick_type}/{chick_breed} stock level changed during approval.')
+            stock_levels.take_from_batches(chick_type, chick_breed, total)
+
+        record_chick_sales(approved, prices)
+        # Conditional UPDATEs skip model signals; keep the dashboard, rollups and cache versions in
+        # step (the stock level rows were decremented by the reservation itself)
+        delta['chick_stock'] = -sum(totals.values())
+        dashboard.apply_delta(delta)
+        rollups.adjust(ChickRequest, rollup_delta)
+        bump_version('chickstock')
+        bump_version('chickrequest')
+        live.publish('status', {'kind': 'chick', 'ids': [r.pk for r in approved], 'status': 'approved'})
+    return approved, failures
+
+
+def approve_feed_allocation(allocation_id):
+    """Approve one pending feed allocation, taking its bags off the linked feed lot.
+
+    Returns ``(allocation, error)``; ``error`` is ``None`` on success. Like chick approvals this
+    takes no locks: the status change and the stock decrement are both conditional UPDATEs.
+    """
+    def attempt():
+        with transaction.atomic():
+            alloc = FeedAllocation.objects.select_related('feed_stock', 'chick_request').filter(pk=allocation_id).first()
+            if alloc is None:
+                return None, 'Feed request not found.'
+            if alloc.status != 'pending':
+                return alloc, f'Feed request is {alloc.status}, not pending.'
+            stock, bags = alloc.feed_stock, int(alloc.bags_allocated or 0)
+            if stock is None or not stock_levels.reserve_feed(stock, bags):
+                return alloc, 'Insufficient stock to approve this request.'
+            before, rollup_before = dashboard.CONTRIBUTIONS[FeedAllocation](alloc), rollups.contribution(alloc)
+            # Claim it; no row means someone else approved or rejected it meanwhile
+            if not FeedAllocation.objects.filter(pk=alloc.pk, status='pending').update(status='approved'):
+                raise StockConflict('Feed request changed during approval.')
+            alloc.status = 'approved'
+            # Conditional UPDATEs skip model signals; keep the dashboard, rollups and cache versions in step
+            delta = dashboard.diff_counts(before, dashboard.CONTRIBUTIONS[FeedAllocation](alloc))
+            delta['feed_stock'] = -bags
+            dashboard.apply_delta(delta)
+            rollups.adjust(FeedAllocation, rollups.diff_rows(rollup_before, rollups.contribution(alloc)))
+            record_feed_sale(alloc)
+            bump_version('feedstock')
+            bump_version('feedallocation')
+            live.publish('status', {'kind': 'feed', 'ids': [alloc.pk], 'status': 'approved'})
+            return alloc, None
+
+    try:
+        return retry_on_conflict(attempt)
+    except StockConflict:
+        return None, 'Feed request changed while approving; please try again.'
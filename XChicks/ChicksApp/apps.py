@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class ChicksappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ChicksApp'
+
+    def ready(self):
+        # Register model signal handlers (dashboard counters etc.)
+        from . import signals  # noqa: F401
+        # WAL, busy timeout and cache pragmas for SQLite connections (sqlite_tuning.py)
+        from django.db.backends.signals import connection_created
+        from .sqlite_tuning import configure_connection
+        connection_created.connect(configure_connection, dispatch_uid='sqlite_tuning')
+        # Per-request query counts for QueryInstrumentationMiddleware, whichever thread runs the query
+        from .middleware import install_recorder
+        connection_created.connect(install_recorder, dispatch_uid='query_instrumentation')
@@ -0,0 +1,151 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from . import live
+from .models import (
+    ChickRequest, ChickStock, DashboardSnapshot, FeedAllocation, FeedStock, SaleLine, UserProfile,
+)
+
+SNAPSHOT_PK = 1
+
+
+# What a single row adds to the counters. Deltas on save are new - old.
+def _chick_request_counts(r):
+    counts = {}
+    if r.status in ('pending', 'approved', 'rejected'):
+        counts[f'chick_{r.status}'] = 1
+    if r.delivered:
+        counts['chick_delivered'] = 1
+    elif r.status == 'approved':
+        counts['chick_awaiting_delivery'] = 1
+    return counts
+
+
+def _feed_allocation_counts(a):
+    counts = {}
+    if a.status in ('pending', 'approved', 'rejected'):
+        counts[f'feed_{a.status}'] = 1
+    if a.delivered:
+        counts['feed_delivered'] = 1
+    elif a.status == 'approved':
+        counts['feed_awaiting_delivery'] = 1
+    if a.payment_status == 'paid':
+        counts['payments_paid'] = 1
+    elif a.payment_status == 'pending':
+        counts['payments_pending'] = 1
+    return counts
+
+
+CONTRIBUTIONS = {
+    UserProfile: lambda u: {'total_users': 1},
+    # Views assign raw POST strings to the quantities before saving
+    ChickStock: lambda s: {'chick_stock': int(s.stock_quantity or 0)},
+    FeedStock: lambda s: {'feed_stock': int(s.feed_quantity or 0)},
+    ChickRequest: _chick_request_counts,
+    FeedAllocation: _feed_allocation_counts,
+    SaleLine: lambda line: {'total_sales': line.amount or 0},
+}
+
+
+def compute_counters():
+    """Recompute every counter from the source tables."""
+    chick_map = dict(ChickRequest.objects.values_list('status').annotate(c=Count('id')))
+    feed_map = dict(FeedAllocation.objects.values_list('status').annotate(c=Count('id')))
+    chick_deliv = ChickRequest.objects.aggregate(
+        n_delivered=Count('id', filter=Q(delivered=True)),
+        n_awaiting=Count('id', filter=Q(status='approved', delivered=False)),
+    )
+    feed_deliv = FeedAllocation.objects.aggregate(
+        n_delivered=Count('id', filter=Q(delivered=True)),
+        n_awaiting=Count('id', filter=Q(status='approved', delivered=False)),
+        n_paid=Count('id', filter=Q(payment_status='paid')),
+        n_pending=Count('id', filter=Q(payment_status='pending')),
+    )
+    return {
+        'total_users': UserProfile.objects.count(),
+        'chick_stock': ChickStock.objects.aggregate(total=Sum('stock_quantity'))['total'] or 0,
+        'feed_stock': FeedStock.objects.aggregate(total=Sum('feed_quantity'))['total'] or 0,
+        'chick_pending': chick_map.get('pending', 0),
+        'chick_approved': chick_map.get('approved', 0),
+        'chick_rejected': chick_map.get('rejected', 0),
+        'feed_pending': feed_map.get('pending', 0),
+        'feed_approved': feed_map.get('approved', 0),
+        'feed_rejected': feed_map.get('rejected', 0),
+        'chick_delivered': chick_deliv['n_delivered'],
+        'feed_delivered': feed_deliv['n_delivered'],
+        'chick_awaiting_delivery': chick_deliv['n_awaiting'],
+        'feed_awaiting_delivery': feed_deliv['n_awaiting'],
+        'farmers_with_feeds': FeedAllocation.objects.values('chick_request__farmer').distinct().count(),
+        'payments_paid': feed_deliv['n_paid'],
+        'payments_pending': feed_deliv['n_pending'],
+        'total_sales': SaleLine.objects.aggregate(total=Sum('amount'))['total'] or 0,
+    }
+
+
+def rebuild_snapshot():
+    """Overwrite the snapshot with freshly computed counters; returns ``(snapshot, drift)``.
+
+    ``drift`` maps counter name to ``(stored, actual)`` for every counter that was off.
+    """
+    actual = compute_counters()
+    snap, created = DashboardSnapshot.objects.get_or_create(pk=SNAPSHOT_PK, defaults=actual)
+    drift = {}
+    if not created:
+        drift = {k: (getattr(snap, k), v) for k, v in actual.items() if getattr(snap, k) != v}
+        for k, v in actual.items():
+            setattr(snap, k, v)
+        snap.save()
+        if drift:
+            live.publish('counters', {k: new - old for k, (old, new) in drift.items()})
+    return snap, drift
+
+
+def get_snapshot():
+    snap = DashboardSnapshot.objects.filter(pk=SNAPSHOT_PK).first()
+    if snap is None:
+        snap, _ = rebuild_snapshot()
+    return snap
+
+
+async def aget_snapshot():
+    snap = await DashboardSnapshot.objects.filter(pk=SNAPSHOT_PK).afirst()
+    if snap is None:
+        snap, _ = await sync_to_async(rebuild_snapshot)()
+    return snap
+
+
+def apply_delta(delta):
+    """Add ``delta`` ({counter: n}) to the snapshot row with a single UPDATE.
+
+    Writes that bypass model signals (``QuerySet.update``/``bulk_update``) must call this themselves.
+    """
+    delta = {k: v for k, v in delta.items() if v}
+    if not delta:
+        return
+    updated = DashboardSnapshot.objects.filter(pk=SNAPSHOT_PK).update(
+        updated_at=timezone.now(), **{k: F(k) + v for k, v in delta.items()}
+    )
+    if not updated:
+        # First write since install: the rebuild already sees the row being saved
+        rebuild_snapshot()
+        return
+    live.publish('counters', delta)
+
+
+def diff_counts(old, new):
+    delta = dict(new)
+    for k, v in old.items():
+        delta[k] = delta.get(k, 0) - v
+    return delta
+
+
+def farmer_has_feeds(farmer_id, exclude_id=None):
+    qs = FeedAllocation.objects.filter(chick_request__farmer_id=farmer_id)
+    if exclude_id:
+        qs = qs.exclude(pk=exclude_id)
+    return qs.exists()
+
+
+def farmer_for_request(chick_request_id):
+    return ChickRequest.objects.filter(pk=chick_request_id).values_list('farmer_id', flat=True).first()
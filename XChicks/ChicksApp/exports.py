@@ -0,0 +1,247 @@
+import csv
+from datetime import datetime
+from itertools import chain
+
+from django.http import StreamingHttpResponse
+
+from .models import ChickRequest, ChickStock, Customer, FeedAllocation, FeedStock
+from .reporting import activity_series, agent_performance, date_range, weekly_summary
+from .search import search_filter
+
+# Rows fetched per DB round trip and lines flushed per response chunk
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    # File-like object for csv.writer that hands each formatted row straight back
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def tsv_lines(rows):
+    for row in rows:
+        yield '\t'.join(str(x) for x in row) + '\n'
+
+
+def chunked(lines, size=EXPORT_CHUNK_SIZE):
+    """Join ``lines`` into chunks of ``size`` lines so the server writes fewer, larger blocks."""
+    buf = []
+    for line in lines:
+        buf.append(line)
+        if len(buf) >= size:
+            yield ''.join(buf)
+            buf = []
+    if buf:
+        yield ''.join(buf)
+
+
+def stream_rows(qs, *fields):
+    """Iterate ``values_list`` tuples from ``qs`` without caching the whole result set."""
+    return qs.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def streaming_attachment(lines, filename, content_type='text/plain'):
+    resp = StreamingHttpResponse(chunked(lines), content_type=content_type)
+    resp['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return resp
+
+
+# --- Report datasets (shared by reports_export and the background export worker) ---
+EXPORT_FILTERS = ('start', 'end', 'status', 'chick_type', 'chick_breed', 'feed_type', 'agent', 'farmer', 'location', 'q')
+
+# Source tables per dataset; their DataVersion counters decide whether a cached file is still valid
+DATASET_MODELS = {
+    'chick_stock': ('chickstock',),
+    'feed_stock': ('feedstock',),
+    'chick_requests': ('chickrequest', 'customer'),
+    'feed_allocations': ('feedallocation', 'chickrequest', 'customer'),
+    'farmers': ('customer',),
+    'agent_performance': ('chickrequest',),
+    'activity_daily': ('chickrequest', 'feedallocation'),
+    'activity_weekly': ('chickrequest', 'feedallocation'),
+    'general': ('chickstock', 'feedstock', 'chickrequest', 'feedallocation', 'customer'),
+}
+
+CHICK_STOCK_HEADER = ['Batch', 'Type', 'Breed', 'Age', 'Price', 'Qty']
+FEED_STOCK_HEADER = ['Stock', 'Feed', 'Type', 'Brand', 'Qty', 'Unit Price']
+CHICK_REQUEST_HEADER = ['Req ID', 'Farmer', 'Type', 'Breed', 'Qty', 'Status', 'Date']
+FEED_ALLOCATION_HEADER = ['Feed ID', 'Req ID', 'Feed', 'Brand', 'Bags', 'Status', 'Payment']
+AGENT_HEADER = ['Agent', 'Requests', 'Approved', 'Rejected', 'Delivered']
+
+
+def export_params(querydict):
+    """Normalized filter dict (only known keys, empty strings dropped) for building and caching exports."""
+    return {k: querydict.get(k) for k in EXPORT_FILTERS if querydict.get(k)}
+
+
+def _parse_date(s):
+    try:
+        return datetime.strptime(s, '%Y-%m-%d').date()
+    except Exception:
+        return None
+
+
+def _datetime_rows(rows):
+    # Last column is a datetime; format it like the on-screen tables
+    for *vals, d in rows:
+        yield [*vals, d.strftime('%Y-%m-%d %H:%M')]
+
+
+def _chick_stock(p):
+    qs = ChickStock.objects.all()
+    if p.get('chick_type'): qs = qs.filter(chick_type=p['chick_type'])
+    if p.get('chick_breed'): qs = qs.filter(chick_breed=p['chick_breed'])
+    return stream_rows(qs.order_by('batch_name'), 'batch_name', 'chick_type', 'chick_breed', 'chick_age', 'chick_price', 'stock_quantity')
+
+
+def _feed_stock(p):
+    qs = FeedStock.objects.all()
+    if p.get('feed_type'): qs = qs.filter(feed_type=p['feed_type'])
+    return stream_rows(qs.order_by('stock_name'), 'stock_name', 'feed_name', 'feed_type', 'feed_brand', 'feed_quantity', 'selling_price')
+
+
+def _chick_requests_qs(p, start, end, location=True):
+    qs = ChickRequest.objects.all()
+    qs = qs.filter(**date_range('request_date', start, end))
+    if p.get('status'): qs = qs.filter(status=p['status'])
+    if p.get('chick_type'): qs = qs.filter(chick_type=p['chick_type'])
+    if p.get('chick_breed'): qs = qs.filter(chick_breed=p['chick_breed'])
+    if p.get('agent'): qs = qs.filter(created_by_id=p['agent'])
+    if p.get('farmer'): qs = qs.filter(farmer_id=p['farmer'])
+    if location and p.get('location'): qs = qs.filter(farmer__location__icontains=p['location'])
+    if p.get('q'): qs = search_filter(qs, 'chick_request', p['q'])
+    return qs
+
+
+def _feed_allocations_qs(p, start, end, location=True):
+    qs = FeedAllocation.objects.all()
+    qs = qs.filter(**date_range('chick_request__request_date', start, end))
+    if p.get('status'): qs = qs.filter(status=p['status'])
+    if p.get('feed_type'): qs = qs.filter(feed_type=p['feed_type'])
+    if p.get('agent'): qs = qs.filter(chick_request__created_by_id=p['agent'])
+    if p.get('farmer'): qs = qs.filter(chick_request__farmer_id=p['farmer'])
+    if location and p.get('location'): qs = qs.filter(chick_request__farmer__location__icontains=p['location'])
+    if p.get('q'): qs = search_filter(qs, 'feed_allocation', p['q'])
+    return qs
+
+
+def _chick_request_rows(qs):
+    return _datetime_rows(stream_rows(
+        qs.order_by('-request_date'),
+        'chick_request_id', 'farmer__farmer_name', 'chick_type', 'chick_breed', 'quantity', 'status', 'request_date',
+    ))
+
+
+def _feed_allocation_rows(qs):
+    return stream_rows(
+        qs.order_by('-id'),
+        'feed_request_id', 'chick_request__chick_request_id', 'feed_name', 'feed_brand', 'bags_allocated', 'status', 'payment_status',
+    )
+
+
+def _agent_rows(chick_qs, feed_qs=None):
+    return [[d['agent'], d['total'], d['approved'], d['rejected'], d['delivered']] for d in agent_performance(chick_qs, feed_qs)]
+
+
+def _date_range(qs, field, start, end):
+    return qs.filter(**date_range(field, start, end))
+
+
+def _activity_querysets(start, end):
+    return (
+        _date_range(ChickRequest.objects.all(), 'request_date', start, end),
+        _date_range(FeedAllocation.objects.all(), 'chick_request__request_date', start, end),
+    )
+
+
+def report_sheets(dataset, params):
+    """Return ``[(title, header, rows)]`` for an export dataset; ``rows`` are lazy where possible.
+
+    Raises ``KeyError`` for an unknown dataset.
+    """
+    start = _parse_date(params.get('start') or '')
+    end = _parse_date(params.get('end') or '')
+    if dataset == 'chick_stock':
+        return [('Report', CHICK_STOCK_HEADER, _chick_stock(params))]
+    if dataset == 'feed_stock':
+        return [('Report', FEED_STOCK_HEADER, _feed_stock(params))]
+    if dataset == 'chick_requests':
+        return [('Report', CHICK_REQUEST_HEADER, _chick_request_rows(_chick_requests_qs(params, start, end)))]
+    if dataset == 'feed_allocations':
+        return [('Report', FEED_ALLOCATION_HEADER, _feed_allocation_rows(_feed_allocations_qs(params, start, end)))]
+    if dataset == 'farmers':
+        qs = _date_range(Customer.objects.all(), 'registration_date', start, end)
+        if params.get('location'): qs = qs.filter(location__icontains=params['location'])
+        if params.get('q'): qs = search_filter(qs, 'farmer', params['q'])
+        rows = _datetime_rows(stream_rows(
+            qs.order_by('-registration_date'),
+            'farmer_id', 'farmer_name', 'gender', 'age', 'phone_number', 'location', 'registration_date',
+        ))
+        return [('Report', ['Farmer ID', 'Name', 'Gender', 'Age', 'Phone', 'Location', 'Registered'], rows)]
+    if dataset == 'agent_performance':
+        qs = _date_range(ChickRequest.objects.all(), 'request_date', start, end)
+        return [('Report', AGENT_HEADER, _agent_rows(qs))]
+    if dataset == 'activity_daily':
+        rows = [[k, v['chicks'], v['feeds']] for k, v in activity_series(*_activity_querysets(start, end)).items()]
+        return [('Report', ['Date', 'Chick Requests', 'Feed Allocations'], rows)]
+    if dataset == 'activity_weekly':
+        rows = [[w['label'], w['chicks'], w['feeds'], w['total']] for w in weekly_summary(*_activity_querysets(start, end))]
+        return [('Report', ['Year-Week', 'Chick Requests', 'Feed Allocations', 'Total'], rows)]
+    if dataset == 'general':
+        # Same filters as the Reports page (location is not applied here)
+        cr = _chick_requests_qs(params, start, end, location=False)
+        fa = _feed_allocations_qs(params, start, end, location=False)
+        agents = _agent_rows(cr, fa)
+        return [
+            ('Chick Stock', CHICK_STOCK_HEADER, _chick_stock(params)),
+            ('Feed Stock', FEED_STOCK_HEADER, _feed_stock(params)),
+            ('Chick Requests', CHICK_REQUEST_HEADER, _chick_request_rows(cr)),
+            ('Feed Allocations', FEED_ALLOCATION_HEADER, _feed_allocation_rows(fa)),
+            ('Agent Performance', AGENT_HEADER, agents),
+        ]
+    raise KeyError(dataset)
+
+
+# --- File writers (run by the export worker) ---
+def write_xlsx(sheets, out, on_row=None):
+    from openpyxl import Workbook
+    # write_only keeps memory flat: rows are flushed to disk as they are appended
+    wb = Workbook(write_only=True)
+    for title, header, rows in sheets:
+        ws = wb.create_sheet(title)
+        ws.append(header)
+        for row in rows:
+            ws.append(list(row))
+            if on_row: on_row()
+    wb.save(out)
+
+
+def write_pdf(sheets, out, on_row=None):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    c = canvas.Canvas(out, pagesize=A4)
+    width, height = A4
+    x0, y = 40, height - 50
+    # Multi-sheet reports get section titles and tighter lines, as in the original general PDF
+    sectioned = len(sheets) > 1
+    step = 14 if sectioned else 16
+    for title, header, rows in sheets:
+        if sectioned:
+            c.setFont('Helvetica-Bold', 12); c.drawString(x0, y, title); y -= 18
+            c.setFont('Helvetica', 10)
+        for row in chain([header], rows):
+            line = '  '.join(str(x) for x in row)
+            c.drawString(x0, y, line[:120]); y -= step
+            if y < 60:
+                c.showPage(); y = height - 50
+            if on_row: on_row()
+    c.save()
+
+
+WRITERS = {'xlsx': write_xlsx, 'pdf': write_pdf}
@@ -0,0 +1,218 @@
+import csv
+import io
+import re
+import uuid
+import zipfile
+from datetime import datetime, date
+
+from django.contrib.auth.hashers import make_password
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from . import dashboard, search
+from .models import Customer, IdSequence, UserProfile
+from .versions import bump_version
+
+# Columns expected in the upload (header row, any order); `agent` is an optional sales agent username
+REQUIRED_COLUMNS = (
+    'farmer_name', 'date_of_birth', 'gender', 'location', 'nin', 'phone_number',
+    'recommender_name', 'recommender_nin', 'recommender_tel',
+)
+OPTIONAL_COLUMNS = ('agent',)
+IMPORT_CHUNK_SIZE = 500
+
+NIN_RE = re.compile(r'^[A-Z0-9]{14}$')
+
+
+class UnreadableFile(Exception):
+    """The upload could not be parsed as CSV/XLSX; nothing was imported."""
+
+
+class ImportInterrupted(Exception):
+    """A database error stopped the import; the chunks before it are saved (``created`` farmers)."""
+
+    def __init__(self, created, rejected, error):
+        super().__init__(f'{error} ({created} farmer(s) were saved before it)')
+        self.created = created
+        self.rejected = rejected
+        self.error = error
+
+
+def load_rows(fileobj, filename):
+    """All rows of the upload (see :func:`read_rows`); parse failures raise :class:`UnreadableFile`."""
+    try:
+        return list(read_rows(fileobj, filename))
+    except (ValueError, KeyError, csv.Error, zipfile.BadZipFile) as e:
+        # UnicodeDecodeError is a ValueError; a non-XLSX file fails as a bad zip or a missing member
+        raise UnreadableFile(str(e) or type(e).__name__) from e
+
+
+def read_rows(fileobj, filename):
+    """Yield dicts keyed by lower-cased header from a CSV or XLSX upload."""
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        ws = load_workbook(fileobj, read_only=True, data_only=True).active
+        rows = ws.iter_rows(values_only=True)
+        header = [str(h or '').strip().lower() for h in next(rows, [])]
+        for values in rows:
+            if any(v not in (None, '') for v in values):
+                yield {h: v for h, v in zip(header, values)}
+        return
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig') if not isinstance(fileobj, io.TextIOBase) else fileobj
+    for row in csv.DictReader(text):
+        yield {(k or '').strip().lower(): v for k, v in row.items()}
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def _age(dob, today):
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+def _check_row(raw, today):
+    """Per-row checks that need no DB access; returns (cleaned, errors). Same rules as RegisterFarmer."""
+    row = {k: _text(raw.get(k)) for k in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+    errors = [f'{k} is required.' for k in REQUIRED_COLUMNS if not row[k]]
+    dob = raw.get('date_of_birth')
+    if isinstance(dob, datetime):
+        dob = dob.date()
+    if not isinstance(dob, date):
+        try:
+            dob = datetime.strptime(row['date_of_birth'], '%Y-%m-%d').date()
+        except ValueError:
+            dob = None
+            if row['date_of_birth']:
+                errors.append('date_of_birth must be YYYY-MM-DD.')
+    if dob:
+        age = _age(dob, today)
+        if age < 20 or age > 30:
+            errors.append('Farmer must be between 20 and 30 years old.')
+        row['date_of_birth'], row['age'] = dob, max(age, 0)
+    row['nin'] = row['nin'].upper()
+    if row['nin'] and not NIN_RE.match(row['nin']):
+        errors.append('NIN must be 14 alphanumeric characters.')
+    if row['gender'] and row['gender'].upper() not in ('M', 'F'):
+        errors.append('Gender must be M or F.')
+    row['gender'] = row['gender'].upper()
+    if row['phone_number'] and len(row['phone_number']) != 10:
+        errors.append('Phone Number must be exactly 10 characters.')
+    if row['recommender_tel'] and len(row['recommender_tel']) != 10:
+        errors.append('Recommender Tel must be exactly 10 characters.')
+    if row['recommender_nin'] and len(row['recommender_nin']) != 14:
+        errors.append('Recommender NIN must be exactly 14 characters.')
+    if len(row['farmer_name']) > 50 or len(row['recommender_name']) > 50:
+        errors.append('Names must be at most 50 characters.')
+    if len(row['location']) > 30:
+        errors.append('Location must be at most 30 characters.')
+    return row, errors
+
+
+def validate_rows(raw_rows):
+    """Validate a whole batch; uniqueness and agent lookups are one query per chunk, not per row.
+
+    Returns ``(valid, rejected)`` where ``valid`` is a list of ``(line_no, cleaned_row)`` and
+    ``rejected`` a list of ``(line_no, raw_row, [errors])``. Line numbers count the header as 1.
+    """
+    today = timezone.now().date()
+    checked = []
+    for line_no, raw in enumerate(raw_rows, start=2):
+        row, errors = _check_row(raw, today)
+        checked.append((line_no, raw, row, errors))
+
+    nins = {row['nin'] for _, _, row, _ in checked if row['nin']}
+    phones = {row['phone_number'] for _, _, row, _ in checked if row['phone_number']}
+    agent_names = {row['agent'] for _, _, row, _ in checked if row['agent']}
+    taken_nins, taken_phones = set(), set()
+    for chunk in _chunks(sorted(nins), IMPORT_CHUNK_SIZE):
+        taken_nins.update(Customer.objects.filter(nin__in=chunk).values_list('nin', flat=True))
+    for chunk in _chunks(sorted(phones), IMPORT_CHUNK_SIZE):
+        taken_phones.update(Customer.objects.filter(phone_number__in=chunk).values_list('phone_number', flat=True))
+    agents = dict(UserProfile.objects.filter(username__in=agent_names, role='sales_agent').values_list('username', 'id'))
+
+    valid, rejected = [], []
+    seen_nins, seen_phones = set(), set()
+    for line_no, raw, row, errors in checked:
+        if row['nin'] in taken_nins:
+            errors.append('A farmer with this NIN already exists.')
+        elif row['nin'] in seen_nins:
+            errors.append('Duplicate NIN in this file.')
+        if row['phone_number'] in taken_phones:
+            errors.append('A farmer with this phone number already exists.')
+        elif row['phone_number'] in seen_phones:
+            errors.append('Duplicate phone number in this file.')
+        if row['agent'] and row['agent'] not in agents:
+            errors.append(f"Unknown sales agent '{row['agent']}'.")
+        if errors:
+            rejected.append((line_no, raw, errors))
+            continue
+        seen_nins.add(row['nin'])
+        seen_phones.add(row['phone_number'])
+        row['agent_id'] = agents.get(row['agent'])
+        valid.append((line_no, row))
+    return valid, rejected
+
+
+def import_farmers(raw_rows, registered_by, default_agent=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Validate and insert farmers in chunks with ``bulk_create``.
+
+    Farmer accounts get an unusable password instead of a per-row hash (farmers do not log in).
+    Returns ``(created_count, rejected)``; ``rejected`` is as in :func:`validate_rows`. A database
+    error raises :class:`ImportInterrupted`; each chunk is its own transaction, so earlier ones stay.
+    """
+    valid, rejected = validate_rows(raw_rows)
+    password = make_password(None)
+    created = 0
+    for chunk in _chunks(valid, chunk_size):
+        try:
+            _insert_chunk(chunk, password, registered_by, default_agent)
+        except DatabaseError as e:
+            raise ImportInterrupted(created, rejected, e) from e
+        created += len(chunk)
+    return created, rejected
+
+
+def _insert_chunk(chunk, password, registered_by, default_agent):
+    with transaction.atomic():
+        users = UserProfile.objects.bulk_create([
+            UserProfile(username=f"farmer_{uuid.uuid4().hex[:8]}", password=password, role='farmer')
+            for _ in chunk
+        ])
+        farmer_ids = IdSequence.allocate('FARMER', len(chunk))
+        customers = Customer.objects.bulk_create([
+            Customer(
+                user=user,
+                farmer_id=farmer_id,
+                farmer_name=row['farmer_name'],
+                date_of_birth=row['date_of_birth'],
+                age=row['age'],
+                gender=row['gender'],
+                location=row['location'],
+                nin=row['nin'],
+                phone_number=row['phone_number'],
+                recommender_name=row['recommender_name'],
+                recommender_nin=row['recommender_nin'],
+                recommender_tel=row['recommender_tel'],
+                registered_by=registered_by,
+                sales_agent_id=row['agent_id'] or getattr(default_agent, 'pk', None),
+            )
+            for user, farmer_id, (_, row) in zip(users, farmer_ids, chunk)
+        ])
+        # bulk_create skips model signals; keep the dashboard, cache versions and search index in step
+        dashboard.apply_delta({'total_users': len(chunk)})
+        search.index_rows('farmer', [c.pk for c in customers])
+        bump_version('customer')
+        bump_version('userprofile')
+
+
+def write_error_report(rejected, out):
+    writer = csv.writer(out)
+    writer.writerow(['line', *REQUIRED_COLUMNS, *OPTIONAL_COLUMNS, 'errors'])
+    for line_no, raw, errors in rejected:
+        writer.writerow([line_no, *(_text(raw.get(k)) for k in REQUIRED_COLUMNS + OPTIONAL_COLUMNS), ' '.join(errors)])
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .exports import DATASET_MODELS, WRITERS, report_sheets
+from .models import ExportJob
+from .versions import version_key
+
+logger = logging.getLogger(__name__)
+
+# Rows between progress writes; keeps the worker from hammering the jobs table
+PROGRESS_EVERY = 1000
+# A running job whose heartbeat is older than this is taken for a crashed or killed worker
+STALE_AFTER = timedelta(minutes=15)
+
+
+def export_root():
+    return getattr(settings, 'EXPORT_ROOT', settings.BASE_DIR / 'exports')
+
+
+def export_signature(dataset, fmt, params):
+    payload = json.dumps({'dataset': dataset, 'format': fmt, 'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def enqueue_export(dataset, fmt, params, user=None):
+    """Return a job for this export, reusing a queued/running/finished one with identical
+    filters while the underlying tables are unchanged."""
+    expire_stale_jobs()
+    signature = export_signature(dataset, fmt, params)
+    data_version = version_key(DATASET_MODELS[dataset])
+    existing = ExportJob.objects.filter(
+        signature=signature, data_version=data_version, status__in=('queued', 'running', 'done'),
+    ).order_by('-created_at').first()
+    if existing and (existing.status != 'done' or os.path.exists(existing.file_path)):
+        return existing
+    return ExportJob.objects.create(
+        dataset=dataset, format=fmt, params=params, signature=signature,
+        data_version=data_version, requested_by=user,
+    )
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running; safe with several workers."""
+    for job in ExportJob.objects.filter(status='queued').order_by('created_at')[:5]:
+        now = timezone.now()
+        claimed = ExportJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running', started_at=now, heartbeat_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def expire_stale_jobs():
+    """Fail running jobs whose worker stopped stamping ``heartbeat_at``; returns how many.
+
+    Without this a crashed run would stay ``running`` and :func:`enqueue_export` would keep handing
+    it out until the data changed.
+    """
+    return ExportJob.objects.filter(status='running', heartbeat_at__lt=timezone.now() - STALE_AFTER).update(
+        status='failed', error='The export worker stopped before finishing.', finished_at=timezone.now(),
+    )
+
+
+def run_job(job):
+    path = os.path.join(export_root(), f'{job.pk}.{job.format}')
+    # Row totals are not known up front (rows are lazy), so the percentage advances per
+    # finished sheet and rows_written is refreshed every PROGRESS_EVERY rows
+    written = 0
+
+    def on_row():
+        nonlocal written
+        written += 1
+        if written % PROGRESS_EVERY == 0:
+            ExportJob.objects.filter(pk=job.pk).update(rows_written=written, heartbeat_at=timezone.now())
+
+    def tracked(index, rows, sheet_count):
+        yield from rows
+        ExportJob.objects.filter(pk=job.pk).update(
+            progress=int(100 * (index + 1) / sheet_count), rows_written=written, heartbeat_at=timezone.now(),
+        )
+
+    try:
+        # Building the sheets runs queries too; a failure there must fail the job, not leave it running
+        sheets = report_sheets(job.dataset, job.params)
+        sheets = [(title, header, tracked(i, rows, len(sheets))) for i, (title, header, rows) in enumerate(sheets)]
+        os.makedirs(export_root(), exist_ok=True)
+        WRITERS[job.format](sheets, path, on_row)
+    except Exception as e:
+        logger.exception('Export job %s failed', job.pk)
+        if os.path.exists(path):
+            os.remove(path)
+        ExportJob.objects.filter(pk=job.pk).update(status='failed', error=str(e), finished_at=timezone.now())
+        return False
+    ExportJob.objects.filter(pk=job.pk).update(
+        status='done', progress=100, rows_written=written, file_path=path, finished_at=timezone.now(),
+    )
+    return True
+
+
+def prune_stale_exports():
+    """Delete files of finished jobs that a newer job with the same signature has replaced."""
+    removed = 0
+    done = ExportJob.objects.filter(status='done').order_by('signature', '-finished_at')
+    seen = set()
+    for job in done.iterator():
+        if job.signature in seen:
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+            ExportJob.objects.filter(pk=job.pk).update(file_path='')
+            removed += 1
+        seen.add(job.signature)
+    return removed
@@ -0,0 +1,92 @@
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import dashboard, rollups
+from .models import ChickStock, SaleLine
+from .reporting import date_range
+
+# Fallback used when no stock row exists for a type/breed (or its price is 0)
+DEFAULT_CHICK_PRICE = 1650
+
+
+def current_chick_price(chick_type, chick_breed):
+    price = ChickStock.objects.filter(
+        chick_type=chick_type,
+        chick_breed=chick_breed,
+    ).order_by('-price_updated_at').values_list('chick_price', flat=True).first()
+    return price or DEFAULT_CHICK_PRICE
+
+
+def record_chick_sales(reqs, prices):
+    """Write the sale lines for chick requests approved together (approvals.approve_chick_requests).
+
+    ``prices`` maps ``(chick_type, chick_breed)`` to unit price. Existing lines for the requests are
+    replaced; the dashboard ``total_sales`` counter and the sales rollup are updated here because
+    ``bulk_create`` skips signals.
+    """
+    SaleLine.objects.filter(kind='chick', chick_request__in=reqs).delete()
+    now = timezone.now()
+    lines = []
+    for req in reqs:
+        qty = int(req.quantity or 0)
+        unit_price = prices[(req.chick_type, req.chick_breed)]
+        lines.append(SaleLine(
+            kind='chick',
+            chick_request=req,
+            item=f"{req.chick_type}/{req.chick_breed}",
+            quantity=qty,
+            unit_price=unit_price,
+            amount=qty * unit_price,
+            sale_date=req.request_date,
+            approved_on=req.approved_on or now,
+        ))
+    SaleLine.objects.bulk_create(lines)
+    dashboard.apply_delta({'total_sales': sum(line.amount for line in lines)})
+    delta = {}
+    for line in lines:
+        rollups.add_rows(delta, rollups.contribution(line))
+    rollups.adjust(SaleLine, delta)
+    return lines
+
+
+def record_feed_sale(alloc):
+    """Write (or refresh) the sale line for an approved feed allocation."""
+    unit_price = getattr(alloc.feed_stock, 'selling_price', 0) or 0
+    bags = int(alloc.bags_allocated or 0)
+    line, _ = SaleLine.objects.update_or_create(
+        feed_allocation=alloc,
+        defaults={
+            'kind': 'feed',
+            'chick_request_id': alloc.chick_request_id,
+            'item': alloc.feed_name,
+            'quantity': bags,
+            'unit_price': unit_price,
+            'amount': bags * unit_price,
+            'sale_date': alloc.chick_request.request_date,
+            'approved_on': timezone.now(),
+        },
+    )
+    return line
+
+
+def clear_chick_sale(req):
+    SaleLine.objects.filter(kind='chick', chick_request=req).delete()
+
+
+def clear_feed_sale(alloc):
+    SaleLine.objects.filter(feed_allocation=alloc).delete()
+
+
+def sale_lines(start=None, end=None, kind=None):
+    """Sale lines filtered by request date (inclusive, ``date`` objects) and kind.
+
+    Dates are turned into datetime bounds so the ``sale_date`` index can be used.
+    """
+    qs = SaleLine.objects.all()
+    if kind:
+        qs = qs.filter(kind=kind)
+    return qs.filter(**date_range('sale_date', start, end))
+
+
+def sales_total(qs):
+    return qs.order_by().aggregate(total=Sum('amount'))['total'] or 0
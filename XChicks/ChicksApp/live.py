@@ -0,0 +1,277 @@
+"""Live updates for the manager pages: an in-process event bus streamed as Server-Sent Events.
+
+Writes publish small events (see ``EVENTS``) from the model signal handlers and from the code paths
+that skip signals (approvals, ``dashboard.apply_delta``, ``stock_levels``). Each process keeps one
+:class:`EventBus`; SSE connections (``views.live_events``, served from the ASGI app) subscribe to it
+and the pages patch themselves from what arrives.
+
+How an event reaches the buses is up to ``LIVE_EVENTS['BROADCASTER']``:
+
+* :class:`LocalBroadcaster` hands it to this process's bus when the transaction commits. Enough for
+  a single ASGI worker that also handles the writes.
+* :class:`DatabaseBroadcaster` stands in for a real multi-worker broadcaster (Redis pub/sub,
+  PostgreSQL LISTEN/NOTIFY): events go to the ``LiveEvent`` table inside the writing transaction and
+  one poller thread per streaming process feeds them to its bus.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import LiveEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BROADCASTER': 'ChicksApp.live.LocalBroadcaster',
+    # Recent events kept in memory so a page can catch up from the cursor it was rendered with
+    'HISTORY': 1000,
+    # Events a slow connection may fall behind by before it is told to reload instead
+    'QUEUE_SIZE': 200,
+    # Seconds between SSE comments that stop proxies from closing an idle stream
+    'KEEPALIVE': 15,
+    # Milliseconds the browser waits before reconnecting a dropped stream
+    'RETRY_MS': 3000,
+    # DatabaseBroadcaster: seconds between polls, and how long rows stay in the table
+    'POLL_INTERVAL': 1.0,
+    'RETENTION': 600,
+}
+
+# pending   {"kind": "chick"|"feed", "id": pk}                  a new request waiting for approval
+# status    {"kind", "ids": [pk, ...], "status": "approved"}   requests changed status
+# delivered {"kind", "id": pk}                                  a request was marked delivered
+# stock     {"kind", "key": [type, breed] | [name, type, brand], "delta": n}   a stock level moved
+# counters  {"chick_pending": -1, ...}                          dashboard snapshot deltas
+EVENTS = ('pending', 'status', 'delivered', 'stock', 'counters')
+# Sent instead of events a page can no longer catch up on; the page reloads
+RESYNC = 'resync'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'LIVE_EVENTS', {})}
+
+
+class Subscription:
+    """One stream's queue, living on the stream's event loop and filled from any thread."""
+
+    def __init__(self, loop, size, names):
+        self.loop = loop
+        self.queue = asyncio.Queue(size)
+        self.names = names
+        self.behind = False
+
+    def push(self, event):
+        if event[1] not in self.names:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop is gone; the stream's cleanup unsubscribes it
+            pass
+
+    def _put(self, event):
+        if self.behind:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.behind = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((None, RESYNC, {}))
+
+
+class EventBus:
+    """Fan events out to this process's streams and remember the recent ones.
+
+    Events are ``(id, name, data)`` tuples with increasing ids. ``floor`` is the newest id the bus no
+    longer has: a page rendered at or after it can be caught up from the history.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque()
+        self.floor = self.last_id = 0
+
+    def reset(self, start_id):
+        with self._lock:
+            self._history.clear()
+            self.floor = self.last_id = start_id
+
+    def deliver(self, events):
+        with self._lock:
+            events = [e for e in events if e[0] > self.last_id]
+            if not events:
+                return
+            self._history.extend(events)
+            while len(self._history) > get_config()['HISTORY']:
+                self.floor = self._history.popleft()[0]
+            self.last_id = events[-1][0]
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            for event in events:
+                sub.push(event)
+
+    def subscribe(self, since=None, names=EVENTS):
+        """Subscribe the running event loop; returns ``(subscription, backlog)``.
+
+        ``backlog`` holds the events after ``since``, or a single resync event when some of them are
+        no longer in memory.
+        """
+        sub = Subscription(asyncio.get_running_loop(), get_config()['QUEUE_SIZE'], set(names) | {RESYNC})
+        with self._lock:
+            self._subscribers.add(sub)
+            if since is None:
+                backlog = []
+            elif since < self.floor:
+                backlog = [(None, RESYNC, {})]
+            else:
+                backlog = [e for e in self._history if e[0] > since and e[1] in sub.names]
+        return sub, backlog
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+
+bus = EventBus()
+
+
+class LocalBroadcaster:
+    """Single process: events reach this process's bus once the writing transaction commits."""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self._lock = threading.Lock()
+        # Ids start from the clock, so a page rendered before a restart is below the new floor and
+        # resyncs instead of missing events
+        self._next_id = int(time.time() * 1000) * 1000
+        bus.reset(self._next_id)
+
+    def publish(self, name, data):
+        def send():
+            with self._lock:
+                self._next_id += 1
+                self.bus.deliver([(self._next_id, name, data)])
+        transaction.on_commit(send)
+
+    def cursor(self):
+        return self.bus.last_id
+
+    def start(self):
+        pass
+
+
+class DatabaseBroadcaster:
+    """Multi-worker stand-in: an outbox table polled by one thread per streaming process.
+
+    Costs one INSERT per event and one indexed SELECT per poll interval per process, however many
+    pages are connected. On PostgreSQL, concurrent transactions can commit ids out of order and an
+    event may be skipped; a production deployment should swap in LISTEN/NOTIFY or Redis behind the
+    same ``publish``/``cursor``/``start`` interface.
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def publish(self, name, data):
+        # Part of the writing transaction: rolled back with it, visible to other workers on commit
+        LiveEvent.objects.create(name=name, data=data)
+
+    def cursor(self):
+        return LiveEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self.bus.reset(self.cursor())
+                self._thread = threading.Thread(target=self._poll, name='live-events', daemon=True)
+                self._thread.start()
+
+    def _poll(self):
+        config = get_config()
+        pruned_at = 0.0
+        while True:
+            time.sleep(config['POLL_INTERVAL'])
+            try:
+                rows = list(LiveEvent.objects.filter(id__gt=self.bus.last_id).order_by('id')
+                            .values_list('id', 'name', 'data')[:500])
+                self.bus.deliver(rows)
+                if time.monotonic() - pruned_at > config['RETENTION']:
+                    cutoff = timezone.now() - timedelta(seconds=config['RETENTION'])
+                    LiveEvent.objects.filter(created_at__lt=cutoff).delete()
+                    pruned_at = time.monotonic()
+            except DatabaseError as e:
+                logger.warning('Live event poll failed: %s', e)
+                # Reconnect on the next poll; the connection is otherwise kept for the thread's life
+                connection.close()
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = import_string(get_config()['BROADCASTER'])(bus)
+        return _broadcaster
+
+
+def publish(name, data):
+    """Queue event ``name`` with JSON-serializable ``data``; delivered only if the transaction commits."""
+    get_broadcaster().publish(name, data)
+
+
+def cursor():
+    """Id of the newest event, for pages to render with and stream from."""
+    return get_broadcaster().cursor()
+
+
+def format_event(event):
+    event_id, name, data = event
+    lines = [f'event: {name}', f"data: {json.dumps(data, separators=(',', ':'))}"]
+    if event_id is not None:
+        lines.insert(0, f'id: {event_id}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def event_stream(since=None, names=EVENTS):
+    """Async iterator of SSE frames: events after ``since`` (an id from :func:`cursor`), then live ones."""
+    config = get_config()
+    await sync_to_async(get_broadcaster().start)()
+    sub, backlog = bus.subscribe(since, names)
+    try:
+        yield f"retry: {config['RETRY_MS']}\n\n"
+        for event in backlog:
+            yield format_event(event)
+            if event[1] == RESYNC:
+                return
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), config['KEEPALIVE'])
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            # The page already shows what it was rendered with
+            if since is not None and event[0] is not None and event[0] <= since:
+                continue
+            yield format_event(event)
+            if event[1] == RESYNC:
+                return
+    finally:
+        bus.unsubscribe(sub)
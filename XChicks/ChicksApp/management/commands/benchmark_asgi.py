@@ -0,0 +1,184 @@
+import asyncio
+import io
+import statistics
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from ChicksApp.models import UserProfile
+from ChicksApp.parallel_queries import gather_queries, run_queries
+from ChicksApp.report_cache import REPORTS_CACHE
+from ChicksApp.views import _report_queries
+
+HOST = 'benchmark.local'
+REPORT_FILTERS = dict.fromkeys(('start', 'end', 'chick_type', 'chick_breed', 'feed_type', 'status', 'agent', 'farmer', 'q'), '')
+
+
+class Command(BaseCommand):
+    help = ('Compare the manager dashboard and Reports page served through the WSGI and ASGI handlers '
+            '(in-process, no network), and the Reports queries run one after another vs concurrently.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Manager username to request the pages as (default: the first manager).')
+        parser.add_argument('--paths', default='/managersdashboard/,/reports/', help='Comma-separated pages.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight at once.')
+        parser.add_argument('--requests', type=int, default=10, help='Requests per client per page.')
+        parser.add_argument('--repeat', type=int, default=5, help='Rounds of the query comparison.')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Let the Reports page use its cache (default clears it before each request).')
+
+    def handle(self, *args, **options):
+        managers = UserProfile.objects.filter(role='manager')
+        user = managers.filter(username=options['user']).first() if options['user'] else managers.order_by('pk').first()
+        if user is None:
+            raise CommandError('No manager account to request the pages as (see --user, or run seed_data).')
+
+        self._compare_queries(options['repeat'])
+
+        client = Client()
+        client.force_login(user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        paths = [p for p in options['paths'].split(',') if p]
+        self.stdout.write(f"\nPages as {user.username}: {options['concurrency']} concurrent clients x "
+                          f"{options['requests']} requests")
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, HOST]):
+            for path in paths:
+                for name, run in (('wsgi', self._run_wsgi), ('asgi', self._run_asgi)):
+                    # One warm-up request so imports, templates and the snapshot row are in place
+                    run(path, cookie, 1, 1, options['warm_cache'])
+                    timings, seconds, statuses = run(path, cookie, options['concurrency'], options['requests'],
+                                                     options['warm_cache'])
+                    self._report(name, path, timings, seconds, statuses)
+
+    def _compare_queries(self, repeat):
+        sequential, concurrent, slowest = [], [], []
+        for _ in range(repeat):
+            queries = _report_queries(REPORT_FILTERS)
+            single = {}
+            started = time.perf_counter()
+            for name, fn in queries.items():
+                t = time.perf_counter()
+                run_queries({name: fn})
+                single[name] = time.perf_counter() - t
+            sequential.append(time.perf_counter() - started)
+            slowest.append(max(single.values()))
+            started = time.perf_counter()
+            _, timed_out = asyncio.run(gather_queries(_report_queries(REPORT_FILTERS)))
+            concurrent.append(time.perf_counter() - started)
+            if timed_out:
+                self.stdout.write(self.style.WARNING(f"Timed out: {', '.join(timed_out)}"))
+        self.stdout.write(f'Reports queries ({len(queries)}), median of {repeat}:')
+        self.stdout.write(f'  one after another {statistics.median(sequential) * 1000:8.1f}ms')
+        self.stdout.write(f'  concurrent        {statistics.median(concurrent) * 1000:8.1f}ms')
+        self.stdout.write(f'  slowest single    {statistics.median(slowest) * 1000:8.1f}ms')
+
+    def _before_request(self, warm_cache):
+        if not warm_cache:
+            caches[REPORTS_CACHE].clear()
+
+    def _run_wsgi(self, path, cookie, concurrency, per_client, warm_cache):
+        # A threaded WSGI server: one thread per client, each calling the handler directly
+        handler = WSGIHandler()
+        timings, statuses, lock = [], [], threading.Lock()
+        barrier = threading.Barrier(concurrency)
+
+        def client():
+            local, codes = [], []
+            barrier.wait()
+            for _ in range(per_client):
+                self._before_request(warm_cache)
+                environ = {
+                    'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                    'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                    'HTTP_HOST': HOST, 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+                    'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+                    'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                    'wsgi.run_once': False,
+                }
+                status = []
+                started = time.perf_counter()
+                body = handler(environ, lambda s, headers, exc_info=None: status.append(s))
+                try:
+                    for _chunk in body:
+                        pass
+                finally:
+                    body.close()
+                local.append(time.perf_counter() - started)
+                codes.append(int(status[0].split()[0]))
+            with lock:
+                timings.extend(local)
+                statuses.extend(codes)
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return timings, time.perf_counter() - started, statuses
+
+    def _run_asgi(self, path, cookie, concurrency, per_client, warm_cache):
+        # An ASGI server: every client is a task on one event loop
+        handler = ASGIHandler()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 50000), 'server': (HOST, 80),
+        }
+
+        async def request():
+            sent_body = False
+            done = asyncio.Event()
+            status = []
+
+            async def receive():
+                nonlocal sent_body
+                if not sent_body:
+                    sent_body = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # The handler waits for a disconnect while the view runs; the client never leaves
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+                elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                    done.set()
+
+            await handler(dict(scope), receive, send)
+            return status[0]
+
+        async def client(timings, statuses):
+            for _ in range(per_client):
+                self._before_request(warm_cache)
+                started = time.perf_counter()
+                statuses.append(await request())
+                timings.append(time.perf_counter() - started)
+
+        async def main():
+            timings, statuses = [], []
+            started = time.perf_counter()
+            await asyncio.gather(*(client(timings, statuses) for _ in range(concurrency)))
+            return timings, time.perf_counter() - started, statuses
+
+        return asyncio.run(main())
+
+    def _report(self, name, path, timings, seconds, statuses):
+        timings = sorted(timings)
+        failed = sum(1 for s in statuses if s != 200)
+        note = self.style.WARNING(f'  {failed} non-200 response(s)') if failed else ''
+        self.stdout.write(
+            f'{name} {path:<22} median {statistics.median(timings) * 1000:8.1f}ms  '
+            f'p95 {timings[max(int(len(timings) * 0.95) - 1, 0)] * 1000:8.1f}ms  '
+            f'{len(timings) / seconds:7.1f} req/s{note}'
+        )
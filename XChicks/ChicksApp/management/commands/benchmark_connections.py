@@ -0,0 +1,114 @@
+import copy
+import statistics
+import threading
+import time
+from importlib.util import find_spec
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ChicksApp.models import ChickRequest
+
+MODES = ('fresh', 'persistent', 'pool')
+
+
+def _mode_settings(base, mode):
+    db = copy.deepcopy(base)
+    db['OPTIONS'] = {k: v for k, v in db.get('OPTIONS', {}).items() if k != 'pool'}
+    if mode == 'fresh':
+        db.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+    elif mode == 'persistent':
+        db.update(CONN_MAX_AGE=base['CONN_MAX_AGE'] or 600, CONN_HEALTH_CHECKS=True)
+    else:
+        db.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+        db['OPTIONS']['pool'] = base.get('OPTIONS', {}).get('pool') or True
+    return db
+
+
+class Command(BaseCommand):
+    help = ('Measure per-request connection overhead under concurrent load: a new connection per request '
+            'vs persistent connections (CONN_MAX_AGE) vs a psycopg pool (PostgreSQL only).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200, help='Simulated requests per thread.')
+        parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated subset of modes.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        base = connections[options['database']].settings_dict
+        modes = [m for m in options['modes'].split(',') if m]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown mode(s) {", ".join(sorted(unknown))}; choose from {", ".join(MODES)}.')
+        self.stdout.write(f"{base['ENGINE']} {base['NAME']}: {options['threads']} threads x {options['requests']} requests")
+
+        results = {}
+        for mode in modes:
+            if mode == 'pool' and (connections[options['database']].vendor != 'postgresql' or not find_spec('psycopg_pool')):
+                self.stdout.write(self.style.WARNING('pool: skipped (needs PostgreSQL and psycopg[pool]).'))
+                continue
+            alias = f'bench_{mode}'
+            connections.settings[alias] = _mode_settings(base, mode)
+            try:
+                results[mode] = self._run(alias, options['threads'], options['requests'])
+            finally:
+                self._close(alias)
+                del connections.settings[alias]
+            r = results[mode]
+            self.stdout.write(
+                f"{mode:<11} median {r['median_ms']:7.3f}ms  p95 {r['p95_ms']:7.3f}ms  "
+                f"{r['throughput']:8.0f} req/s  {r['connects']} connection(s) opened"
+            )
+
+        if 'fresh' in results:
+            for mode in ('persistent', 'pool'):
+                if mode in results:
+                    saved = results['fresh']['median_ms'] - results[mode]['median_ms']
+                    self.stdout.write(f'{mode}: {saved:.3f}ms of connection overhead saved per request (median)')
+
+    def _run(self, alias, threads, per_thread):
+        timings, connects, lock = [], [0], threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            conn = connections[alias]
+            local, opened = [], 0
+            barrier.wait()
+            for _ in range(per_thread):
+                started = time.perf_counter()
+                # The same signals the WSGI/ASGI handlers send: request_finished closes (or keeps, or
+                # returns to the pool) the connection according to the alias settings
+                request_started.send(sender=self.__class__)
+                if conn.connection is None:
+                    opened += 1
+                ChickRequest.objects.using(alias).filter(status='pending').exists()
+                request_finished.send(sender=self.__class__)
+                local.append((time.perf_counter() - started) * 1000)
+            conn.close()
+            with lock:
+                timings.extend(local)
+                connects[0] += opened
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+        timings.sort()
+        return {
+            'median_ms': statistics.median(timings),
+            'p95_ms': timings[int(len(timings) * 0.95) - 1],
+            'throughput': len(timings) / elapsed,
+            'connects': connects[0],
+        }
+
+    def _close(self, alias):
+        conn = connections[alias]
+        conn.close()
+        close_pool = getattr(conn, 'close_pool', None)
+        if close_pool is not None and conn.settings_dict.get('OPTIONS', {}).get('pool'):
+            close_pool()
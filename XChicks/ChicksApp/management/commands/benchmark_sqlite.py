@@ -0,0 +1,118 @@
+import copy
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.test.utils import override_settings
+
+from ChicksApp.sqlite_tuning import get_pragmas
+
+# SQLite's own defaults, i.e. what the app ran with before sqlite_tuning
+STOCK_PRAGMAS = {
+    'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000,
+    'mmap_size': 0, 'cache_size': -2000, 'temp_store': 'DEFAULT',
+}
+BATCHES = 50
+
+
+class Command(BaseCommand):
+    help = ('Concurrent read/write benchmark on a scratch SQLite file: stock settings vs the configured '
+            'SQLITE_PRAGMAS (WAL, busy timeout, IMMEDIATE transactions). Readers aggregate, writers run '
+            'approval-style conditional decrements.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each mode.')
+        parser.add_argument('--rows', type=int, default=20000, help='Rows in the scratch events table.')
+
+    def handle(self, *args, **options):
+        base = connections[DEFAULT_DB_ALIAS].settings_dict
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite.')
+        self.stdout.write(f"{options['readers']} readers, {options['writers']} writers, {options['seconds']}s per mode")
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode, pragmas, txn_mode in (('stock', STOCK_PRAGMAS, None), ('tuned', get_pragmas(), 'IMMEDIATE')):
+                alias = f'bench_sqlite_{mode}'
+                db = copy.deepcopy(base)
+                db.update(NAME=str(Path(tmp) / f'{mode}.sqlite3'), TEST={})
+                db['OPTIONS'] = {k: v for k, v in db.get('OPTIONS', {}).items() if k != 'transaction_mode'}
+                if txn_mode:
+                    db['OPTIONS']['transaction_mode'] = txn_mode
+                connections.settings[alias] = db
+                try:
+                    with override_settings(SQLITE_PRAGMAS={**{k: None for k in get_pragmas()}, **pragmas}):
+                        self._prepare(alias, options['rows'])
+                        result = self._run(alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections.settings[alias]
+                self._report(mode, result)
+
+    def _prepare(self, alias, rows):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('CREATE TABLE stock (id INTEGER PRIMARY KEY, qty INTEGER NOT NULL CHECK (qty >= 0))')
+            cursor.execute('CREATE TABLE event (id INTEGER PRIMARY KEY, stock_id INTEGER, qty INTEGER, at REAL)')
+            cursor.execute('CREATE INDEX event_stock ON event (stock_id)')
+            cursor.executemany('INSERT INTO stock (id, qty) VALUES (%s, %s)', [(i, 10 ** 9) for i in range(BATCHES)])
+            cursor.executemany('INSERT INTO event (stock_id, qty, at) VALUES (%s, %s, %s)',
+                               [(i % BATCHES, 1, time.time()) for i in range(rows)])
+        connections[alias].close()
+
+    def _run(self, alias, options):
+        stats = {'read': [], 'write': [], 'errors': 0}
+        lock = threading.Lock()
+        stop = time.perf_counter() + options['seconds']
+
+        def read(cursor, rng):
+            cursor.execute('SELECT stock_id, COUNT(*), SUM(qty) FROM event WHERE stock_id = %s GROUP BY stock_id',
+                           [rng.randrange(BATCHES)])
+            cursor.fetchall()
+
+        def write(cursor, rng):
+            stock_id = rng.randrange(BATCHES)
+            with transaction.atomic(using=alias):
+                cursor.execute('UPDATE stock SET qty = qty - 1 WHERE id = %s AND qty >= 1', [stock_id])
+                cursor.execute('INSERT INTO event (stock_id, qty, at) VALUES (%s, 1, %s)', [stock_id, time.time()])
+
+        def worker(kind, op):
+            rng, timings, errors = random.Random(), [], 0
+            conn = connections[alias]
+            with conn.cursor() as cursor:
+                while time.perf_counter() < stop:
+                    started = time.perf_counter()
+                    try:
+                        op(cursor, rng)
+                    except OperationalError:
+                        errors += 1
+                        continue
+                    timings.append((time.perf_counter() - started) * 1000)
+            conn.close()
+            with lock:
+                stats[kind].extend(timings)
+                stats['errors'] += errors
+
+        threads = [threading.Thread(target=worker, args=('read', read)) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=worker, args=('write', write)) for _ in range(options['writers'])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats['seconds'] = options['seconds']
+        return stats
+
+    def _report(self, mode, stats):
+        parts = []
+        for kind in ('read', 'write'):
+            timings = sorted(stats[kind])
+            if timings:
+                parts.append(f'{kind}s {len(timings) / stats["seconds"]:8.0f}/s '
+                             f'(median {statistics.median(timings):6.2f}ms, p95 {timings[int(len(timings) * 0.95) - 1]:7.2f}ms)')
+            else:
+                parts.append(f'{kind}s        0/s')
+        self.stdout.write(f"{mode:<6} {'  '.join(parts)}  locked errors {stats['errors']}")
@@ -0,0 +1,222 @@
+import json
+import logging
+import platform
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, get_resolver
+from django.utils import timezone
+
+from ChicksApp.middleware import capture_queries
+from ChicksApp.models import ChickRequest, ChickStock, Customer, ExportJob, FeedAllocation, FeedStock, UserProfile
+
+ROLES = ('anonymous', 'manager', 'sales_agent')
+# Routes that change session state on GET, or are not ours to measure
+SKIP_NAMES = {'logout', 'Logout'}
+
+
+def _first_pk(qs):
+    return qs.order_by('pk').values_list('pk', flat=True).first()
+
+
+# kwargs for parametrised routes, looked up against the current data; None skips the route
+SAMPLE_KWARGS = {
+    'Approvechickrequest': lambda user: {'request_id': _first_pk(ChickRequest.objects.all())},
+    'Approvefeedrequest': lambda user: {'request_id': _first_pk(FeedAllocation.objects.all())},
+    'Updatechickstock_edit': lambda user: {'stock_id': _first_pk(ChickStock.objects.all())},
+    'Updatefeedstock_edit': lambda user: {'stock_id': _first_pk(FeedStock.objects.all())},
+    'mark_chick_delivered': lambda user: {'req_id': _first_pk(ChickRequest.objects.all())},
+    'mark_feed_delivered': lambda user: {'alloc_id': _first_pk(FeedAllocation.objects.all())},
+    'export_job': lambda user: {'job_id': _first_pk(ExportJob.objects.all())},
+    'export_job_download': lambda user: {'job_id': _first_pk(ExportJob.objects.filter(status='done'))},
+    'edit_farmer': lambda user: {'farmer_id': _first_pk(Customer.objects.filter(sales_agent=user))},
+    'delete_farmer': lambda user: {'farmer_id': _first_pk(Customer.objects.filter(sales_agent=user))},
+}
+
+# Query strings for views that need parameters to do real work
+SAMPLE_QUERY = {
+    'reports_export': '?dataset=chick_requests&format=csv',
+}
+
+
+def iter_routes():
+    """``(name, route, converters)`` for every top-level view in the root URLconf (admin excluded)."""
+    seen = set()
+    for p in get_resolver().url_patterns:
+        if not isinstance(p, URLPattern) or p.name in SKIP_NAMES:
+            continue
+        route = str(p.pattern)
+        if route in seen:
+            continue
+        seen.add(route)
+        yield p.name, route, list(p.pattern.converters)
+
+
+def build_url(route, kwargs):
+    url = route
+    for key, value in kwargs.items():
+        start = url.index('<')
+        url = url[:start] + str(value) + url[url.index('>', start) + 1:]
+    return '/' + url
+
+
+def _consume(response):
+    if getattr(response, 'streaming', False):
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Command(BaseCommand):
+    help = 'Time every view per role through the test client; record wall time, SQL count and SQL time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Requests per view; the median is reported.')
+        parser.add_argument('--manager', help='Manager username (default: first manager).')
+        parser.add_argument('--agent', help='Sales agent username (default: the agent with the most requests).')
+        parser.add_argument('--roles', default=','.join(ROLES), help='Comma-separated subset of roles to run.')
+        parser.add_argument('--only', default='', help='Only routes whose URL name or path contains this text.')
+        parser.add_argument('--output', default='benchmarks/latest.json')
+        parser.add_argument('--baseline', help='Compare against this earlier results file.')
+        parser.add_argument('--save-baseline', action='store_true', help='Also write the results to --baseline.')
+        parser.add_argument('--threshold', type=float, default=25.0,
+                            help='Regression threshold in percent for wall and SQL time.')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        users = self._users(options)
+        roles = [r for r in options['roles'].split(',') if r]
+        setup_test_environment()
+        # 403/404s for other roles' pages are expected here; keep their tracebacks out of the report
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            results = []
+            for role in roles:
+                if role not in ROLES:
+                    raise CommandError(f'Unknown role {role!r}; choose from {", ".join(ROLES)}.')
+                if role != 'anonymous' and users.get(role) is None:
+                    self.stdout.write(self.style.WARNING(f'No {role} account found; skipping role.'))
+                    continue
+                results.extend(self._run_role(role, users.get(role), options))
+        finally:
+            request_logger.setLevel(log_level)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'repeat': options['repeat'],
+                'rows': {m.__name__: m.objects.count() for m in (Customer, ChickRequest, FeedAllocation, ChickStock, FeedStock)},
+            },
+            'results': results,
+        }
+        self._write(options['output'], report)
+        if options['baseline'] and options['save_baseline']:
+            self._write(options['baseline'], report)
+        elif options['baseline']:
+            regressions = self._compare(options['baseline'], results, options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{regressions} view(s) regressed beyond {options["threshold"]}%.')
+
+    def _users(self, options):
+        manager = UserProfile.objects.filter(role='manager', is_active=True).order_by('pk')
+        if options['manager']:
+            manager = manager.filter(username=options['manager'])
+        agent = UserProfile.objects.filter(role='sales_agent', is_active=True)
+        if options['agent']:
+            agent = agent.filter(username=options['agent'])
+        else:
+            # The busiest agent gives the most representative agent pages
+            agent = agent.annotate(n=Count('created_requests')).order_by('-n', 'pk')
+        return {'manager': manager.first(), 'sales_agent': agent.first()}
+
+    def _run_role(self, role, user, options):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        results = []
+        for name, route, converters in iter_routes():
+            if options['only'] and options['only'] not in (name or '') and options['only'] not in route:
+                continue
+            kwargs = {}
+            if converters:
+                sample = SAMPLE_KWARGS.get(name)
+                kwargs = sample(user) if sample else {}
+                if not kwargs or any(v is None for v in kwargs.values()):
+                    continue
+            url = build_url(route, kwargs) + SAMPLE_QUERY.get(name, '')
+            results.append(self._measure(client, role, name, url, options['repeat']))
+            r = results[-1]
+            self.stdout.write(
+                f"{role:<12} {r['status']:>3} {r['wall_ms']:>9.1f}ms {r['queries']:>5}q {r['sql_ms']:>9.1f}ms sql  {url}"
+            )
+        return results
+
+    def _measure(self, client, role, name, url, repeat):
+        walls, sqls, queries, status, size = [], [], 0, None, 0
+        for _ in range(max(repeat, 1)):
+            # Counted through the middleware's recorder, so queries on worker threads are included;
+            # SQL time then sums queries that ran in parallel and can exceed wall time
+            with capture_queries() as stats:
+                started = time.perf_counter()
+                response = client.get(url)
+                size = _consume(response)
+                walls.append((time.perf_counter() - started) * 1000)
+            sqls.append(stats.duration * 1000)
+            queries, status = stats.count, response.status_code
+        return {
+            'role': role,
+            'name': name,
+            'url': url,
+            'status': status,
+            'bytes': size,
+            'wall_ms': round(statistics.median(walls), 2),
+            'sql_ms': round(statistics.median(sqls), 2),
+            'queries': queries,
+        }
+
+    def _write(self, path, report):
+        path = Path(path)
+        if not path.is_absolute():
+            path = Path(settings.BASE_DIR) / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2))
+        self.stdout.write(f'Wrote {len(report["results"])} result(s) to {path}')
+
+    def _compare(self, baseline_path, results, threshold):
+        try:
+            baseline = json.loads(Path(baseline_path).read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read baseline {baseline_path}: {e}')
+        before = {(r['role'], r['name'], r['url']): r for r in baseline.get('results', [])}
+        regressions = 0
+        self.stdout.write(f'\nCompared with {baseline_path} (threshold {threshold}%):')
+        for r in results:
+            old = before.get((r['role'], r['name'], r['url']))
+            if old is None:
+                continue
+            wall = _pct(old['wall_ms'], r['wall_ms'])
+            sql = _pct(old['sql_ms'], r['sql_ms'])
+            worse = wall > threshold or sql > threshold or r['queries'] > old['queries']
+            regressions += worse
+            line = (f"{r['role']:<12} wall {wall:+7.1f}%  sql {sql:+7.1f}%  "
+                    f"queries {old['queries']}->{r['queries']}  {r['url']}")
+            self.stdout.write(self.style.ERROR(line) if worse else line)
+        return regressions
+
+
+def _pct(old, new):
+    # Ignore noise on views that take well under a millisecond
+    if old < 1:
+        return 0.0
+    return (new - old) / old * 100.0
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ChicksApp.farmer_import import ImportInterrupted, UnreadableFile, import_farmers, load_rows, write_error_report
+from ChicksApp.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Bulk-register farmers from a CSV or XLSX file; rejected rows are written to an error report.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with a header row.')
+        parser.add_argument('--agent', help='Sales agent username for rows without an agent column value.')
+        parser.add_argument('--registered-by', default='import', help='Value stored in Customer.registered_by.')
+        parser.add_argument('--errors', help='Where to write the error report (default: <path>.errors.csv).')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        agent = None
+        if options['agent']:
+            agent = UserProfile.objects.filter(username=options['agent'], role='sales_agent').first()
+            if agent is None:
+                raise CommandError(f"Unknown sales agent '{options['agent']}'.")
+        registered_by = agent.username if agent and options['registered_by'] == 'import' else options['registered_by']
+        try:
+            with open(options['path'], 'rb') as fh:
+                rows = load_rows(fh, options['path'])
+        except (OSError, UnreadableFile) as e:
+            raise CommandError(f'Could not read {options["path"]}: {e}')
+        try:
+            created, rejected = import_farmers(
+                rows, registered_by, default_agent=agent, chunk_size=options['chunk_size'],
+            )
+        except ImportInterrupted as e:
+            raise CommandError(f'Import stopped on a database error after {e.created} farmer(s) were saved: {e.error}')
+        self.stdout.write(self.style.SUCCESS(f'Imported {created} farmer(s).'))
+        if rejected:
+            errors_path = options['errors'] or f"{options['path']}.errors.csv"
+            with open(errors_path, 'w', newline='') as out:
+                write_error_report(rejected, out)
+            self.stdout.write(self.style.WARNING(f'Rejected {len(rejected)} row(s); see {errors_path}'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ChicksApp import search
+
+
+class Command(BaseCommand):
+    help = 'Create (if needed) and refill the full-text search tables from the source tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*',
+                            help=f"Only rebuild these document kinds ({', '.join(search.SEARCH_SOURCES)}).")
+
+    def handle(self, *args, **options):
+        kinds = options['kinds'] or list(search.SEARCH_SOURCES)
+        unknown = [k for k in kinds if k not in search.SEARCH_SOURCES]
+        if unknown:
+            raise CommandError(f"Unknown kind(s): {', '.join(unknown)}.")
+        search.create_tables()
+        with transaction.atomic():
+            search.rebuild(kinds)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search index: {', '.join(kinds)}."))
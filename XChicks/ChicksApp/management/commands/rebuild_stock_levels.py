@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ChicksApp.stock_levels import rebuild_levels
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the chick/feed stock level tables from the stock batches and report any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only compare; exit non-zero if any level is off, without correcting it.')
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        drift = rebuild_levels(fix=not verify)
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Stock levels match the stock batches.' if verify else
+                                                 'Stock levels rebuilt; no drift found.'))
+            return
+        for (table, key), (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f"{table} {'/'.join(key)}: stored {stored}, actual {actual} (drift {stored - actual:+d})")
+        if verify:
+            raise CommandError(f'{len(drift)} stock level(s) out of step; run without --verify to correct them.')
+        self.stdout.write(self.style.WARNING(f'Stock levels rebuilt; corrected {len(drift)} level(s).'))
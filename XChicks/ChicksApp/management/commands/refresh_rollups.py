@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ChicksApp.rollups import rebuild_rollups, roll_forward, rolled_through
+
+
+class Command(BaseCommand):
+    help = ('Fold the days since the last run into the daily activity/sales rollups behind Reports. '
+            'Run it daily (e.g. from cron shortly after midnight); later runs only read the new days.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--through', help='Last day to roll up, YYYY-MM-DD (default: yesterday; today is never rolled up).')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Also recompute every rolled-up day from the source tables and report any drift.')
+        parser.add_argument('--verify', action='store_true',
+                            help='Only compare the rolled-up days with the source tables; exit non-zero on drift.')
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self._report_drift(rebuild_rollups(fix=False), verify=True)
+            return
+
+        yesterday = timezone.localdate() - timedelta(days=1)
+        through = yesterday
+        if options['through']:
+            try:
+                through = datetime.strptime(options['through'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--through must be a date like 2025-01-31.')
+            if through > yesterday:
+                raise CommandError(f'Only finished days can be rolled up; --through must be {yesterday} or earlier.')
+
+        if options['rebuild']:
+            self._report_drift(rebuild_rollups(fix=True), verify=False)
+        rolled = roll_forward(through)
+        if rolled is None:
+            self.stdout.write(self.style.SUCCESS(f'Rollups already hold every day through {rolled_through()}.'))
+            return
+        first, last = rolled
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {first or 'the beginning'} through {last}." if first != last else f'Rolled up {last}.'
+        ))
+
+    def _report_drift(self, drift, verify):
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Rollups match the source tables.'))
+            return
+        for (table, key), (stored, actual) in sorted(drift.items(), key=lambda item: str(item[0])):
+            changed = ', '.join(f'{c} {stored[c]} vs {actual[c]}' for c in stored if stored[c] != actual[c])
+            self.stdout.write(f"{table} {'/'.join(str(k) for k in key)}: stored vs actual: {changed}")
+        if verify:
+            raise CommandError(f'{len(drift)} rollup row(s) out of step; run with --rebuild to correct them.')
+        self.stdout.write(self.style.WARNING(f'Rollups rebuilt; corrected {len(drift)} row(s).'))
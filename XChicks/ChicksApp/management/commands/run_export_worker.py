@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ChicksApp.jobs import claim_next_job, expire_stale_jobs, prune_stale_exports, run_job
+
+
+class Command(BaseCommand):
+    help = 'Process queued XLSX/PDF export jobs, polling the database queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling forever.')
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_stale_jobs()
+            if expired:
+                self.stdout.write(self.style.WARNING(f'Failed {expired} export(s) left running by a stopped worker'))
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+            self.stdout.write(f'Running export {job.pk} ({job.dataset}.{job.format})')
+            if run_job(job):
+                prune_stale_exports()
+                self.stdout.write(self.style.SUCCESS(f'Finished export {job.pk}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Export {job.pk} failed'))
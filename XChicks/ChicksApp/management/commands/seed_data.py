@@ -0,0 +1,266 @@
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ChicksApp import search
+from ChicksApp.dashboard import rebuild_snapshot
+from ChicksApp.models import (
+    ChickRequest, ChickStock, Customer, FeedAllocation, FeedStock, IdSequence, SaleLine, UserProfile,
+)
+from ChicksApp.rollups import rebuild_rollups
+from ChicksApp.stock_levels import rebuild_levels
+from ChicksApp.versions import VERSIONED_MODELS, bump_version
+
+CHICK_GROUPS = [('layer', 'local'), ('layer', 'exotic'), ('broiler', 'local'), ('broiler', 'exotic')]
+FEEDS = [('Starter Mash', 'starter', 'Ugachick'), ('Grower Mash', 'grower', 'Biyinzika'), ('Layer Mash', 'layer', 'Nuvita')]
+LOCATIONS = ['Kampala', 'Wakiso', 'Mukono', 'Jinja', 'Gulu', 'Mbarara', 'Masaka', 'Lira', 'Mbale', 'Hoima']
+
+
+@contextmanager
+def _manual_timestamps(*fields):
+    # bulk_create fills auto_now/auto_now_add fields with "now"; let the seeder spread them out
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f, _, _ in saved:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _pick(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+class Command(BaseCommand):
+    help = 'Seed synthetic farmers, agents, stock, chick requests and feed allocations for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agents', type=int, default=20)
+        parser.add_argument('--farmers', type=int, default=2000)
+        parser.add_argument('--chick-stock', type=int, default=40, help='Number of chick stock batches.')
+        parser.add_argument('--feed-stock', type=int, default=15, help='Number of feed stock lots.')
+        parser.add_argument('--requests', type=int, default=20000, help='Number of chick requests.')
+        parser.add_argument('--feed-ratio', type=float, default=0.6,
+                            help='Share of chick requests that get a feed allocation.')
+        parser.add_argument('--days', type=int, default=365, help='Spread request dates over this many past days.')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible data.')
+        parser.add_argument('--manager', default='bench_manager',
+                            help='Username of a manager account to create if missing (password: the username).')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.rng, self.chunk_size, self.days = rng, options['chunk_size'], options['days']
+        self.now = timezone.now()
+        # Unique per run so repeated seeding never collides on NIN/usernames/batch names
+        self.tag = uuid.uuid4().hex[:4].upper()
+        self.password = make_password(None)
+
+        self._ensure_manager(options['manager'])
+        agents = self._seed_agents(options['agents'])
+        self._seed_chick_stock(options['chick_stock'])
+        feed_stock = self._seed_feed_stock(options['feed_stock'])
+        farmers = self._seed_farmers(options['farmers'], agents)
+        self._seed_requests(options['requests'], farmers, agents, feed_stock, options['feed_ratio'])
+
+        # Bulk inserts skip signals: recompute the dashboard, stock levels, rollups and search index,
+        # invalidate cached reports
+        rebuild_snapshot()
+        rebuild_levels()
+        rebuild_rollups()
+        search.rebuild()
+        for model in VERSIONED_MODELS:
+            bump_version(model._meta.model_name)
+        self.stdout.write(self.style.SUCCESS('Seeding finished.'))
+
+    def _ensure_manager(self, username):
+        if not UserProfile.objects.filter(username=username).exists():
+            UserProfile.objects.create_user(username=username, password=username, role='manager')
+            self.stdout.write(f'Created manager {username}.')
+
+    def _seed_agents(self, n):
+        UserProfile.objects.bulk_create([
+            UserProfile(username=f'agent_{self.tag}_{i}', password=self.password, role='sales_agent')
+            for i in range(n)
+        ], batch_size=self.chunk_size)
+        agents = list(UserProfile.objects.filter(username__startswith=f'agent_{self.tag}_'))
+        self.stdout.write(f'Created {len(agents)} sales agents.')
+        return agents
+
+    def _seed_chick_stock(self, n):
+        rng = self.rng
+        stamps = [self.now - timedelta(days=rng.randint(0, self.days)) for _ in range(n)]
+        with _manual_timestamps(ChickStock._meta.get_field('updated_at')):
+            ChickStock.objects.bulk_create([
+                ChickStock(
+                    batch_name=f'B{self.tag}-{i}',
+                    chick_type=CHICK_GROUPS[i % len(CHICK_GROUPS)][0],
+                    chick_breed=CHICK_GROUPS[i % len(CHICK_GROUPS)][1],
+                    chick_age=rng.randint(1, 8),
+                    chick_price=rng.choice([1500, 1650, 1800, 2000]),
+                    stock_quantity=rng.randint(500, 20000),
+                    updated_at=stamps[i],
+                    price_updated_at=stamps[i],
+                )
+                for i in range(n)
+            ], batch_size=self.chunk_size)
+        self.stdout.write(f'Created {n} chick stock batches.')
+
+    def _seed_feed_stock(self, n):
+        rng = self.rng
+        FeedStock.objects.bulk_create([
+            FeedStock(
+                stock_name=f'F{self.tag}-{i}',
+                feed_name=FEEDS[i % len(FEEDS)][0],
+                feed_type=FEEDS[i % len(FEEDS)][1],
+                feed_brand=FEEDS[i % len(FEEDS)][2],
+                feed_quantity=rng.randint(100, 5000),
+                expiry_date=date.today() + timedelta(days=rng.randint(30, 365)),
+                purchase_price=rng.choice([90000, 100000, 110000]),
+                selling_price=rng.choice([120000, 130000, 140000]),
+                supplier=f'Supplier {i % 5}',
+                supplier_contact=f'07{self.tag}{i:04d}'[:15],
+            )
+            for i in range(n)
+        ], batch_size=self.chunk_size)
+        self.stdout.write(f'Created {n} feed stock lots.')
+        return list(FeedStock.objects.filter(stock_name__startswith=f'F{self.tag}-'))
+
+    def _seed_farmers(self, n, agents):
+        rng, today = self.rng, date.today()
+        reg_field = Customer._meta.get_field('registration_date')
+        created = 0
+        for start in range(0, n, self.chunk_size):
+            size = min(self.chunk_size, n - start)
+            with transaction.atomic(), _manual_timestamps(reg_field):
+                users = UserProfile.objects.bulk_create([
+                    UserProfile(username=f'farmer_{self.tag}_{start + i}', password=self.password, role='farmer')
+                    for i in range(size)
+                ])
+                farmer_ids = IdSequence.allocate('FARMER', size)
+                customers = []
+                for i, (user, farmer_id) in enumerate(zip(users, farmer_ids), start=start):
+                    dob = today - timedelta(days=rng.randint(20 * 366, 30 * 365))
+                    agent = rng.choice(agents) if agents else None
+                    customers.append(Customer(
+                        user=user,
+                        farmer_id=farmer_id,
+                        farmer_name=f'Farmer {self.tag} {i}',
+                        date_of_birth=dob,
+                        age=today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day)),
+                        gender=rng.choice('MF'),
+                        location=rng.choice(LOCATIONS),
+                        nin=f'C{self.tag}{i:09d}',
+                        phone_number=f'07{i:08d}',
+                        recommender_name=f'Recommender {i}',
+                        recommender_nin=f'R{self.tag}{i:09d}',
+                        recommender_tel=f'07{(i * 7) % 10 ** 8:08d}',
+                        registered_by=agent.username if agent else 'seed',
+                        sales_agent=agent,
+                        registration_date=self.now - timedelta(days=rng.randint(self.days, self.days + 180)),
+                    ))
+                Customer.objects.bulk_create(customers)
+            created += size
+            self.stdout.write(f'  farmers: {created}/{n}')
+        return list(Customer.objects.filter(nin__startswith=f'C{self.tag}').values_list('id', 'sales_agent_id'))
+
+    def _seed_requests(self, n, farmers, agents, feed_stock, feed_ratio):
+        rng = self.rng
+        if not farmers:
+            return
+        prices = {}
+        for chick_type, chick_breed in CHICK_GROUPS:
+            prices[(chick_type, chick_breed)] = ChickStock.objects.filter(
+                chick_type=chick_type, chick_breed=chick_breed,
+            ).order_by('-price_updated_at').values_list('chick_price', flat=True).first() or 1650
+        date_field = ChickRequest._meta.get_field('request_date')
+        created = allocations = 0
+        for start in range(0, n, self.chunk_size):
+            size = min(self.chunk_size, n - start)
+            with transaction.atomic(), _manual_timestamps(date_field):
+                req_ids = IdSequence.allocate('REQ', size)
+                reqs = []
+                for req_id in req_ids:
+                    farmer_id, agent_id = rng.choice(farmers)
+                    chick_type, chick_breed = rng.choice(CHICK_GROUPS)
+                    status = _pick(rng, {'pending': 15, 'approved': 70, 'rejected': 15})
+                    requested = self.now - timedelta(days=rng.random() * self.days)
+                    reqs.append(ChickRequest(
+                        farmer_id=farmer_id,
+                        chick_request_id=req_id,
+                        farmer_type=rng.choice(['starter', 'returning']),
+                        chick_type=chick_type,
+                        chick_breed=chick_breed,
+                        quantity=rng.choice([50, 100, 100, 200, 300, 500]),
+                        chick_period=rng.randint(1, 8),
+                        feed_taken=rng.random() < feed_ratio,
+                        payment_terms=rng.choice(['mobile_money', 'visa', 'cash']),
+                        request_date=requested,
+                        created_by_id=agent_id or (rng.choice(agents).pk if agents else None),
+                        received_through=rng.choice(['walk-in', 'phonecall']),
+                        status=status,
+                        approved_on=requested + timedelta(days=rng.randint(0, 3)) if status == 'approved' else None,
+                        delivered=status == 'approved' and rng.random() < 0.8,
+                    ))
+                ChickRequest.objects.bulk_create(reqs)
+                lines = [
+                    SaleLine(
+                        kind='chick', chick_request=r, item=f'{r.chick_type}/{r.chick_breed}', quantity=r.quantity,
+                        unit_price=prices[(r.chick_type, r.chick_breed)],
+                        amount=r.quantity * prices[(r.chick_type, r.chick_breed)],
+                        sale_date=r.request_date, approved_on=r.approved_on,
+                    )
+                    for r in reqs if r.status == 'approved'
+                ]
+                allocs = self._build_allocations([r for r in reqs if r.feed_taken and r.status != 'rejected'], feed_stock)
+                FeedAllocation.objects.bulk_create(allocs)
+                lines += [
+                    SaleLine(
+                        kind='feed', chick_request=a.chick_request, feed_allocation=a, item=a.feed_name,
+                        quantity=a.bags_allocated, unit_price=a.feed_stock.selling_price, amount=a.amount_due,
+                        sale_date=a.chick_request.request_date, approved_on=a.chick_request.approved_on or self.now,
+                    )
+                    for a in allocs if a.status == 'approved'
+                ]
+                SaleLine.objects.bulk_create(lines)
+            created += size
+            allocations += len(allocs)
+            self.stdout.write(f'  chick requests: {created}/{n} (feed allocations: {allocations})')
+
+    def _build_allocations(self, reqs, feed_stock):
+        rng = self.rng
+        if not feed_stock or not reqs:
+            return []
+        feed_ids = IdSequence.allocate('FEED', len(reqs))
+        allocs = []
+        for r, feed_id in zip(reqs, feed_ids):
+            stock = rng.choice(feed_stock)
+            status = r.status if r.status == 'pending' else _pick(rng, {'approved': 85, 'rejected': 15})
+            if status == 'approved':
+                payment = _pick(rng, {'paid': 70, 'pending': 30})
+            else:
+                payment = 'rejected' if status == 'rejected' else 'pending'
+            bags = rng.choice([1, 2, 2, 3])
+            allocs.append(FeedAllocation(
+                feed_request_id=feed_id,
+                feed_stock=stock,
+                feed_name=stock.feed_name,
+                feed_type=stock.feed_type,
+                feed_brand=stock.feed_brand,
+                chick_request=r,
+                bags_allocated=bags,
+                amount_due=bags * stock.selling_price,
+                payment_due_date=(r.request_date + timedelta(days=60)).date(),
+                status=status,
+                payment_status=payment,
+                delivered=status == 'approved' and rng.random() < 0.75,
+            ))
+        return allocs
@@ -0,0 +1,55 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ChicksApp import sqlite_tuning
+
+
+class Command(BaseCommand):
+    help = ('Routine SQLite upkeep, meant to be scheduled (e.g. nightly): refresh planner statistics, '
+            'checkpoint the WAL and return free pages to the OS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--full-analyze', action='store_true',
+                            help='Run a complete ANALYZE instead of PRAGMA optimize.')
+        parser.add_argument('--checkpoint', default='TRUNCATE', choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'])
+        parser.add_argument('--vacuum-pages', type=int, default=0,
+                            help='Free pages to release in the incremental vacuum (0 = all).')
+        parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                            help='Switch auto_vacuum to INCREMENTAL; runs one full VACUUM, which locks the database.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f"Database '{options['database']}' is {connection.vendor}, not SQLite.")
+        size = self._size(connection)
+
+        sqlite_tuning.optimize(connection, full=options['full_analyze'])
+        self.stdout.write('ANALYZE done.' if options['full_analyze'] else 'PRAGMA optimize done.')
+
+        if options['enable_incremental_vacuum']:
+            sqlite_tuning.enable_incremental_vacuum(connection)
+            self.stdout.write('auto_vacuum set to INCREMENTAL (full VACUUM done).')
+
+        state = sqlite_tuning.pragma_values(connection, ['journal_mode', 'auto_vacuum'])
+        if state['journal_mode'] == 'wal':
+            busy, wal_pages, moved = sqlite_tuning.checkpoint(connection, options['checkpoint'])
+            note = ' (readers still active; rerun later to finish)' if busy else ''
+            self.stdout.write(f"WAL checkpoint ({options['checkpoint']}): {moved}/{wal_pages} page(s) copied{note}.")
+        else:
+            self.stdout.write(f"journal_mode is {state['journal_mode']}; no WAL to checkpoint.")
+
+        # auto_vacuum: 0 NONE, 1 FULL, 2 INCREMENTAL
+        if state['auto_vacuum'] == 2:
+            before, after = sqlite_tuning.incremental_vacuum(connection, options['vacuum_pages'])
+            self.stdout.write(f'Incremental vacuum: freelist {before} -> {after} page(s).')
+        else:
+            self.stdout.write('auto_vacuum is not INCREMENTAL; skipped vacuum (see --enable-incremental-vacuum).')
+
+        self.stdout.write(self.style.SUCCESS(f'Database size {size / 1024:.0f} KiB -> {self._size(connection) / 1024:.0f} KiB.'))
+
+    def _size(self, connection):
+        name = str(connection.settings_dict['NAME'])
+        return sum(os.path.getsize(p) for p in (name, f'{name}-wal') if os.path.exists(p))
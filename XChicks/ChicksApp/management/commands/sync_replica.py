@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ChicksApp.routers import get_config
+
+
+class Command(BaseCommand):
+    help = ('Refresh a SQLite read replica by copying the primary database file with the online backup '
+            'API (a stand-in for streaming replication in development and tests).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default=None, help='Replica alias (default: READ_REPLICA["ALIAS"]).')
+
+    def handle(self, *args, **options):
+        alias = options['alias'] or get_config()['ALIAS']
+        if alias not in connections.settings:
+            raise CommandError(f"No '{alias}' database configured (set XCHICKS_REPLICA_NAME).")
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('sync_replica only copies SQLite files; use database replication otherwise.')
+        source, target = str(primary.settings_dict['NAME']), str(replica.settings_dict['NAME'])
+        if source == target:
+            raise CommandError('The replica points at the primary file.')
+        replica.close()
+        src, dst = sqlite3.connect(source), sqlite3.connect(target)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
+        self.stdout.write(self.style.SUCCESS(f'Copied {source} -> {target}.'))
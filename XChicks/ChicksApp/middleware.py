@@ -0,0 +1,197 @@
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger('ChicksApp.perf')
+
+DEFAULTS = {
+    # Share of requests to instrument (0 disables it; unsampled requests pay one random() call)
+    'SAMPLE_RATE': 1.0,
+    # Log a warning when a request takes longer than this, or runs more queries than this
+    'SLOW_REQUEST_MS': 500,
+    'MAX_QUERIES': 50,
+    # How many repeated SQL fingerprints to include in the warning
+    'TOP_FINGERPRINTS': 3,
+    'SERVER_TIMING': True,
+}
+
+_active_stats = ContextVar('query_stats', default=None)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL with parameter lists collapsed, so ``pk IN (%s, %s)`` and ``pk IN (%s)`` group together."""
+    return _WHITESPACE.sub(' ', _IN_LIST.sub('IN (...)', sql)).strip()
+
+
+class QueryStats:
+    """``connection.execute_wrapper`` callable that tallies queries for one request.
+
+    ``parent`` is the tally active when this one started (e.g. ``capture_queries``); it sees every
+    query counted here as well.
+    """
+
+    def __init__(self, parent=None):
+        # Queries may run on worker threads too (see parallel_queries.py)
+        self._lock = threading.Lock()
+        self.parent = parent
+        self.count = 0
+        self.duration = 0.0
+        self.exact = Counter()
+        self.by_fingerprint = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self._tally(sql, params, time.perf_counter() - started)
+
+    def _tally(self, sql, params, elapsed):
+        with self._lock:
+            self.count += 1
+            self.duration += elapsed
+            self.exact[(sql, _hashable(params))] += 1
+            entry = self.by_fingerprint[fingerprint(sql)]
+            entry[0] += 1
+            entry[1] += elapsed
+        if self.parent is not None:
+            self.parent._tally(sql, params, elapsed)
+
+    @property
+    def duplicates(self):
+        # Identical SQL and parameters run more than once
+        return sum(n - 1 for n in self.exact.values() if n > 1)
+
+    def top_repeated(self, n):
+        repeated = [(fp, c, d) for fp, (c, d) in self.by_fingerprint.items() if c > 1]
+        return sorted(repeated, key=lambda r: (-r[1], -r[2]))[:n]
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper on every connection: counts the query into the instrumented request, if any.
+
+    The request is found through a context variable rather than by wrapping its thread's connections,
+    so queries an async view runs on other threads (``sync_to_async``, parallel_queries.py) count too.
+    """
+    stats = _active_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+@contextmanager
+def capture_queries():
+    """Tally every query run inside the block, including those on threads that inherit its context.
+
+    Unlike ``CaptureQueriesContext`` this sees the queries async views and parallel_queries.py run on
+    worker threads, and works with ``DEBUG=False``.
+    """
+    stats = QueryStats(parent=_active_stats.get())
+    token = _active_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _active_stats.reset(token)
+
+
+def install_recorder(sender, connection, **kwargs):
+    # connection_created receiver (apps.py). First in the list so the pop() of an enclosing
+    # connection.execute_wrapper() block still removes that block's own wrapper.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def _hashable(params):
+    try:
+        hash(params)
+        return params
+    except TypeError:
+        return repr(params)
+
+
+class QueryInstrumentationMiddleware:
+    """Count queries, SQL time and duplicates per request; works with ``DEBUG=False``.
+
+    Adds a ``Server-Timing`` header and logs slow or query-heavy requests to ``ChicksApp.perf``.
+    Configure with the ``QUERY_INSTRUMENTATION`` setting (see ``DEFAULTS``). SQL run while a
+    streaming response is being consumed happens after the header is sent and is not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = {**DEFAULTS, **getattr(settings, 'QUERY_INSTRUMENTATION', {})}
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = self._sample()
+        if stats is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        token = _active_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _active_stats.reset(token)
+        return self._finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats = self._sample()
+        if stats is None:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        token = _active_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _active_stats.reset(token)
+        return self._finish(request, response, stats, started)
+
+    def _sample(self):
+        rate = self.config['SAMPLE_RATE']
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return None
+        return QueryStats(parent=_active_stats.get())
+
+    def _finish(self, request, response, stats, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        sql_ms = stats.duration * 1000
+
+        if self.config['SERVER_TIMING']:
+            timing = f'sql;dur={sql_ms:.1f};desc="{stats.count} queries", total;dur={total_ms:.1f}'
+            if stats.duplicates:
+                timing += f', dup;desc="{stats.duplicates} duplicate queries"'
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        if total_ms > self.config['SLOW_REQUEST_MS'] or stats.count > self.config['MAX_QUERIES']:
+            self._log(request, response, stats, total_ms, sql_ms)
+        return response
+
+    def _log(self, request, response, stats, total_ms, sql_ms):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else request.path
+        lines = [
+            f'{request.method} {request.path} ({view}) -> {response.status_code}: {total_ms:.0f}ms, '
+            f'{stats.count} queries in {sql_ms:.0f}ms, {stats.duplicates} duplicates'
+        ]
+        for fp, count, duration in stats.top_repeated(self.config['TOP_FINGERPRINTS']):
+            lines.append(f'  {count}x {duration * 1000:.1f}ms  {fp[:300]}')
+        logger.warning('\n'.join(lines))
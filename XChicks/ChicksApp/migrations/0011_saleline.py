@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_sale_lines(apps, schema_editor):
+    # Freeze the currently computed amounts for everything already approved
+    ChickRequest = apps.get_model('ChicksApp', 'ChickRequest')
+    ChickStock = apps.get_model('ChicksApp', 'ChickStock')
+    FeedAllocation = apps.get_model('ChicksApp', 'FeedAllocation')
+    SaleLine = apps.get_model('ChicksApp', 'SaleLine')
+    prices = {}
+    for t, b, p in ChickStock.objects.order_by('chick_type', 'chick_breed', '-updated_at').values_list('chick_type', 'chick_breed', 'chick_price'):
+        prices.setdefault((t, b), p or 1650)
+    lines = []
+    for r in ChickRequest.objects.filter(status='approved').iterator():
+        price = prices.get((r.chick_type, r.chick_breed), 1650)
+        qty = int(r.quantity or 0)
+        lines.append(SaleLine(
+            kind='chick', chick_request_id=r.id, item=f"{r.chick_type}/{r.chick_breed}",
+            quantity=qty, unit_price=price, amount=qty * price,
+            sale_date=r.request_date, approved_on=r.approved_on or r.request_date,
+        ))
+    for a in FeedAllocation.objects.filter(status='approved', feed_stock__isnull=False).select_related('feed_stock', 'chick_request').iterator():
+        price = a.feed_stock.selling_price or 0
+        bags = int(a.bags_allocated or 0)
+        lines.append(SaleLine(
+            kind='feed', chick_request_id=a.chick_request_id, feed_allocation_id=a.id, item=a.feed_name,
+            quantity=bags, unit_price=price, amount=bags * price,
+            sale_date=a.chick_request.request_date, approved_on=a.chick_request.request_date,
+        ))
+    SaleLine.objects.bulk_create(lines, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ChicksApp', '0010_alter_customer_farmer_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('chick', 'Chicks'), ('feed', 'Feed')], max_length=10)),
+                ('item', models.CharField(max_length=40)),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_price', models.PositiveIntegerField()),
+                ('amount', models.PositiveBigIntegerField()),
+                ('sale_date', models.DateTimeField(db_index=True)),
+                ('approved_on', models.DateTimeField(default=django.utils.timezone.now)),
+                ('chick_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_lines', to='ChicksApp.chickrequest')),
+                ('feed_allocation', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sale_line', to='ChicksApp.feedallocation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'sale_date'], name='ChicksApp_s_kind_417b1a_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'chick')), fields=('chick_request',), name='unique_chick_sale_line')],
+            },
+        ),
+        migrations.RunPython(backfill_sale_lines, migrations.RunPython.noop),
+    ]
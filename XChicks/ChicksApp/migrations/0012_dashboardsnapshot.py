@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ChicksApp', '0011_saleline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_users', models.PositiveIntegerField(default=0)),
+                ('chick_stock', models.BigIntegerField(default=0)),
+                ('feed_stock', models.BigIntegerField(default=0)),
+                ('chick_pending', models.IntegerField(default=0)),
+                ('chick_approved', models.IntegerField(default=0)),
+                ('chick_rejected', models.IntegerField(default=0)),
+                ('feed_pending', models.IntegerField(default=0)),
+                ('feed_approved', models.IntegerField(default=0)),
+                ('feed_rejected', models.IntegerField(default=0)),
+                ('chick_delivered', models.IntegerField(default=0)),
+                ('feed_delivered', models.IntegerField(default=0)),
+                ('chick_awaiting_delivery', models.IntegerField(default=0)),
+                ('feed_awaiting_delivery', models.IntegerField(default=0)),
+                ('farmers_with_feeds', models.IntegerField(default=0)),
+                ('payments_paid', models.IntegerField(default=0)),
+                ('payments_pending', models.IntegerField(default=0)),
+                ('total_sales', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
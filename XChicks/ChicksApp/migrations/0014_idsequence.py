@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    # Continue numbering after the highest id already issued for each prefix/year
+    IdSequence = apps.get_model('ChicksApp', 'IdSequence')
+    sources = (
+        ('FARMER', apps.get_model('ChicksApp', 'Customer'), 'farmer_id'),
+        ('REQ', apps.get_model('ChicksApp', 'ChickRequest'), 'chick_request_id'),
+        ('FEED', apps.get_model('ChicksApp', 'FeedAllocation'), 'feed_request_id'),
+    )
+    for prefix, model, field in sources:
+        highest = {}
+        for value in model.objects.filter(**{f'{field}__startswith': f'{prefix}-'}).values_list(field, flat=True).iterator():
+            try:
+                _, year, number = value.rsplit('-', 2)
+                year, number = int(year), int(number)
+            except ValueError:
+                continue
+            highest[year] = max(highest.get(year, 0), number)
+        IdSequence.objects.bulk_create([
+            IdSequence(prefix=prefix, year=year, last_value=number) for year, number in highest.items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ChicksApp', '0013_dataversion_exportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chickrequest',
+            name='chick_request_id',
+            field=models.CharField(blank=True, max_length=20, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='farmer_id',
+            field=models.CharField(blank=True, max_length=20, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='feedallocation',
+            name='feed_request_id',
+            field=models.CharField(blank=True, max_length=20, unique=True),
+        ),
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=10)),
+                ('year', models.PositiveIntegerField()),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('prefix', 'year'), name='unique_id_sequence')],
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ChicksApp', '0014_idsequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chickrequest',
+            index=models.Index(fields=['status', 'approved_on'], name='chickreq_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chickrequest',
+            index=models.Index(fields=['request_date'], name='chickreq_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chickrequest',
+            index=models.Index(fields=['created_by', 'status'], name='chickreq_agent_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chickrequest',
+            index=models.Index(fields=['created_by', 'delivered'], name='chickreq_agent_delivered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chickrequest',
+            index=models.Index(fields=['chick_type', 'chick_breed', 'status'], name='chickreq_type_breed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chickrequest',
+            index=models.Index(condition=models.Q(('delivered', True)), fields=['id'], name='chickreq_delivered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chickstock',
+            index=models.Index(fields=['chick_type', 'chick_breed', 'updated_at'], name='chickstock_type_breed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['registration_date'], name='customer_registered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedallocation',
+            index=models.Index(fields=['status'], name='feedalloc_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedallocation',
+            index=models.Index(fields=['payment_status'], name='feedalloc_payment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedallocation',
+            index=models.Index(condition=models.Q(('delivered', True)), fields=['id'], name='feedalloc_delivered_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+# The search tables and their backfill as of this migration, frozen here so later changes to
+# ChicksApp.search don't rewrite history. Each kind is (columns, SELECT pk, columns... FROM source).
+SOURCES = {
+    'farmer': (
+        ['farmer_id', 'farmer_name', 'phone_number', 'nin', 'location'],
+        'SELECT c.id, c.farmer_id, c.farmer_name, c.phone_number, c.nin, c.location FROM "ChicksApp_customer" c',
+    ),
+    'chick_request': (
+        ['chick_request_id', 'farmer_name', 'farmer_id', 'agent'],
+        'SELECT r.id, r.chick_request_id, c.farmer_name, c.farmer_id, u.username FROM "ChicksApp_chickrequest" r '
+        'INNER JOIN "ChicksApp_customer" c ON r.farmer_id = c.id '
+        'LEFT OUTER JOIN "farmer_users" u ON r.created_by_id = u.id',
+    ),
+    'feed_allocation': (
+        ['feed_request_id', 'chick_request_id', 'farmer_name', 'feed_name'],
+        'SELECT a.id, a.feed_request_id, r.chick_request_id, c.farmer_name, a.feed_name FROM "ChicksApp_feedallocation" a '
+        'INNER JOIN "ChicksApp_chickrequest" r ON a.chick_request_id = r.id '
+        'INNER JOIN "ChicksApp_customer" c ON r.farmer_id = c.id',
+    ),
+}
+
+
+def sqlite_sql(kind, cols, source):
+    table = f'search_{kind}'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({', '.join(cols)}, tokenize='unicode61', prefix='2 3')",
+        f"INSERT INTO {table} (rowid, {', '.join(cols)}) {source}",
+    ]
+
+
+def postgresql_sql(kind, cols, source):
+    table = f'search_{kind}'
+    body = "lower(concat_ws(' ', {}))".format(', '.join(f's.{c}' for c in cols))
+    return [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        f'CREATE TABLE IF NOT EXISTS {table} (id bigint PRIMARY KEY, document tsvector NOT NULL, body text NOT NULL)',
+        f'CREATE INDEX IF NOT EXISTS {table}_document ON {table} USING gin (document)',
+        f'CREATE INDEX IF NOT EXISTS {table}_body ON {table} USING gin (body gin_trgm_ops)',
+        f"INSERT INTO {table} (id, document, body) SELECT s.pk, to_tsvector('simple', {body}), {body} "
+        f"FROM ({source}) AS s(pk, {', '.join(cols)})",
+    ]
+
+
+BUILDERS = {'sqlite': sqlite_sql, 'postgresql': postgresql_sql}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in BUILDERS:
+        raise NotImplementedError(f'No search backend for {vendor}')
+    for kind, (cols, source) in SOURCES.items():
+        for sql in BUILDERS[vendor](kind, cols, source):
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for kind in SOURCES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS search_{kind}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ChicksApp', '0015_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:50
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_stock_levels(apps, schema_editor):
+    ChickStock = apps.get_model('ChicksApp', 'ChickStock')
+    FeedStock = apps.get_model('ChicksApp', 'FeedStock')
+    StockLevel = apps.get_model('ChicksApp', 'StockLevel')
+    FeedStockLevel = apps.get_model('ChicksApp', 'FeedStockLevel')
+    StockLevel.objects.bulk_create([
+        StockLevel(chick_type=row['chick_type'], chick_breed=row['chick_breed'], quantity=row['total'] or 0)
+        for row in ChickStock.objects.order_by().values('chick_type', 'chick_breed').annotate(total=Sum('stock_quantity'))
+    ])
+    FeedStockLevel.objects.bulk_create([
+        FeedStockLevel(feed_name=row['feed_name'], feed_type=row['feed_type'], feed_brand=row['feed_brand'],
+                       quantity=row['total'] or 0)
+        for row in FeedStock.objects.order_by().values('feed_name', 'feed_type', 'feed_brand').annotate(total=Sum('feed_quantity'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ChicksApp', '0016_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedStockLevel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed_name', models.CharField(max_length=25)),
+                ('feed_type', models.CharField(max_length=25)),
+                ('feed_brand', models.CharField(max_length=25)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('feed_name', 'feed_type', 'feed_brand'), name='unique_feed_stock_level')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockLevel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chick_type', models.CharField(max_length=15)),
+                ('chick_breed', models.CharField(max_length=15)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('chick_type', 'chick_breed'), name='unique_stock_level')],
+            },
+        ),
+        migrations.RunPython(fill_stock_levels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ChicksApp', '0017_stock_levels'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='chickstock',
+            constraint=models.CheckConstraint(condition=models.Q(('stock_quantity__gte', 0)), name='chickstock_quantity_non_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedstock',
+            constraint=models.CheckConstraint(condition=models.Q(('feed_quantity__gte', 0)), name='feedstock_quantity_non_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedstocklevel',
+            constraint=models.CheckConstraint(condition=models.Q(('quantity__gte', 0)), name='feed_stock_level_non_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocklevel',
+            constraint=models.CheckConstraint(condition=models.Q(('quantity__gte', 0)), name='stock_level_non_negative'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ChicksApp', '0019_live_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rolled_through', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('chick_type', models.CharField(blank=True, max_length=15)),
+                ('chick_breed', models.CharField(blank=True, max_length=15)),
+                ('feed_type', models.CharField(blank=True, max_length=25)),
+                ('status', models.CharField(max_length=20)),
+                ('chick_requests', models.IntegerField(default=0)),
+                ('chick_delivered', models.IntegerField(default=0)),
+                ('feed_allocations', models.IntegerField(default=0)),
+                ('feed_delivered', models.IntegerField(default=0)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'agent', 'chick_type', 'chick_breed', 'feed_type', 'status'), name='unique_daily_activity')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('chick_type', models.CharField(blank=True, max_length=15)),
+                ('chick_breed', models.CharField(blank=True, max_length=15)),
+                ('feed_type', models.CharField(blank=True, max_length=25)),
+                ('chick_quantity', models.BigIntegerField(default=0)),
+                ('chick_amount', models.BigIntegerField(default=0)),
+                ('feed_quantity', models.BigIntegerField(default=0)),
+                ('feed_amount', models.BigIntegerField(default=0)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'agent', 'chick_type', 'chick_breed', 'feed_type'), name='unique_daily_sales')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:30
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_updated_at(apps, schema_editor):
+    # Until now the latest edit of a batch decided the current price
+    ChickStock = apps.get_model('ChicksApp', 'ChickStock')
+    ChickStock.objects.update(price_updated_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ChicksApp', '0020_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='chickstock',
+            name='chickstock_type_breed_idx',
+        ),
+        migrations.AddField(
+            model_name='chickstock',
+            name='price_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='chickstock',
+            index=models.Index(fields=['chick_type', 'chick_breed', 'price_updated_at'], name='chickstock_type_breed_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ChicksApp', '0021_chick_price_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='chickrequest',
+            name='chickreq_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='chickrequest',
+            index=models.Index(fields=['status', 'request_date', 'id'], name='chickreq_status_idx'),
+        ),
+    ]
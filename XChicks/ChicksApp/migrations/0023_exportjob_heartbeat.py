@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:46
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_started_at(apps, schema_editor):
+    # Jobs already running get their start as the last sign of life, so stuck ones can expire
+    ExportJob = apps.get_model('ChicksApp', 'ExportJob')
+    ExportJob.objects.filter(status='running').update(heartbeat_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ChicksApp', '0022_chickreq_status_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(copy_started_at, migrations.RunPython.noop),
+    ]
@@ -5,8 +5,67 @@ from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 import uuid
 
+# Business IDs look like FARMER-2025-0001; the numeric part keeps at least this many digits and
+# simply grows past it (the id columns hold up to 8 digits, i.e. 99,999,999 ids per year)
+BUSINESS_ID_MIN_DIGITS = 4
+
+
+def format_business_id(prefix, year, number):
+    return f'{prefix}-{year}-{number:0{BUSINESS_ID_MIN_DIGITS}d}'
+
+
+class IdSequence(models.Model):
+    # Per-prefix, per-year counter behind the FARMER-/REQ-/FEED- business ids
+    prefix = models.CharField(max_length=10)
+    year = models.PositiveIntegerField()
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['prefix', 'year'], name='unique_id_sequence'),
+        ]
+
+    def __str__(self):
+        return f"{self.prefix}-{self.year}: {self.last_value}"
+
+    @classmethod
+    def allocate(cls, prefix, count=1, year=None):
+        """Reserve ``count`` consecutive numbers for ``prefix``/``year`` and return them as formatted ids.
+
+        An ``F()`` increment UPDATE followed by a read-back, both in one transaction: the UPDATE's
+        row (SQLite: database) write lock keeps other callers out until commit, so none receive the
+        same number. The first call for a prefix/year creates the row after the highest id already
+        issued; losing that race falls back to the UPDATE. A block of ids costs the same as one.
+        """
+        year = year or timezone.now().year
+        with transaction.atomic():
+            seq = cls.objects.filter(prefix=prefix, year=year)
+            if not seq.update(last_value=models.F('last_value') + count):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(prefix=prefix, year=year, last_value=_highest_existing_number(prefix, year) + count)
+                except IntegrityError:
+                    # Another writer created the row first
+                    seq.update(last_value=models.F('last_value') + count)
+            last = seq.values_list('last_value', flat=True).get()
+        return [format_business_id(prefix, year, n) for n in range(last - count + 1, last + 1)]
+
+
+def _highest_existing_number(prefix, year):
+    # Only used the first time a prefix/year is seen, to continue after ids issued before the sequence existed
+    model, field = BUSINESS_ID_SOURCES[prefix]
+    highest = 0
+    for value in model.objects.filter(**{f'{field}__startswith': f'{prefix}-{year}-'}).values_list(field, flat=True).iterator():
+        try:
+            highest = max(highest, int(value.split('-')[-1]))
+        except (ValueError, IndexError):
+            continue
+    return highest
+
+
 class UserProfile(AbstractUser): #abstract user is the model that helps us store a superadmin
     ROLE_CHOICES = (
         ('farmer', 'farmer'),
@@ -40,10 +99,29 @@ class ChickStock(models.Model):
     chick_price = models.PositiveIntegerField(default=1650)  # Fixed price per assignment
     stock_quantity = models.PositiveIntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
+    # When chick_price was last set; the newest price is the current one (ledger.current_chick_price)
+    price_updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Stock lookups by type/breed; latest price first (ledger.current_chick_price)
+            models.Index(fields=['chick_type', 'chick_breed', 'price_updated_at'], name='chickstock_type_breed_idx'),
+        ]
+        constraints = [
+            # Backstop for the conditional decrements in stock_levels.py
+            models.CheckConstraint(condition=models.Q(stock_quantity__gte=0), name='chickstock_quantity_non_negative'),
+        ]
 
     def __str__(self):
         return f"{self.batch_name} - {self.chick_type} - {self.chick_breed}"
 
+    def save(self, *args, **kwargs):
+        # A price change also stamps price_updated_at (signals._stamp_price_change); keep it in partial saves
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'chick_price' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'price_updated_at'}
+        super().save(*args, **kwargs)
+
     def clean(self):
         if self.stock_quantity < 0:
             raise ValidationError('Stock quantity cannot be negative.')
@@ -61,6 +139,11 @@ class FeedStock(models.Model):
     supplier_contact = models.CharField(max_length=15, unique=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=models.Q(feed_quantity__gte=0), name='feedstock_quantity_non_negative'),
+        ]
+
     def __str__(self):
         return self.feed_name
 
@@ -68,9 +151,42 @@ class FeedStock(models.Model):
         if self.expiry_date < timezone.now().date():
             raise ValidationError('Expiry date cannot be in the past.')
 
+class StockLevel(models.Model):
+    # Chicks on hand per (type, breed), summed over ChickStock batches; kept current by stock_levels.py
+    chick_type = models.CharField(max_length=15)
+    chick_breed = models.CharField(max_length=15)
+    quantity = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chick_type', 'chick_breed'], name='unique_stock_level'),
+            models.CheckConstraint(condition=models.Q(quantity__gte=0), name='stock_level_non_negative'),
+        ]
+
+    def __str__(self):
+        return f"{self.chick_type}/{self.chick_breed}: {self.quantity}"
+
+class FeedStockLevel(models.Model):
+    # Bags on hand per feed product, summed over FeedStock lots; kept current by stock_levels.py
+    feed_name = models.CharField(max_length=25)
+    feed_type = models.CharField(max_length=25)
+    feed_brand = models.CharField(max_length=25)
+    quantity = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['feed_name', 'feed_type', 'feed_brand'], name='unique_feed_stock_level'),
+            models.CheckConstraint(condition=models.Q(quantity__gte=0), name='feed_stock_level_non_negative'),
+        ]
+
+    def __str__(self):
+        return f"{self.feed_name} ({self.feed_brand}): {self.quantity}"
+
 class Customer(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    farmer_id = models.CharField(max_length=16, unique=True, blank=True)
+    farmer_id = models.CharField(max_length=20, unique=True, blank=True)
     farmer_name = models.CharField(max_length=50)
     date_of_birth = models.DateField()
     # Age is now auto-calculated from date_of_birth; validators removed to allow any resulting age
@@ -90,6 +206,11 @@ class Customer(models.Model):
     sales_agent = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='registered_farmers')
     registration_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['registration_date'], name='customer_registered_idx'),
+        ]
+
     def __str__(self):
         return self.farmer_id
 
@@ -97,17 +218,7 @@ class Customer(models.Model):
         # Auto-generate farmer_id if not provided
         if not self.farmer_id:
             # Generate a unique farmer ID with format FARMER-YYYY-XXXX
-            year = timezone.now().year
-            last_farmer = Customer.objects.filter(farmer_id__startswith=f'FARMER-{year}').order_by('-farmer_id').first()
-            if last_farmer:
-                try:
-                    last_number = int(last_farmer.farmer_id.split('-')[-1])
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-            self.farmer_id = f'FARMER-{year}-{new_number:04d}'
+            self.farmer_id = IdSequence.allocate('FARMER')[0]
         
         # Auto-calculate age from date_of_birth
         if self.date_of_birth:
@@ -136,7 +247,7 @@ class ChickRequest(models.Model):
         ('completed', 'Completed'),
     )
     farmer = models.ForeignKey(Customer, on_delete=models.CASCADE)
-    chick_request_id = models.CharField(max_length=15, unique=True, blank=True)
+    chick_request_id = models.CharField(max_length=20, unique=True, blank=True)
     farmer_type = models.CharField(max_length=10, choices=[('starter', 'Starter'), ('returning', 'Returning')])
     chick_type = models.CharField(max_length=15, choices=[('layer', 'Layer'), ('broiler', 'Broiler')])
     chick_breed = models.CharField(max_length=15, choices=[('local', 'Local'), ('exotic', 'Exotic')])
@@ -156,6 +267,22 @@ class ChickRequest(models.Model):
     approved_on = models.DateTimeField(null=True, blank=True)
     delivered = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Status counts, and the status-filtered keyset listings (Deliveries, View Chick Requests)
+            # paged on (request_date, id) without a sort step
+            models.Index(fields=['status', 'request_date', 'id'], name='chickreq_status_idx'),
+            # Reports / exports date ranges
+            models.Index(fields=['request_date'], name='chickreq_date_idx'),
+            # Sales agent dashboard: own requests by status / delivery
+            models.Index(fields=['created_by', 'status'], name='chickreq_agent_status_idx'),
+            models.Index(fields=['created_by', 'delivered'], name='chickreq_agent_delivered_idx'),
+            # Approval and Reports filters by type/breed
+            models.Index(fields=['chick_type', 'chick_breed', 'status'], name='chickreq_type_breed_idx'),
+            # Delivered count; only a minority of rows, so keep it partial
+            models.Index(fields=['id'], condition=models.Q(delivered=True), name='chickreq_delivered_idx'),
+        ]
+
     def __str__(self):
         return self.chick_request_id
 
@@ -163,17 +290,7 @@ class ChickRequest(models.Model):
         # Auto-generate chick_request_id if not provided
         if not self.chick_request_id:
             # Generate a unique request ID with format REQ-YYYY-XXXX
-            year = timezone.now().year
-            last_request = ChickRequest.objects.filter(chick_request_id__startswith=f'REQ-{year}').order_by('-chick_request_id').first()
-            if last_request:
-                try:
-                    last_number = int(last_request.chick_request_id.split('-')[-1])
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-            self.chick_request_id = f'REQ-{year}-{new_number:04d}'
+            self.chick_request_id = IdSequence.allocate('REQ')[0]
         
         super().save(*args, **kwargs)
 
@@ -181,9 +298,10 @@ class ChickRequest(models.Model):
         # Removed validation for starter farmers to allow any quantity
         if self.farmer_type == 'returning' and self.quantity > 500:
             raise ValidationError('Returning farmers cannot request more than 500 chicks.')
-        # Check total stock availability across all matching stocks
-        qs = ChickStock.objects.filter(chick_type=self.chick_type, chick_breed=self.chick_breed)
-        available = sum(s.stock_quantity or 0 for s in qs)
+        # Check total stock availability across all matching stocks (one row of the level table)
+        available = StockLevel.objects.filter(
+            chick_type=self.chick_type, chick_breed=self.chick_breed,
+        ).values_list('quantity', flat=True).first() or 0
         if available < (self.quantity or 0):
             raise ValidationError('Requested quantity exceeds available stock.')
         # Check 4-month frequency
@@ -198,7 +316,7 @@ class FeedAllocation(models.Model):
         ('rejected', 'Rejected'),
         ('completed', 'Completed'),
     )
-    feed_request_id = models.CharField(max_length=15, unique=True, blank=True)
+    feed_request_id = models.CharField(max_length=20, unique=True, blank=True)
     feed_stock = models.ForeignKey(FeedStock, on_delete=models.CASCADE, null=True, blank=True)
     feed_name = models.CharField(max_length=25)
     feed_type = models.CharField(max_length=25)
@@ -215,32 +333,21 @@ class FeedAllocation(models.Model):
     )
     delivered = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status'], name='feedalloc_status_idx'),
+            models.Index(fields=['payment_status'], name='feedalloc_payment_idx'),
+            models.Index(fields=['id'], condition=models.Q(delivered=True), name='feedalloc_delivered_idx'),
+        ]
+
     def __str__(self):
         return self.feed_request_id
 
     def save(self, *args, **kwargs):
-        # Track previous payment status (for updates)
-        prev_payment = None
-        if self.pk:
-            try:
-                prev_payment = FeedAllocation.objects.only('payment_status').get(pk=self.pk).payment_status
-            except FeedAllocation.DoesNotExist:
-                prev_payment = None
-
         # Auto-generate feed_request_id if not provided
         if not self.feed_request_id:
             # Generate a unique feed request ID with format FEED-YYYY-XXXX
-            year = timezone.now().year
-            last_feed = FeedAllocation.objects.filter(feed_request_id__startswith=f'FEED-{year}').order_by('-feed_request_id').first()
-            if last_feed:
-                try:
-                    last_number = int(last_feed.feed_request_id.split('-')[-1])
-                    new_number = last_number + 1
-                except (ValueError, IndexError):
-                    new_number = 1
-            else:
-                new_number = 1
-            self.feed_request_id = f'FEED-{year}-{new_number:04d}'
+            self.feed_request_id = IdSequence.allocate('FEED')[0]
         
         # Auto-set payment_due_date to 2 months from now
         if not self.payment_due_date:
@@ -250,6 +357,178 @@ class FeedAllocation(models.Model):
         super().save(*args, **kwargs)
 
 
+# Prefix -> (model, field) for seeding IdSequence from ids issued before it existed
+BUSINESS_ID_SOURCES = {
+    'FARMER': (Customer, 'farmer_id'),
+    'REQ': (ChickRequest, 'chick_request_id'),
+    'FEED': (FeedAllocation, 'feed_request_id'),
+}
+
+
+class SaleLine(models.Model):
+    # One row per approved chick request / feed allocation, priced at approval time
+    KIND_CHOICES = (
+        ('chick', 'Chicks'),
+        ('feed', 'Feed'),
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    chick_request = models.ForeignKey(ChickRequest, on_delete=models.CASCADE, related_name='sale_lines')
+    feed_allocation = models.OneToOneField(FeedAllocation, on_delete=models.CASCADE, null=True, blank=True, related_name='sale_line')
+    item = models.CharField(max_length=40)
+    quantity = models.PositiveIntegerField()
+    unit_price = models.PositiveIntegerField()
+    amount = models.PositiveBigIntegerField()
+    # Copied from the chick request so date-range filters match the old request-date semantics
+    sale_date = models.DateTimeField(db_index=True)
+    approved_on = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chick_request'], condition=models.Q(kind='chick'), name='unique_chick_sale_line'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'sale_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} - {self.chick_request_id} - {self.amount}"
+
 
+class DashboardSnapshot(models.Model):
+    # Single-row counter table behind the manager dashboard; kept current by signals.py
+    total_users = models.PositiveIntegerField(default=0)
+    chick_stock = models.BigIntegerField(default=0)
+    feed_stock = models.BigIntegerField(default=0)
+    chick_pending = models.IntegerField(default=0)
+    chick_approved = models.IntegerField(default=0)
+    chick_rejected = models.IntegerField(default=0)
+    feed_pending = models.IntegerField(default=0)
+    feed_approved = models.IntegerField(default=0)
+    feed_rejected = models.IntegerField(default=0)
+    chick_delivered = models.IntegerField(default=0)
+    feed_delivered = models.IntegerField(default=0)
+    chick_awaiting_delivery = models.IntegerField(default=0)
+    feed_awaiting_delivery = models.IntegerField(default=0)
+    farmers_with_feeds = models.IntegerField(default=0)
+    payments_paid = models.IntegerField(default=0)
+    payments_pending = models.IntegerField(default=0)
+    total_sales = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
+    def __str__(self):
+        return f"Dashboard snapshot ({self.updated_at})"
 
+
+class DailyActivity(models.Model):
+    # Requests per day and key, behind the Reports charts, weekly summary and agent performance;
+    # maintained by rollups.py. Chick rows leave feed_type blank, feed rows leave chick_type/breed blank.
+    date = models.DateField()
+    agent = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    chick_type = models.CharField(max_length=15, blank=True)
+    chick_breed = models.CharField(max_length=15, blank=True)
+    feed_type = models.CharField(max_length=25, blank=True)
+    status = models.CharField(max_length=20)
+    chick_requests = models.IntegerField(default=0)
+    chick_delivered = models.IntegerField(default=0)
+    feed_allocations = models.IntegerField(default=0)
+    feed_delivered = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'agent', 'chick_type', 'chick_breed', 'feed_type', 'status'],
+                                    name='unique_daily_activity'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.agent_id} {self.status}"
+
+
+class DailySales(models.Model):
+    # Sale line totals per day (of the chick request) and key; maintained by rollups.py
+    date = models.DateField()
+    agent = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    chick_type = models.CharField(max_length=15, blank=True)
+    chick_breed = models.CharField(max_length=15, blank=True)
+    feed_type = models.CharField(max_length=25, blank=True)
+    chick_quantity = models.BigIntegerField(default=0)
+    chick_amount = models.BigIntegerField(default=0)
+    feed_quantity = models.BigIntegerField(default=0)
+    feed_amount = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'agent', 'chick_type', 'chick_breed', 'feed_type'],
+                                    name='unique_daily_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.agent_id}: {self.chick_amount + self.feed_amount}"
+
+
+class RollupState(models.Model):
+    # Single row: the last day folded into DailyActivity/DailySales (the high-water mark)
+    rolled_through = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Rolled up through {self.rolled_through or '-'}"
+
+
+class DataVersion(models.Model):
+    # Per-model change counter bumped on every save/delete; used to invalidate cached results
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class ExportJob(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    dataset = models.CharField(max_length=30)
+    format = models.CharField(max_length=10)
+    params = models.JSONField(default=dict, blank=True)
+    # Hash of dataset + format + normalized filters; identical requests share a file
+    signature = models.CharField(max_length=64, db_index=True)
+    # DataVersion counters of the source tables at enqueue time
+    data_version = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)
+    rows_written = models.PositiveIntegerField(default=0)
+    file_path = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Stamped by the worker with each progress write; a running job that stops stamping it is failed
+    # (jobs.expire_stale_jobs)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset}.{self.format} ({self.status})"
+
+    @property
+    def filename(self):
+        return f"{self.dataset}.{self.format}"
+
+
+class LiveEvent(models.Model):
+    # Outbox for live.DatabaseBroadcaster: events written with the change, polled by every worker
+    name = models.CharField(max_length=20)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
@@ -0,0 +1,115 @@
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+class KeysetPage:
+    """One page of a keyset-paginated listing; iterate it like a list of rows.
+
+    ``next_query``/``prev_query`` are ready-made query strings (other GET params kept) or ``None``.
+    """
+
+    def __init__(self, items, per_page, next_query=None, prev_query=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_query = next_query
+        self.prev_query = prev_query
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_query is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_query is not None
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, fields):
+    """Cursor token -> list of Python values, or ``None`` if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        return [f.to_python(v) for f, v in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def _beyond(keys, values, descending):
+    """Q for rows strictly after ``values`` in ``keys`` order, i.e. a row-value comparison spelled out."""
+    op = 'lt' if descending else 'gt'
+    q = Q()
+    for i, key in enumerate(keys):
+        term = Q(**{f'{key}__{op}': values[i]})
+        for prev_key, prev_value in zip(keys[:i], values[:i]):
+            term &= Q(**{prev_key: prev_value})
+        q |= term
+    return q
+
+
+def keyset_paginate(request, qs, keys=('request_date', 'id'), descending=True, prefix='',
+                    default_per_page=DEFAULT_PER_PAGE):
+    """Paginate ``qs`` on ``keys`` (unique together, non-null) using ``after``/``before`` cursors.
+
+    ``qs`` may also be a ``.values()`` queryset, as long as it selects the key fields.
+
+    Each page is one indexed range query of ``per_page + 1`` rows, so deep pages cost the same as the
+    first and no ``COUNT(*)`` is run. ``prefix`` namespaces the GET params when a page has several lists.
+    """
+    fields = [qs.model._meta.get_field(k) for k in keys]
+    after_param, before_param, size_param = f'{prefix}after', f'{prefix}before', f'{prefix}per_page'
+    try:
+        per_page = int(request.GET.get(size_param, default_per_page))
+    except ValueError:
+        per_page = default_per_page
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+
+    order = [f'-{k}' if descending else k for k in keys]
+    reverse = [k if descending else f'-{k}' for k in keys]
+    after = decode_cursor(request.GET.get(after_param, ''), fields)
+    before = decode_cursor(request.GET.get(before_param, ''), fields)
+
+    if before is not None:
+        # Walk backwards from the cursor, then flip back into display order
+        rows = list(qs.filter(_beyond(keys, before, not descending)).order_by(*reverse)[:per_page + 1])
+        has_prev = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        has_next = True
+    else:
+        page_qs = qs.filter(_beyond(keys, after, descending)) if after is not None else qs
+        rows = list(page_qs.order_by(*order)[:per_page + 1])
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after is not None
+
+    def query(param, row):
+        params = request.GET.copy()
+        params.pop(after_param, None)
+        params.pop(before_param, None)
+        params[param] = encode_cursor([row[f.attname] if isinstance(row, dict) else getattr(row, f.attname) for f in fields])
+        return '?' + params.urlencode()
+
+    return KeysetPage(
+        items,
+        per_page,
+        next_query=query(after_param, items[-1]) if has_next and items else None,
+        prev_query=query(before_param, items[0]) if has_prev and items else None,
+    )
@@ -0,0 +1,106 @@
+"""Run a page's independent read queries side by side from async views.
+
+Each query is a plain function that hits the database. They run in a bounded thread pool where
+every worker thread has its own connection, so a page needing a dozen aggregates waits about as long
+as its slowest query rather than the sum of all of them.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Worker threads, and so database connections, shared by every page in the process
+    'MAX_WORKERS': 8,
+    # Seconds a query may take (queueing included) before the page gives up on it
+    'TIMEOUT': 5.0,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_TIMED_OUT = object()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PARALLEL_QUERIES', {})}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(get_config()['MAX_WORKERS'], thread_name_prefix='parallel-query')
+        return _executor
+
+
+def _recycle_connections():
+    # Workers are long-lived and run one query at a time, so they keep their connections between calls
+    # even with CONN_MAX_AGE = 0 (reconnecting would repeat the connection setup, e.g. the SQLite
+    # PRAGMAs, for every query). Broken connections and ones past a non-zero CONN_MAX_AGE are closed
+    # as Django does between requests.
+    for conn in connections.all(initialized_only=True):
+        if conn.settings_dict['CONN_MAX_AGE'] == 0:
+            conn.close_at = None
+    close_old_connections()
+
+
+def _call(fn, used):
+    _recycle_connections()
+    used.extend(connections.all())
+    try:
+        return fn()
+    finally:
+        _recycle_connections()
+
+
+def _interrupt(used):
+    """Stop whatever the timed-out worker is running on its connections so it frees its thread."""
+    for conn in used:
+        raw = conn.connection
+        # sqlite3 has interrupt(), psycopg cancel(); both may be called from another thread
+        stop = getattr(raw, 'interrupt', None) or getattr(raw, 'cancel', None)
+        if stop is not None:
+            try:
+                stop()
+            except Exception as e:
+                logger.warning('Could not interrupt query on %s: %s', conn.alias, e)
+
+
+async def gather_queries(queries, timeout=None):
+    """Run ``queries`` ({name: callable}) concurrently; returns ``(results, timed_out)``.
+
+    A query still unfinished after ``timeout`` seconds (default ``PARALLEL_QUERIES['TIMEOUT']``) is
+    interrupted on the database; its result is ``None`` and its name is listed in ``timed_out``.
+    Context variables (e.g. read-replica routing) carry over into the worker threads.
+    """
+    timeout = get_config()['TIMEOUT'] if timeout is None else timeout
+    run = sync_to_async(_call, thread_sensitive=False, executor=_get_executor())
+
+    async def one(name, fn):
+        used = []
+        try:
+            return await asyncio.wait_for(run(fn, used), timeout)
+        except asyncio.TimeoutError:
+            _interrupt(used)
+            logger.warning('Query %r timed out after %ss', name, timeout)
+            return _TIMED_OUT
+
+    values = await asyncio.gather(*(one(name, fn) for name, fn in queries.items()))
+    results, timed_out = {}, []
+    for name, value in zip(queries, values):
+        if value is _TIMED_OUT:
+            timed_out.append(name)
+            value = None
+        results[name] = value
+    return results, timed_out
+
+
+def run_queries(queries):
+    """The same ``queries`` one after another in the calling thread, for sync code paths."""
+    return {name: fn() for name, fn in queries.items()}
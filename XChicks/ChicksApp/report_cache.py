@@ -0,0 +1,62 @@
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.utils import timezone
+
+from .versions import version_key
+
+REPORTS_CACHE = 'reports'
+# Data the Reports page reads (agents are listed by username); a write to any of them bumps its
+# version and so changes the key
+REPORT_MODELS = ('chickrequest', 'feedallocation', 'customer', 'chickstock', 'feedstock', 'userprofile')
+STATS_KEY = 'report_cache:{}'
+
+
+def report_cache_key(filters):
+    """Key from the non-empty filters, today's date (trends are relative to it) and the data versions."""
+    normalized = json.dumps({k: v for k, v in filters.items() if v}, sort_keys=True)
+    digest = hashlib.sha1(normalized.encode()).hexdigest()[:16]
+    return f"reports:{digest}:{timezone.localdate().isoformat()}:{version_key(REPORT_MODELS)}"
+
+
+async def acached_report(filters, build):
+    """Return the cached report context for ``filters``, computing it with ``build()`` on a miss.
+
+    ``build`` is a coroutine function returning ``(context, complete)``; incomplete contexts (some
+    query timed out) are served but not cached.
+    """
+    cache = caches[REPORTS_CACHE]
+    key = await sync_to_async(report_cache_key)(filters)
+    context = await cache.aget(key)
+    if context is not None:
+        await sync_to_async(_count)('hits')
+        return context
+    await sync_to_async(_count)('misses')
+    context, complete = await build()
+    if complete:
+        await cache.aset(key, context)
+    return context
+
+
+def _count(name):
+    # Kept in the default cache so report entries being evicted never drop the counters
+    stats = caches['default']
+    key = STATS_KEY.format(name)
+    stats.add(key, 0, timeout=None)
+    try:
+        stats.incr(key)
+    except ValueError:
+        stats.set(key, 1, timeout=None)
+
+
+def report_cache_stats():
+    stats = caches['default']
+    hits = stats.get(STATS_KEY.format('hits'), 0)
+    misses = stats.get(STATS_KEY.format('misses'), 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+    }
@@ -0,0 +1,91 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractIsoYear, ExtractWeek, TruncDate
+from django.utils import timezone
+
+# Each helper takes already-filtered ChickRequest / FeedAllocation querysets and returns
+# per-bucket counts from GROUP BY queries, so cost follows the number of buckets, not rows.
+# Feed allocations are bucketed by the date of their chick request, as on the Reports page.
+FEED_DATE = 'chick_request__request_date'
+
+
+def day_start(d):
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+
+def date_range(field, start=None, end=None):
+    """Filter kwargs for an inclusive ``date`` range on a datetime ``field``.
+
+    Unlike ``field__date__gte`` (which wraps the column in a function on SQLite), plain datetime
+    bounds let the index on ``field`` be used.
+    """
+    bounds = {}
+    if start:
+        bounds[f'{field}__gte'] = day_start(start)
+    if end:
+        bounds[f'{field}__lt'] = day_start(end + timedelta(days=1))
+    return bounds
+
+
+def _daily_counts(qs, field):
+    rows = qs.order_by().annotate(day=TruncDate(field)).values('day').annotate(c=Count('id')).order_by('-day')
+    return [(r['day'], r['c']) for r in rows]
+
+
+def activity_series(chick_qs, feed_qs):
+    """Ordered ``{'YYYY-MM-DD': {'chicks': n, 'feeds': n}}``, newest day first."""
+    buckets = {}
+    for day, c in _daily_counts(chick_qs, 'request_date'):
+        buckets.setdefault(day.strftime('%Y-%m-%d'), {'chicks': 0, 'feeds': 0})['chicks'] = c
+    for day, c in _daily_counts(feed_qs, FEED_DATE):
+        buckets.setdefault(day.strftime('%Y-%m-%d'), {'chicks': 0, 'feeds': 0})['feeds'] = c
+    return buckets
+
+
+def _weekly_counts(qs, field):
+    rows = qs.order_by().annotate(
+        iso_year=ExtractIsoYear(field), iso_week=ExtractWeek(field),
+    ).values('iso_year', 'iso_week').annotate(c=Count('id'))
+    return {(r['iso_year'], r['iso_week']): r['c'] for r in rows}
+
+
+def weekly_summary(chick_qs, feed_qs):
+    """``[{'label': 'YYYY-Www', 'chicks', 'feeds', 'total'}]`` in ISO week order."""
+    chicks = _weekly_counts(chick_qs, 'request_date')
+    feeds = _weekly_counts(feed_qs, FEED_DATE)
+    return [
+        {
+            'label': f"{y}-W{w:02d}",
+            'chicks': chicks.get((y, w), 0),
+            'feeds': feeds.get((y, w), 0),
+            'total': chicks.get((y, w), 0) + feeds.get((y, w), 0),
+        }
+        for (y, w) in sorted(set(chicks) | set(feeds))
+    ]
+
+
+def _agent_counts(qs, username_field):
+    return qs.order_by().values(username_field).annotate(
+        total=Count('id'),
+        approved=Count('id', filter=Q(status='approved')),
+        rejected=Count('id', filter=Q(status='rejected')),
+        delivered=Count('id', filter=Q(delivered=True)),
+    )
+
+
+def agent_performance(chick_qs, feed_qs=None):
+    """``[{'agent', 'total', 'approved', 'rejected', 'delivered'}]`` sorted by agent username.
+
+    Feed allocations count towards the agent who created their chick request.
+    """
+    perf = {}
+    sources = [(chick_qs, 'created_by__username')]
+    if feed_qs is not None:
+        sources.append((feed_qs, 'chick_request__created_by__username'))
+    for qs, field in sources:
+        for r in _agent_counts(qs, field):
+            d = perf.setdefault(r[field] or 'N/A', {'total': 0, 'approved': 0, 'rejected': 0, 'delivered': 0})
+            for k in d:
+                d[k] += r[k]
+    return [{'agent': k, **v} for k, v in sorted(perf.items())]
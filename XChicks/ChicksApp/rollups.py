@@ -0,0 +1,376 @@
+"""Daily rollups behind the Reports trends, weekly summary and agent performance.
+
+``DailyActivity`` counts requests and ``DailySales`` sums sale lines per (day, agent, chick type,
+chick breed, feed type). ``manage.py refresh_rollups`` folds the days after the high-water mark
+(``RollupState.rolled_through``) up to yesterday into them; from then on any write that touches a
+rolled-up day (a late approval or delivery, a deletion, a sale line) patches that day's rows through
+the model signals.
+
+Reads combine the rollups for the days up to the mark with a GROUP BY over the source rows after it
+(normally just today), so the figures are exact however long ago the command last ran. Filters the
+rollup key cannot answer (farmer, search text) are left to the source queries in ``reporting.py``.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ChickRequest, DailyActivity, DailySales, FeedAllocation, RollupState, SaleLine
+from .reporting import FEED_DATE, activity_series as source_activity, agent_performance as source_agents
+from .reporting import date_range, weekly_summary as source_weekly
+
+STATE_PK = 1
+
+# Key and counter columns of each rollup table
+KEYS = {
+    DailyActivity: ('date', 'agent_id', 'chick_type', 'chick_breed', 'feed_type', 'status'),
+    DailySales: ('date', 'agent_id', 'chick_type', 'chick_breed', 'feed_type'),
+}
+COLUMNS = {
+    DailyActivity: ('chick_requests', 'chick_delivered', 'feed_allocations', 'feed_delivered'),
+    DailySales: ('chick_quantity', 'chick_amount', 'feed_quantity', 'feed_amount'),
+}
+
+# Report filters the rollup key can answer
+ROLLUP_FILTERS = ('start', 'end', 'chick_type', 'chick_breed', 'feed_type', 'status', 'agent')
+
+
+# What a single source row adds to a rollup table: ``{key: {column: n}}``. Deltas on save are new - old.
+def _chick_request_rows(r):
+    key = (timezone.localdate(r.request_date), r.created_by_id, r.chick_type, r.chick_breed, '', r.status)
+    return {key: {'chick_requests': 1, 'chick_delivered': int(bool(r.delivered))}}
+
+
+def _feed_allocation_rows(a):
+    r = a.chick_request
+    key = (timezone.localdate(r.request_date), r.created_by_id, '', '', a.feed_type, a.status)
+    return {key: {'feed_allocations': 1, 'feed_delivered': int(bool(a.delivered))}}
+
+
+def _sale_line_rows(line):
+    r, day = line.chick_request, timezone.localdate(line.sale_date)
+    if line.kind == 'feed':
+        feed_type = line.feed_allocation.feed_type if line.feed_allocation_id else ''
+        return {(day, r.created_by_id, '', '', feed_type): {'feed_quantity': line.quantity, 'feed_amount': line.amount}}
+    return {(day, r.created_by_id, r.chick_type, r.chick_breed, ''): {'chick_quantity': line.quantity, 'chick_amount': line.amount}}
+
+
+# Source model -> (rollup table, contribution, relations the contribution reads)
+ROLLUPS = {
+    ChickRequest: (DailyActivity, _chick_request_rows, ()),
+    FeedAllocation: (DailyActivity, _feed_allocation_rows, ('chick_request',)),
+    SaleLine: (DailySales, _sale_line_rows, ('chick_request', 'feed_allocation')),
+}
+
+
+def contribution(obj):
+    return ROLLUPS[type(obj)][1](obj)
+
+
+def diff_rows(old, new):
+    delta = {key: dict(cols) for key, cols in new.items()}
+    for key, cols in old.items():
+        d = delta.setdefault(key, {})
+        for c, n in cols.items():
+            d[c] = d.get(c, 0) - n
+    return delta
+
+
+def add_rows(total, rows):
+    for key, cols in rows.items():
+        d = total.setdefault(key, {})
+        for c, n in cols.items():
+            d[c] = d.get(c, 0) + n
+    return total
+
+
+def rolled_through():
+    """The high-water mark: the last day held in the rollups, or ``None`` before the first run."""
+    return RollupState.objects.filter(pk=STATE_PK).values_list('rolled_through', flat=True).first()
+
+
+def adjust(source_model, delta):
+    """Add ``delta`` ({key: {column: n}}) to the rollup rows of days already rolled up.
+
+    Days after the mark are not stored yet and are skipped. Runs in the caller's transaction; writes
+    that bypass model signals (``QuerySet.update``/``bulk_create``) must call this themselves.
+    """
+    delta = {key: {c: n for c, n in cols.items() if n} for key, cols in delta.items()}
+    delta = {key: cols for key, cols in delta.items() if cols}
+    if not delta:
+        return
+    # Read after the source write, so a concurrent refresh has either committed its new mark or
+    # has yet to read this row
+    mark = rolled_through()
+    if mark is None:
+        return
+    rollup_model = ROLLUPS[source_model][0]
+    keys = KEYS[rollup_model]
+    for key, cols in delta.items():
+        if key[0] > mark:
+            continue
+        match = dict(zip(keys, key))
+        changes = {c: F(c) + n for c, n in cols.items()}
+        if rollup_model.objects.filter(**match).update(**changes):
+            continue
+        # First row for this key on a rolled-up day
+        try:
+            with transaction.atomic():
+                rollup_model.objects.create(**match, **cols)
+        except IntegrityError:
+            # Another writer created it first
+            rollup_model.objects.filter(**match).update(**changes)
+
+
+# --- Maintenance ---
+def compute_activity(start=None, end=None):
+    """DailyActivity rows (``{key: {column: n}}``) recomputed from the source for ``start``..``end``."""
+    rows = {}
+    chicks = ChickRequest.objects.filter(**date_range('request_date', start, end)).order_by().annotate(
+        day=TruncDate('request_date'),
+    ).values_list('day', 'created_by_id', 'chick_type', 'chick_breed', 'status').annotate(
+        n=Count('id'), delivered=Count('id', filter=Q(delivered=True)),
+    )
+    for day, agent, chick_type, chick_breed, status, n, delivered in chicks:
+        add_rows(rows, {(day, agent, chick_type, chick_breed, '', status): {'chick_requests': n, 'chick_delivered': delivered}})
+    feeds = FeedAllocation.objects.filter(**date_range(FEED_DATE, start, end)).order_by().annotate(
+        day=TruncDate(FEED_DATE),
+    ).values_list('day', 'chick_request__created_by_id', 'feed_type', 'status').annotate(
+        n=Count('id'), delivered=Count('id', filter=Q(delivered=True)),
+    )
+    for day, agent, feed_type, status, n, delivered in feeds:
+        add_rows(rows, {(day, agent, '', '', feed_type, status): {'feed_allocations': n, 'feed_delivered': delivered}})
+    return rows
+
+
+def compute_sales(start=None, end=None):
+    """DailySales rows recomputed from the sale lines for ``start``..``end``."""
+    rows = {}
+    lines = SaleLine.objects.filter(**date_range('sale_date', start, end)).order_by().annotate(
+        day=TruncDate('sale_date'),
+    ).values_list(
+        'day', 'chick_request__created_by_id', 'kind', 'chick_request__chick_type', 'chick_request__chick_breed',
+        'feed_allocation__feed_type',
+    ).annotate(quantity=Sum('quantity'), amount=Sum('amount'))
+    for day, agent, kind, chick_type, chick_breed, feed_type, quantity, amount in lines:
+        if kind == 'feed':
+            key, cols = (day, agent, '', '', feed_type or ''), {'feed_quantity': quantity, 'feed_amount': amount}
+        else:
+            key, cols = (day, agent, chick_type, chick_breed, ''), {'chick_quantity': quantity, 'chick_amount': amount}
+        add_rows(rows, {key: cols})
+    return rows
+
+
+COMPUTE = {DailyActivity: compute_activity, DailySales: compute_sales}
+
+
+def _write(rollup_model, rows):
+    keys = KEYS[rollup_model]
+    rollup_model.objects.bulk_create(
+        [rollup_model(**dict(zip(keys, key)), **cols) for key, cols in rows.items() if any(cols.values())],
+        batch_size=500,
+    )
+
+
+def _lock_state():
+    # Writing the row first takes the write lock on SQLite (select_for_update is a no-op there), so
+    # no request write can commit between reading the source rows and moving the mark
+    if not RollupState.objects.filter(pk=STATE_PK).update(updated_at=timezone.now()):
+        RollupState.objects.get_or_create(pk=STATE_PK)
+    return RollupState.objects.select_for_update().get(pk=STATE_PK)
+
+
+def roll_forward(through=None):
+    """Fold the days after the mark up to ``through`` (default yesterday) into the rollups.
+
+    Returns ``(first, last)`` day rolled, or ``None`` if the rollups were already up to date. Only the
+    source rows of those days are read, so a daily run costs one day of rows.
+    """
+    through = through or timezone.localdate() - timedelta(days=1)
+    with transaction.atomic():
+        state = _lock_state()
+        mark = state.rolled_through
+        if mark is not None and mark >= through:
+            return None
+        start = mark + timedelta(days=1) if mark else None
+        for rollup_model, compute in COMPUTE.items():
+            # Nothing after the mark is ever patched; clear leftovers of an interrupted run anyway
+            rollup_model.objects.filter(**({'date__gt': mark} if mark else {})).delete()
+            _write(rollup_model, compute(start, through))
+        state.rolled_through = through
+        state.save()
+    return start, through
+
+
+def rebuild_rollups(fix=True):
+    """Recompute every rolled-up day from the source tables; returns ``drift``.
+
+    ``drift`` maps ``(table name, key)`` to ``(stored, actual)`` column dicts for every row that was
+    off. With ``fix=False`` nothing is written.
+    """
+    drift = {}
+    with transaction.atomic():
+        mark = _lock_state().rolled_through
+        if mark is None:
+            return drift
+        for rollup_model, compute in COMPUTE.items():
+            keys, columns = KEYS[rollup_model], COLUMNS[rollup_model]
+            actual = {key: {c: cols.get(c, 0) for c in columns} for key, cols in compute(None, mark).items()}
+            stored = {}
+            for row in rollup_model.objects.filter(date__lte=mark).values_list(*keys, *columns):
+                add_rows(stored, {row[:len(keys)]: dict(zip(columns, row[len(keys):]))})
+            zero = dict.fromkeys(columns, 0)
+            found = {
+                (rollup_model.__name__, key): (stored.get(key, zero), actual.get(key, zero))
+                for key in stored.keys() | actual.keys()
+                if stored.get(key, zero) != actual.get(key, zero)
+            }
+            if found and fix:
+                rollup_model.objects.all().delete()
+                _write(rollup_model, actual)
+            drift.update(found)
+    return drift
+
+
+# --- Reads ---
+def covers(filters):
+    """Whether the Reports ``filters`` can be answered from the rollups."""
+    return not any(v for k, v in filters.items() if k not in ROLLUP_FILTERS)
+
+
+def split(start, end, mark):
+    """``(rolled, after)``: the parts of ``start``..``end`` held in the rollups and after the mark.
+
+    Either is ``None`` when empty; otherwise a ``(start, end)`` pair where ``None`` is open-ended.
+    """
+    if mark is None:
+        return None, (start, end)
+    rolled = (start, min(end, mark) if end else mark) if not start or start <= mark else None
+    after = (max(start, mark + timedelta(days=1)) if start else mark + timedelta(days=1), end) if not end or end > mark else None
+    return rolled, after
+
+
+def _activity_rows(rolled, filters):
+    """DailyActivity rows for the ``rolled`` days matching ``filters``, plus the chick and feed parts of them."""
+    start, end = rolled
+    qs = DailyActivity.objects.order_by().filter(date__lte=end)
+    if start:
+        qs = qs.filter(date__gte=start)
+    if filters['status']:
+        qs = qs.filter(status=filters['status'])
+    if filters['agent']:
+        qs = qs.filter(agent_id=filters['agent'])
+    chick, feed = Q(), Q()
+    if filters['chick_type']:
+        chick &= Q(chick_type=filters['chick_type'])
+    if filters['chick_breed']:
+        chick &= Q(chick_breed=filters['chick_breed'])
+    if filters['feed_type']:
+        feed &= Q(feed_type=filters['feed_type'])
+    return qs, chick or None, feed or None
+
+
+def _after(qs, field, after):
+    return qs.filter(**date_range(field, *after))
+
+
+def activity_series(filters, chick_qs, feed_qs):
+    """``reporting.activity_series`` for Reports ``filters`` (dates parsed), from the rollups.
+
+    ``chick_qs``/``feed_qs`` are the same filtered querysets the source version takes; they are
+    only read for the days after the mark.
+    """
+    rolled, after = split(filters['start'], filters['end'], rolled_through())
+    buckets = {}
+    if after:
+        buckets.update(source_activity(_after(chick_qs, 'request_date', after), _after(feed_qs, FEED_DATE, after)))
+    if rolled:
+        qs, chick, feed = _activity_rows(rolled, filters)
+        rows = qs.values('date').annotate(
+            chicks=Sum('chick_requests', filter=chick), feeds=Sum('feed_allocations', filter=feed),
+        ).order_by('-date')
+        for r in rows:
+            if r['chicks'] or r['feeds']:
+                buckets[r['date'].strftime('%Y-%m-%d')] = {'chicks': r['chicks'] or 0, 'feeds': r['feeds'] or 0}
+    return buckets
+
+
+def weekly_summary(filters, chick_qs, feed_qs):
+    """``reporting.weekly_summary`` for Reports ``filters``, from the rollups."""
+    rolled, after = split(filters['start'], filters['end'], rolled_through())
+    weeks = {}
+    if after:
+        weeks = {w['label']: w for w in source_weekly(_after(chick_qs, 'request_date', after), _after(feed_qs, FEED_DATE, after))}
+    if rolled:
+        qs, chick, feed = _activity_rows(rolled, filters)
+        # Sum per day in the database (one row per day) and bucket the days into ISO weeks here
+        rows = qs.values('date').annotate(
+            chicks=Sum('chick_requests', filter=chick), feeds=Sum('feed_allocations', filter=feed),
+        )
+        for r in rows:
+            if not (r['chicks'] or r['feeds']):
+                continue
+            iso_year, iso_week, _ = r['date'].isocalendar()
+            # A week can straddle the mark
+            w = weeks.setdefault(f'{iso_year}-W{iso_week:02d}', {'chicks': 0, 'feeds': 0, 'total': 0})
+            w['chicks'] += r['chicks'] or 0
+            w['feeds'] += r['feeds'] or 0
+            w['total'] = w['chicks'] + w['feeds']
+    return [{'label': label, **{k: w[k] for k in ('chicks', 'feeds', 'total')}} for label, w in sorted(weeks.items())]
+
+
+def agent_performance(filters, chick_qs, feed_qs):
+    """``reporting.agent_performance`` for Reports ``filters``, from the rollups."""
+    rolled, after = split(filters['start'], filters['end'], rolled_through())
+    perf = {}
+    if after:
+        perf = {r.pop('agent'): r for r in source_agents(_after(chick_qs, 'request_date', after), _after(feed_qs, FEED_DATE, after))}
+    if rolled:
+        qs, chick, feed = _activity_rows(rolled, filters)
+        annotations = {}
+        for kind, column, delivered, match in (('chick', 'chick_requests', 'chick_delivered', chick),
+                                               ('feed', 'feed_allocations', 'feed_delivered', feed)):
+            match = match or Q()
+            annotations.update({
+                f'{kind}_total': Sum(column, filter=match or None),
+                f'{kind}_approved': Sum(column, filter=match & Q(status='approved')),
+                f'{kind}_rejected': Sum(column, filter=match & Q(status='rejected')),
+                f'{kind}_delivered': Sum(delivered, filter=match or None),
+            })
+        for r in qs.values('agent__username').annotate(**annotations):
+            counts = {k: (r[f'chick_{k}'] or 0) + (r[f'feed_{k}'] or 0) for k in ('total', 'approved', 'rejected', 'delivered')}
+            if not counts['total']:
+                continue
+            d = perf.setdefault(r['agent__username'] or 'N/A', {'total': 0, 'approved': 0, 'rejected': 0, 'delivered': 0})
+            for k in d:
+                d[k] += counts[k]
+    return [{'agent': k, **v} for k, v in sorted(perf.items())]
+
+
+def request_totals(start=None, end=None):
+    """``(chick requests, feed allocations)`` dated ``start``..``end``, over every agent and type."""
+    rolled, after = split(start, end, rolled_through())
+    chicks = feeds = 0
+    if rolled:
+        qs = DailyActivity.objects.filter(date__lte=rolled[1], **({'date__gte': rolled[0]} if rolled[0] else {}))
+        row = qs.aggregate(chicks=Sum('chick_requests'), feeds=Sum('feed_allocations'))
+        chicks, feeds = row['chicks'] or 0, row['feeds'] or 0
+    if after:
+        chicks += _after(ChickRequest.objects, 'request_date', after).count()
+        feeds += _after(FeedAllocation.objects, FEED_DATE, after).count()
+    return chicks, feeds
+
+
+def sales_amount(start=None, end=None):
+    """Sales (chick and feed sale lines) dated ``start``..``end``; the rollup version of ``ledger.sale_lines``."""
+    rolled, after = split(start, end, rolled_through())
+    total = 0
+    if rolled:
+        qs = DailySales.objects.filter(date__lte=rolled[1], **({'date__gte': rolled[0]} if rolled[0] else {}))
+        row = qs.aggregate(chicks=Sum('chick_amount'), feeds=Sum('feed_amount'))
+        total = (row['chicks'] or 0) + (row['feeds'] or 0)
+    if after:
+        total += _after(SaleLine.objects, 'sale_date', after).aggregate(total=Sum('amount'))['total'] or 0
+    return total
@@ -0,0 +1,172 @@
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ALIAS': 'replica',
+    # Views fall back to the primary when the replica is further behind than this
+    'MAX_LAG_SECONDS': 30,
+    # Replica health (reachable + lag) is re-checked at most this often per process
+    'CHECK_INTERVAL': 5,
+}
+
+# Always read these from the primary: rows a request may have just written
+PRIMARY_ONLY_APPS = {'sessions'}
+PRIMARY_ONLY_MODELS = {'exportjob'}
+
+
+class _Routing:
+    # Per-request routing state; ``wrote`` pins the rest of the request to the primary
+    __slots__ = ('alias', 'wrote')
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.wrote = False
+
+
+_routing = ContextVar('db_routing', default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'READ_REPLICA', {})}
+
+
+class ReplicaRouter:
+    """Send reads to the replica inside :func:`use_replica` views until the request writes anything."""
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or state.wrote:
+            return None
+        if model._meta.app_label in PRIMARY_ONLY_APPS or model._meta.model_name in PRIMARY_ONLY_MODELS:
+            return DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        dbs = {DEFAULT_DB_ALIAS, get_config()['ALIAS']}
+        if obj1._state.db in dbs and obj2._state.db in dbs:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary (replication, or manage.py sync_replica)
+        if db == get_config()['ALIAS']:
+            return False
+        return None
+
+
+# --- Replica health ---
+_health = {}
+_health_lock = threading.Lock()
+
+
+def replica_lag(alias):
+    """Seconds the replica is behind the primary (0 when caught up)."""
+    conn = connections[alias]
+    if conn.vendor == 'postgresql':
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+                "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+            )
+            return float(cursor.fetchone()[0] or 0)
+    # A copied SQLite file: caught up while its change counters match the primary's, otherwise
+    # as old as the copy
+    from .models import DataVersion
+    primary = dict(DataVersion.objects.using(DEFAULT_DB_ALIAS).values_list('name', 'version'))
+    replica = dict(DataVersion.objects.using(alias).values_list('name', 'version'))
+    if primary == replica:
+        return 0.0
+    name = conn.settings_dict['NAME']
+    return time.time() - os.path.getmtime(name) if os.path.exists(name) else float('inf')
+
+
+def replica_available(alias=None, max_lag=None):
+    """Whether reads may go to the replica: configured, reachable and within ``max_lag`` seconds."""
+    config = get_config()
+    alias = alias or config['ALIAS']
+    if alias not in connections.settings:
+        return False
+    max_lag = config['MAX_LAG_SECONDS'] if max_lag is None else max_lag
+    now = time.monotonic()
+    with _health_lock:
+        checked_at, lag = _health.get(alias, (None, None))
+        if checked_at is None or now - checked_at >= config['CHECK_INTERVAL']:
+            try:
+                lag = replica_lag(alias)
+            except (DatabaseError, OSError) as e:
+                logger.warning('Replica %s unavailable, reading from %s: %s', alias, DEFAULT_DB_ALIAS, e)
+                lag = None
+            _health[alias] = (now, lag)
+    return lag is not None and lag <= max_lag
+
+
+def _stream_with(state, iterator):
+    # Streamed bodies are read after the view returns; keep routing their queries the same way
+    iterator = iter(iterator)
+    while True:
+        token = _routing.set(state)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _routing.reset(token)
+        yield chunk
+
+
+def use_replica(view=None, *, alias=None, max_lag=None):
+    """View decorator: serve the view's reads from the read replica.
+
+    Falls back to the primary when no replica is configured or it lags more than ``max_lag`` seconds
+    (default ``READ_REPLICA['MAX_LAG_SECONDS']``); after the first write the rest of the request
+    reads from the primary too. Use as ``@use_replica`` or ``@use_replica(max_lag=5)``.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def awrapped(request, *args, **kwargs):
+                target = alias or get_config()['ALIAS']
+                if not await sync_to_async(replica_available)(target, max_lag):
+                    return await view_func(request, *args, **kwargs)
+                # Coroutines and the threads sync_to_async hands work to see the same routing state
+                token = _routing.set(_Routing(target))
+                try:
+                    return await view_func(request, *args, **kwargs)
+                finally:
+                    _routing.reset(token)
+            return awrapped
+
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            target = alias or get_config()['ALIAS']
+            if not replica_available(target, max_lag):
+                return view_func(request, *args, **kwargs)
+            state = _Routing(target)
+            token = _routing.set(state)
+            try:
+                response = view_func(request, *args, **kwargs)
+            finally:
+                _routing.reset(token)
+            if getattr(response, 'streaming', False):
+                response.streaming_content = _stream_with(state, response.streaming_content)
+            return response
+        return wrapped
+
+    return decorator(view) if view is not None else decorator
@@ -0,0 +1,192 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import ChickRequest, Customer, FeedAllocation
+
+# Search documents, one table per kind keyed by the source row's pk. Each entry is
+# (model, [(column, lookup on the model)]); lookups may follow relations.
+SEARCH_SOURCES = {
+    'farmer': (Customer, [
+        ('farmer_id', 'farmer_id'),
+        ('farmer_name', 'farmer_name'),
+        ('phone_number', 'phone_number'),
+        ('nin', 'nin'),
+        ('location', 'location'),
+    ]),
+    'chick_request': (ChickRequest, [
+        ('chick_request_id', 'chick_request_id'),
+        ('farmer_name', 'farmer__farmer_name'),
+        ('farmer_id', 'farmer__farmer_id'),
+        ('agent', 'created_by__username'),
+    ]),
+    'feed_allocation': (FeedAllocation, [
+        ('feed_request_id', 'feed_request_id'),
+        ('chick_request_id', 'chick_request__chick_request_id'),
+        ('farmer_name', 'chick_request__farmer__farmer_name'),
+        ('feed_name', 'feed_name'),
+    ]),
+}
+INDEX_CHUNK_SIZE = 2000
+
+_TOKEN = re.compile(r'\w+')
+
+
+def table_name(kind):
+    return f'search_{kind}'
+
+
+def _tokens(query):
+    return _TOKEN.findall((query or '').lower())
+
+
+def _source_sql(kind, pks=None):
+    """``SELECT pk, col...`` for the documents of ``kind`` (optionally only ``pks``), as (sql, params)."""
+    model, columns = SEARCH_SOURCES[kind]
+    qs = model._default_manager.order_by()
+    if pks is not None:
+        qs = qs.filter(pk__in=list(pks))
+    return qs.values_list('pk', *[lookup for _, lookup in columns]).query.sql_with_params()
+
+
+class SqliteBackend:
+    """FTS5 tables (unicode61 tokens with prefix indexes); rowid is the source pk."""
+
+    def create(self, cursor, kind):
+        cols = ', '.join(col for col, _ in SEARCH_SOURCES[kind][1])
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table_name(kind)} "
+            f"USING fts5({cols}, tokenize='unicode61', prefix='2 3')"
+        )
+
+    def drop(self, cursor, kind):
+        cursor.execute(f'DROP TABLE IF EXISTS {table_name(kind)}')
+
+    def write(self, cursor, kind, sql, params):
+        cols = ', '.join(col for col, _ in SEARCH_SOURCES[kind][1])
+        cursor.execute(f'INSERT INTO {table_name(kind)} (rowid, {cols}) SELECT * FROM ({sql})', params)
+
+    def delete(self, cursor, kind, pks):
+        cursor.execute(f'DELETE FROM {table_name(kind)} WHERE rowid IN ({", ".join(["%s"] * len(pks))})', list(pks))
+
+    def clear(self, cursor, kind):
+        cursor.execute(f'DELETE FROM {table_name(kind)}')
+
+    def match(self, kind, query):
+        # Every token must match, each as a prefix: "far 00" finds "Farmer ... 0042"
+        expr = ' '.join(f'"{t}"*' for t in _tokens(query))
+        return f'SELECT rowid FROM {table_name(kind)} WHERE {table_name(kind)} MATCH %s', [expr]
+
+
+class PostgresBackend:
+    """Plain tables with a ``tsvector`` (prefix tsquery) and a trigram-indexed text body.
+
+    The trigram match catches fragments inside ids (``0042`` in ``REQ-2025-0042``) like ``icontains`` did.
+    """
+
+    def create(self, cursor, kind):
+        table = table_name(kind)
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {table} (id bigint PRIMARY KEY, document tsvector NOT NULL, body text NOT NULL)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {table}_document ON {table} USING gin (document)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {table}_body ON {table} USING gin (body gin_trgm_ops)')
+
+    def drop(self, cursor, kind):
+        cursor.execute(f'DROP TABLE IF EXISTS {table_name(kind)}')
+
+    def write(self, cursor, kind, sql, params):
+        cols = [col for col, _ in SEARCH_SOURCES[kind][1]]
+        body = "lower(concat_ws(' ', {}))".format(', '.join(f's.{c}' for c in cols))
+        cursor.execute(
+            f"INSERT INTO {table_name(kind)} (id, document, body) "
+            f"SELECT s.pk, to_tsvector('simple', {body}), {body} FROM ({sql}) AS s(pk, {', '.join(cols)}) "
+            f"ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document, body = EXCLUDED.body",
+            params,
+        )
+
+    def delete(self, cursor, kind, pks):
+        cursor.execute(f'DELETE FROM {table_name(kind)} WHERE id = ANY(%s)', [list(pks)])
+
+    def clear(self, cursor, kind):
+        cursor.execute(f'TRUNCATE {table_name(kind)}')
+
+    def _tsquery(self, query):
+        return ' & '.join(f'{t}:*' for t in _tokens(query))
+
+    def _pattern(self, query):
+        text = query.strip().lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f'%{text}%'
+
+    def match(self, kind, query):
+        return (
+            f"SELECT id FROM {table_name(kind)} WHERE document @@ to_tsquery('simple', %s) OR body LIKE %s",
+            [self._tsquery(query), self._pattern(query)],
+        )
+
+
+BACKENDS = {'sqlite': SqliteBackend(), 'postgresql': PostgresBackend()}
+
+
+def get_backend(conn=None):
+    vendor = (conn or connection).vendor
+    try:
+        return BACKENDS[vendor]
+    except KeyError:
+        raise NotImplementedError(f'No search backend for {vendor}')
+
+
+# --- Index maintenance ---
+def create_tables(conn=None):
+    backend = get_backend(conn)
+    with (conn or connection).cursor() as cursor:
+        for kind in SEARCH_SOURCES:
+            backend.create(cursor, kind)
+
+
+def drop_tables(conn=None):
+    backend = get_backend(conn)
+    with (conn or connection).cursor() as cursor:
+        for kind in SEARCH_SOURCES:
+            backend.drop(cursor, kind)
+
+
+def index_rows(kind, pks):
+    """(Re)index the given source rows; rows that no longer exist are dropped from the index."""
+    pks = list(pks)
+    if not pks:
+        return
+    backend = get_backend()
+    with connection.cursor() as cursor:
+        for i in range(0, len(pks), INDEX_CHUNK_SIZE):
+            chunk = pks[i:i + INDEX_CHUNK_SIZE]
+            backend.delete(cursor, kind, chunk)
+            backend.write(cursor, kind, *_source_sql(kind, chunk))
+
+
+def unindex_rows(kind, pks):
+    pks = list(pks)
+    if pks:
+        with connection.cursor() as cursor:
+            get_backend().delete(cursor, kind, pks)
+
+
+def rebuild(kinds=None, conn=None):
+    """Refill the index tables from the source tables in one INSERT ... SELECT each."""
+    backend = get_backend(conn)
+    with (conn or connection).cursor() as cursor:
+        for kind in kinds or SEARCH_SOURCES:
+            backend.clear(cursor, kind)
+            backend.write(cursor, kind, *_source_sql(kind))
+
+
+# --- Queries ---
+def search_filter(qs, kind, query):
+    """Restrict ``qs`` to rows whose ``kind`` document matches ``query`` (all tokens, as prefixes).
+
+    The queryset keeps its own ordering; a query with no searchable tokens matches nothing.
+    """
+    if not _tokens(query):
+        return qs.none()
+    sql, params = get_backend().match(kind, query)
+    return qs.filter(pk__in=RawSQL(sql, params))
@@ -0,0 +1,242 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.utils import timezone
+
+from . import dashboard, live, rollups, search, stock_levels, versions
+from .models import ChickRequest, ChickStock, Customer, FeedAllocation
+
+
+# --- The row as stored before a save ---
+# Loaded once per save, ahead of the pre_save handlers below that diff against it
+def _load_stored_row(sender, instance, **kwargs):
+    instance._stored_row = None
+    if instance.pk and not instance._state.adding:
+        stored = sender.objects.filter(pk=instance.pk)
+        related = rollups.ROLLUPS[sender][2] if sender in rollups.ROLLUPS else ()
+        if related:
+            # What the rollup contribution reads (an empty select_related() would follow every FK)
+            stored = stored.select_related(*related)
+        instance._stored_row = stored.first()
+
+
+for _model in {*dashboard.CONTRIBUTIONS, *stock_levels.LEVELS, *rollups.ROLLUPS}:
+    pre_save.connect(_load_stored_row, sender=_model, dispatch_uid=f'stored_row_{_model._meta.model_name}')
+
+
+# --- Current chick price (ledger.current_chick_price) ---
+def _stamp_price_change(sender, instance, **kwargs):
+    # Only a price change makes this batch's price the current one; views assign raw POST strings
+    old = instance._stored_row
+    if old is not None and old.chick_price != sender._meta.get_field('chick_price').to_python(instance.chick_price):
+        instance.price_updated_at = timezone.now()
+
+
+pre_save.connect(_stamp_price_change, sender=ChickStock, dispatch_uid='chick_price_updated_at')
+
+
+# --- Dashboard snapshot maintenance ---
+def _capture_old_counts(sender, instance, **kwargs):
+    # Remember what the stored row contributed so post_save can apply new - old
+    old = instance._stored_row
+    instance._dashboard_old = dashboard.CONTRIBUTIONS[sender](old) if old is not None else {}
+    instance._dashboard_old_request = getattr(old, 'chick_request_id', None)
+
+
+def _apply_saved_counts(sender, instance, created, **kwargs):
+    old = getattr(instance, '_dashboard_old', {})
+    delta = dashboard.diff_counts(old, dashboard.CONTRIBUTIONS[sender](instance))
+    if sender is FeedAllocation:
+        delta['farmers_with_feeds'] = _farmer_feed_delta(instance, created)
+    dashboard.apply_delta(delta)
+
+
+def _apply_deleted_counts(sender, instance, **kwargs):
+    dashboard.apply_delta(dashboard.diff_counts(dashboard.CONTRIBUTIONS[sender](instance), {}))
+
+
+class _FarmerFeedSettlement:
+    """Uncounts, once the deleting transaction commits, the farmers it left without allocations.
+
+    A cascade deletes every allocation of a farmer before any post_delete runs, so deciding per row
+    would take the same farmer off ``farmers_with_feeds`` once per allocation.
+    """
+
+    def __init__(self):
+        self.farmer_ids = set()
+        self.settled = False
+
+    def __call__(self):
+        self.settled = True
+        gone = [f for f in self.farmer_ids if not dashboard.farmer_has_feeds(f)]
+        dashboard.apply_delta({'farmers_with_feeds': -len(gone)})
+
+
+def _pending_settlement(create=False):
+    # One settlement per transaction; a rolled-back savepoint drops it along with its deletes
+    connection = transaction.get_connection()
+    for _, func, _ in connection.run_on_commit:
+        if isinstance(func, _FarmerFeedSettlement) and not func.settled:
+            return func
+    if create:
+        settlement = _FarmerFeedSettlement()
+        transaction.on_commit(settlement)
+        return settlement
+    return None
+
+
+def _capture_deleted_farmer(sender, instance, **kwargs):
+    # pre_delete: the allocation's request (and farmer) may be part of the same cascade
+    farmer_id = dashboard.farmer_for_request(instance.chick_request_id)
+    if farmer_id:
+        _pending_settlement(create=True).farmer_ids.add(farmer_id)
+
+
+def _farmer_feed_delta(alloc, created):
+    old_request = getattr(alloc, '_dashboard_old_request', None)
+    if not created and old_request == alloc.chick_request_id:
+        return 0
+    n = 0
+    farmer_id = dashboard.farmer_for_request(alloc.chick_request_id)
+    if farmer_id and not dashboard.farmer_has_feeds(farmer_id, exclude_id=alloc.pk):
+        settlement = _pending_settlement()
+        if settlement and farmer_id in settlement.farmer_ids:
+            # Lost every allocation earlier in this transaction but is still counted until it commits
+            settlement.farmer_ids.discard(farmer_id)
+        else:
+            n += 1
+    if old_request:
+        old_farmer = dashboard.farmer_for_request(old_request)
+        if old_farmer and old_farmer != farmer_id and not dashboard.farmer_has_feeds(old_farmer):
+            n -= 1
+    return n
+
+
+for _model in dashboard.CONTRIBUTIONS:
+    uid = f'dashboard_{_model._meta.model_name}'
+    pre_save.connect(_capture_old_counts, sender=_model, dispatch_uid=uid)
+    post_save.connect(_apply_saved_counts, sender=_model, dispatch_uid=uid)
+    post_delete.connect(_apply_deleted_counts, sender=_model, dispatch_uid=uid)
+pre_delete.connect(_capture_deleted_farmer, sender=FeedAllocation, dispatch_uid='dashboard_farmer_feeds')
+
+
+# --- Data version counters (cache invalidation) ---
+def _bump_data_version(sender, update_fields=None, **kwargs):
+    # Logging in saves last_login; that changes nothing a cached report or export shows
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    versions.bump_version(sender._meta.model_name)
+
+
+for _model in versions.VERSIONED_MODELS:
+    uid = f'data_version_{_model._meta.model_name}'
+    post_save.connect(_bump_data_version, sender=_model, dispatch_uid=uid)
+    post_delete.connect(_bump_data_version, sender=_model, dispatch_uid=uid)
+
+
+# --- Search index (search.py) ---
+SEARCH_KINDS = {Customer: 'farmer', ChickRequest: 'chick_request', FeedAllocation: 'feed_allocation'}
+
+
+def _index_saved(sender, instance, created, **kwargs):
+    search.index_rows(SEARCH_KINDS[sender], [instance.pk])
+    if sender is Customer and not created:
+        # Request and allocation documents carry the farmer's name and id
+        request_ids = list(ChickRequest.objects.filter(farmer=instance).values_list('pk', flat=True))
+        search.index_rows('chick_request', request_ids)
+        search.index_rows('feed_allocation', FeedAllocation.objects.filter(
+            chick_request_id__in=request_ids).values_list('pk', flat=True))
+
+
+def _unindex_deleted(sender, instance, **kwargs):
+    search.unindex_rows(SEARCH_KINDS[sender], [instance.pk])
+
+
+for _model in SEARCH_KINDS:
+    uid = f'search_{_model._meta.model_name}'
+    post_save.connect(_index_saved, sender=_model, dispatch_uid=uid)
+    post_delete.connect(_unindex_deleted, sender=_model, dispatch_uid=uid)
+
+
+# --- Stock level aggregates (stock_levels.py) ---
+def _capture_old_level(sender, instance, **kwargs):
+    old = instance._stored_row
+    instance._stock_level_old = stock_levels.contribution(old) if old is not None else {}
+
+
+def _apply_saved_level(sender, instance, **kwargs):
+    old = getattr(instance, '_stock_level_old', {})
+    stock_levels.adjust(sender, stock_levels.diff_levels(old, stock_levels.contribution(instance)))
+
+
+def _apply_deleted_level(sender, instance, **kwargs):
+    stock_levels.adjust(sender, stock_levels.diff_levels(stock_levels.contribution(instance), {}))
+
+
+for _model in stock_levels.LEVELS:
+    uid = f'stock_level_{_model._meta.model_name}'
+    pre_save.connect(_capture_old_level, sender=_model, dispatch_uid=uid)
+    post_save.connect(_apply_saved_level, sender=_model, dispatch_uid=uid)
+    post_delete.connect(_apply_deleted_level, sender=_model, dispatch_uid=uid)
+
+
+# --- Daily rollups (rollups.py) ---
+def _capture_old_rollup(sender, instance, **kwargs):
+    old = instance._stored_row
+    instance._rollup_old = rollups.contribution(old) if old is not None else {}
+
+
+def _apply_saved_rollup(sender, instance, **kwargs):
+    old = getattr(instance, '_rollup_old', {})
+    rollups.adjust(sender, rollups.diff_rows(old, rollups.contribution(instance)))
+
+
+def _capture_deleted_rollup(sender, instance, **kwargs):
+    # Cascades may remove the related rows a contribution reads before post_delete runs
+    instance._rollup_old = rollups.contribution(instance)
+
+
+def _apply_deleted_rollup(sender, instance, **kwargs):
+    rollups.adjust(sender, rollups.diff_rows(getattr(instance, '_rollup_old', {}), {}))
+
+
+for _model in rollups.ROLLUPS:
+    uid = f'rollup_{_model._meta.model_name}'
+    pre_save.connect(_capture_old_rollup, sender=_model, dispatch_uid=uid)
+    post_save.connect(_apply_saved_rollup, sender=_model, dispatch_uid=uid)
+    pre_delete.connect(_capture_deleted_rollup, sender=_model, dispatch_uid=uid)
+    post_delete.connect(_apply_deleted_rollup, sender=_model, dispatch_uid=uid)
+
+
+# --- Live events for the manager pages (live.py) ---
+# Approvals change status with conditional UPDATEs and publish their own events (approvals.py)
+LIVE_KINDS = {ChickRequest: 'chick', FeedAllocation: 'feed'}
+
+
+def _capture_old_state(sender, instance, **kwargs):
+    old = instance._stored_row
+    instance._live_old = (old.status, old.delivered) if old is not None else None
+
+
+def _publish_saved(sender, instance, created, **kwargs):
+    kind = LIVE_KINDS[sender]
+    old = getattr(instance, '_live_old', None)
+    if old is None:
+        if instance.status == 'pending':
+            live.publish('pending', {'kind': kind, 'id': instance.pk})
+        return
+    old_status, old_delivered = old
+    if instance.status != old_status:
+        live.publish('status', {'kind': kind, 'ids': [instance.pk], 'status': instance.status})
+    if instance.delivered and not old_delivered:
+        live.publish('delivered', {'kind': kind, 'id': instance.pk})
+
+
+def _publish_deleted(sender, instance, **kwargs):
+    live.publish('status', {'kind': LIVE_KINDS[sender], 'ids': [instance.pk], 'status': 'deleted'})
+
+
+for _model in LIVE_KINDS:
+    uid = f'live_{_model._meta.model_name}'
+    pre_save.connect(_capture_old_state, sender=_model, dispatch_uid=uid)
+    post_save.connect(_publish_saved, sender=_model, dispatch_uid=uid)
+    post_delete.connect(_publish_deleted, sender=_model, dispatch_uid=uid)
@@ -0,0 +1,85 @@
+import re
+
+from django.conf import settings
+
+# Applied to every new SQLite connection (see apps.py). Override or drop (value None) entries with
+# the SQLITE_PRAGMAS setting.
+DEFAULTS = {
+    # Readers no longer block on a writer, and a writer no longer waits for readers
+    'journal_mode': 'WAL',
+    # Safe with WAL: a power loss can lose the last commits but never corrupts the file
+    'synchronous': 'NORMAL',
+    # Wait this long (ms) for a lock instead of failing with "database is locked"
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative means KiB: a 64 MiB page cache per connection
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+_NAME = re.compile(r'^[a-z_]+$')
+_VALUE = re.compile(r'^-?\w+$')
+
+
+def get_pragmas():
+    pragmas = {**DEFAULTS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def configure_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver: apply the configured pragmas to new SQLite connections."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in get_pragmas().items():
+            if not _NAME.match(name) or not _VALUE.match(str(value)):
+                raise ValueError(f'Invalid SQLite pragma {name}={value!r}')
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def pragma_values(connection, names):
+    with connection.cursor() as cursor:
+        values = {}
+        for name in names:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
+
+
+# --- Maintenance (manage.py sqlite_maintenance) ---
+def optimize(connection, full=False):
+    """Refresh the query planner statistics: ``PRAGMA optimize`` only analyzes tables whose
+    statistics are stale; ``full`` runs a complete ``ANALYZE``."""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE' if full else 'PRAGMA optimize')
+
+
+def checkpoint(connection, mode='TRUNCATE'):
+    """Copy the WAL back into the database file; returns ``(busy, wal_pages, checkpointed_pages)``."""
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        raise ValueError(f'Unknown checkpoint mode {mode!r}')
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA wal_checkpoint({mode})')
+        return cursor.fetchone()
+
+
+def incremental_vacuum(connection, pages=0):
+    """Return up to ``pages`` free pages (0 = all) to the OS; returns the freelist size before and after.
+
+    Only has an effect once ``auto_vacuum`` is INCREMENTAL (see :func:`enable_incremental_vacuum`).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA freelist_count')
+        before = cursor.fetchone()[0]
+        cursor.execute(f'PRAGMA incremental_vacuum({int(pages)})')
+        cursor.fetchall()
+        cursor.execute('PRAGMA freelist_count')
+        return before, cursor.fetchone()[0]
+
+
+def enable_incremental_vacuum(connection):
+    """Switch ``auto_vacuum`` to INCREMENTAL; this needs one full ``VACUUM`` (rewrites the file)."""
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
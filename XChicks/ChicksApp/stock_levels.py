@@ -0,0 +1,175 @@
+import random
+import time
+
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import live
+from .models import ChickStock, FeedStock, FeedStockLevel, StockLevel
+
+# Source stock model -> (level model, key fields shared by both, quantity field on the source)
+LEVELS = {
+    ChickStock: (StockLevel, ('chick_type', 'chick_breed'), 'stock_quantity'),
+    FeedStock: (FeedStockLevel, ('feed_name', 'feed_type', 'feed_brand'), 'feed_quantity'),
+}
+
+# Attempts and base backoff (seconds) for writers that lose a race or hit a locked database
+RETRY_ATTEMPTS = 5
+RETRY_BACKOFF = 0.05
+
+
+class StockConflict(Exception):
+    """Stock (or a request being approved) changed under us; the transaction should be retried."""
+
+
+def contribution(stock):
+    """What a single stock row adds to the levels: ``{key: quantity}``."""
+    _, keys, qty_field = LEVELS[type(stock)]
+    return {tuple(getattr(stock, k) for k in keys): int(getattr(stock, qty_field) or 0)}
+
+
+def diff_levels(old, new):
+    delta = dict(new)
+    for key, n in old.items():
+        delta[key] = delta.get(key, 0) - n
+    return delta
+
+
+def compute_levels(stock_model):
+    """Recompute ``{key: quantity}`` for ``stock_model`` from the source table."""
+    _, keys, qty_field = LEVELS[stock_model]
+    rows = stock_model.objects.order_by().values_list(*keys).annotate(total=Sum(qty_field))
+    return {tuple(row[:-1]): row[-1] or 0 for row in rows}
+
+
+def adjust(stock_model, delta):
+    """Add ``delta`` ({key: n}) to the level rows, one UPDATE per key.
+
+    Runs in the caller's transaction. Writes that bypass model signals (``QuerySet.update``/
+    ``bulk_update``) must call this themselves.
+    """
+    level_model, keys, qty_field = LEVELS[stock_model]
+    now = timezone.now()
+    for key, n in delta.items():
+        if not n:
+            continue
+        _publish_level(stock_model, key, n)
+        match = dict(zip(keys, key))
+        if level_model.objects.filter(**match).update(quantity=F('quantity') + n, updated_at=now):
+            continue
+        # First write for this key: the source table already holds the row being saved
+        actual = stock_model.objects.filter(**match).aggregate(total=Sum(qty_field))['total'] or 0
+        try:
+            with transaction.atomic():
+                level_model.objects.create(quantity=actual, **match)
+        except IntegrityError:
+            # Another writer created it first
+            level_model.objects.filter(**match).update(quantity=F('quantity') + n, updated_at=now)
+
+
+def _publish_level(stock_model, key, delta):
+    live.publish('stock', {'kind': 'chick' if stock_model is ChickStock else 'feed', 'key': list(key), 'delta': delta})
+
+
+def rebuild_levels(fix=True):
+    """Overwrite every level row from the source tables; returns ``drift``.
+
+    ``drift`` maps ``(level model name, key)`` to ``(stored, actual)`` for every row that was off.
+    Levels whose stock rows are all gone are kept at zero. With ``fix=False`` nothing is written.
+    """
+    drift = {}
+    with transaction.atomic():
+        for stock_model, (level_model, keys, _) in LEVELS.items():
+            actual = compute_levels(stock_model)
+            stored = {tuple(row[:-1]): row[-1] for row in level_model.objects.values_list(*keys, 'quantity')}
+            for key in stored.keys() | actual.keys():
+                old, new = stored.get(key), actual.get(key, 0)
+                if old == new or (old is None and not new):
+                    continue
+                drift[(level_model.__name__, key)] = (old or 0, new)
+                if fix:
+                    level_model.objects.update_or_create(defaults={'quantity': new}, **dict(zip(keys, key)))
+                    _publish_level(stock_model, key, new - (old or 0))
+    return drift
+
+
+# --- Reads ---
+def chick_levels():
+    """``{chick_type: {chick_breed: quantity}}`` for every type/breed choice, zero-filled."""
+    field = ChickStock._meta.get_field
+    levels = {t: {b: 0 for b, _ in field('chick_breed').choices} for t, _ in field('chick_type').choices}
+    for chick_type, chick_breed, quantity in StockLevel.objects.values_list('chick_type', 'chick_breed', 'quantity'):
+        levels.setdefault(chick_type, {})[chick_breed] = quantity
+    return levels
+
+
+# --- Reservations ---
+# Stock is only ever taken with ``UPDATE ... SET qty = qty - n WHERE qty >= n``: the database checks
+# and decrements in one statement, so no row lock is needed (select_for_update is a no-op on SQLite)
+# and two approvals can never oversell. A zero row count means another writer got there first.
+def reserve_chicks(chick_type, chick_breed, quantity):
+    """Take ``quantity`` off the type/breed level; ``False`` if the level holds less than that."""
+    if not StockLevel.objects.filter(
+        chick_type=chick_type, chick_breed=chick_breed, quantity__gte=quantity,
+    ).update(quantity=F('quantity') - quantity, updated_at=timezone.now()):
+        return False
+    _publish_level(ChickStock, (chick_type, chick_breed), -quantity)
+    return True
+
+
+def take_from_batches(chick_type, chick_breed, quantity):
+    """Deduct ``quantity`` from the type/breed batches, largest first; returns ``{batch pk: taken}``.
+
+    Call after :func:`reserve_chicks` in the same transaction. Raises :class:`StockConflict` if a
+    batch changed since it was read or the batches hold less than the level said.
+    """
+    taken, remaining = {}, quantity
+    batches = ChickStock.objects.filter(
+        chick_type=chick_type, chick_breed=chick_breed, stock_quantity__gt=0,
+    ).order_by('-stock_quantity', 'id').values_list('pk', 'stock_quantity')
+    for pk, on_hand in batches:
+        if remaining <= 0:
+            break
+        take = min(remaining, on_hand)
+        # updated_at feeds the stock pages' validators (conditional.py); the price has its own stamp
+        if not ChickStock.objects.filter(pk=pk, stock_quantity__gte=take).update(
+                stock_quantity=F('stock_quantity') - take, updated_at=timezone.now()):
+            raise StockConflict(f'Chick stock batch {pk} changed during approval.')
+        taken[pk] = take
+        remaining -= take
+    if remaining > 0:
+        raise StockConflict(f'{chick_type}/{chick_breed} batches hold less than the stock level.')
+    return taken
+
+
+def reserve_feed(feed_stock, bags):
+    """Take ``bags`` off one feed lot and its product level; ``False`` if the lot holds fewer bags."""
+    if not FeedStock.objects.filter(pk=feed_stock.pk, feed_quantity__gte=bags).update(
+            feed_quantity=F('feed_quantity') - bags, updated_at=timezone.now()):
+        return False
+    adjust(FeedStock, {next(iter(contribution(feed_stock))): -bags})
+    return True
+
+
+def _is_contention(error):
+    if isinstance(error, StockConflict):
+        return True
+    # 40001 serialization_failure, 40P01 deadlock_detected
+    code = getattr(error.__cause__, 'sqlstate', None) or getattr(error.__cause__, 'pgcode', None)
+    return code in ('40001', '40P01') or 'locked' in str(error)
+
+
+def retry_on_conflict(func, attempts=RETRY_ATTEMPTS, backoff=RETRY_BACKOFF):
+    """Run ``func`` (which opens its own transaction), retrying on :class:`StockConflict` and on
+    lock errors (SQLite "database is locked", PostgreSQL serialization failures/deadlocks).
+
+    Backs off exponentially with jitter; the last error is re-raised once ``attempts`` are used up.
+    """
+    for attempt in range(attempts):
+        try:
+            return func()
+        except (StockConflict, OperationalError) as e:
+            if attempt == attempts - 1 or not _is_contention(e):
+                raise
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
@@ -1,3 +1,663 @@
-from django.test import TestCase
+import asyncio
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, connections
+from django.db.models import Count, Sum
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import dashboard, live, rollups
+from .approvals import approve_chick_requests, approve_feed_allocation
+from .exports import WRITERS
+from .farmer_import import ImportInterrupted, import_farmers, load_rows
+from .jobs import STALE_AFTER, claim_next_job, enqueue_export, export_root, prune_stale_exports, run_job
+from .ledger import current_chick_price
+from .middleware import capture_queries
+from .models import (
+    ChickRequest, ChickStock, Customer, DailyActivity, ExportJob, FeedAllocation, FeedStock, IdSequence, SaleLine,
+    StockLevel, UserProfile,
+)
+from .pagination import encode_cursor, keyset_paginate
+from .parallel_queries import gather_queries
+from .report_cache import REPORTS_CACHE, acached_report
+from .reporting import activity_series, agent_performance, date_range, weekly_summary
+from .routers import ReplicaRouter, _Routing, _routing, use_replica
+from .search import search_filter
+from .stock_levels import rebuild_levels
+
+
+def make_farmer(i, **fields):
+    """Farmer number ``i`` with its login; ``fields`` override the defaults."""
+    user = UserProfile.objects.create(username=f'farmer{i}', role='farmer')
+    defaults = {
+        'farmer_name': f'Farmer {i}', 'date_of_birth': date(2000, 1, 1), 'gender': 'M', 'location': 'Kampala',
+        'nin': f'CM{i:012d}', 'phone_number': f'07{i:08d}', 'recommender_name': 'R',
+        'recommender_nin': 'CM000000000000', 'recommender_tel': '0700000000', 'registered_by': 'test',
+    }
+    return Customer.objects.create(user=user, **{**defaults, **fields})
+
+
+def make_chick_request(farmer, **fields):
+    defaults = {
+        'farmer_type': 'starter', 'chick_type': 'layer', 'chick_breed': 'local', 'quantity': 100,
+        'chick_period': 1, 'payment_terms': 'cash', 'received_through': 'walk-in',
+    }
+    return ChickRequest.objects.create(farmer=farmer, **{**defaults, **fields})
+
+
+# A plan line like "SCAN chicksapp_chickrequest" (no index) means a full table scan
+FULL_SCAN = re.compile(r'\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)')
+
+
+class HotQueryPlanTests(TestCase):
+    """The filters behind the dashboards, Reports and Deliveries must be served by an index."""
+
+    def assertNoTableScan(self, qs):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN checks are SQLite-specific')
+        plan = qs.explain()
+        scans = [m.group(1) for m in FULL_SCAN.finditer(plan)]
+        self.assertEqual(scans, [], f'Full table scan in plan for:\n{qs.query}\n{plan}')
+
+    def test_dashboard_counters(self):
+        self.assertNoTableScan(ChickRequest.objects.filter(status='pending'))
+        self.assertNoTableScan(ChickRequest.objects.filter(delivered=True))
+        self.assertNoTableScan(ChickRequest.objects.filter(status='approved', delivered=False))
+        self.assertNoTableScan(FeedAllocation.objects.filter(status='approved'))
+        self.assertNoTableScan(FeedAllocation.objects.filter(payment_status='pending'))
+        self.assertNoTableScan(FeedAllocation.objects.filter(delivered=True))
+
+    def test_deliveries(self):
+        # The two lists on the Deliveries page, newest request first
+        self.assertNoTableScan(ChickRequest.objects.filter(status='approved').order_by('-request_date', '-id'))
+        self.assertNoTableScan(FeedAllocation.objects.filter(status='approved').order_by('-id'))
+
+    def test_reports_filters(self):
+        start, end = date(2025, 1, 1), date(2025, 3, 31)
+        self.assertNoTableScan(
+            ChickRequest.objects.filter(**date_range('request_date', start, end)).order_by('-request_date')
+        )
+        self.assertNoTableScan(
+            FeedAllocation.objects.filter(**date_range('chick_request__request_date', start, end))
+        )
+        self.assertNoTableScan(Customer.objects.filter(**date_range('registration_date', start, end)))
+        self.assertNoTableScan(ChickRequest.objects.filter(chick_type='layer', chick_breed='local'))
+        self.assertNoTableScan(ChickRequest.objects.filter(created_by_id=1, status='approved'))
+
+    def test_sales_agent_dashboard(self):
+        mine = ChickRequest.objects.filter(created_by_id=1)
+        self.assertNoTableScan(mine.values('status').annotate(c=Count('id')))
+        self.assertNoTableScan(mine.filter(delivered=True))
+        self.assertNoTableScan(FeedAllocation.objects.filter(chick_request__created_by_id=1, delivered=True))
+
+    def test_chick_price_lookup(self):
+        self.assertNoTableScan(
+            ChickStock.objects.filter(chick_type='layer', chick_breed='local').order_by('-price_updated_at')
+        )
+
+    def assertPagesFromIndex(self, qs, keys, query=''):
+        # EXPLAIN the page queries keyset_paginate actually runs: no scan, and no sort of the matches
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN checks are SQLite-specific')
+        with CaptureQueriesContext(connection) as ctx:
+            keyset_paginate(RequestFactory().get('/' + query), qs, keys)
+        for q in ctx.captured_queries:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + q['sql'])
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            self.assertEqual(FULL_SCAN.findall(plan), [], f"Full table scan in plan for:\n{q['sql']}\n{plan}")
+            self.assertNotIn('TEMP B-TREE', plan, f"Sort step in plan for:\n{q['sql']}\n{plan}")
+
+    def test_filtered_listings_page_from_an_index(self):
+        cursor = '?after=' + encode_cursor([timezone.now(), 10])
+        for status in ('approved', 'pending'):
+            qs = ChickRequest.objects.filter(status=status).select_related('farmer')
+            self.assertPagesFromIndex(qs, ('request_date', 'id'))
+            self.assertPagesFromIndex(qs, ('request_date', 'id'), cursor)
+        approved_feeds = FeedAllocation.objects.filter(status='approved').select_related('chick_request__farmer')
+        self.assertPagesFromIndex(approved_feeds, ('id',), '?after=' + encode_cursor([10]))
+
+    def test_detects_scan(self):
+        with self.assertRaises(AssertionError):
+            self.assertNoTableScan(ChickRequest.objects.filter(quantity=5))
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(7):
+            make_farmer(i)
+
+    def page(self, query=''):
+        request = RequestFactory().get('/farmerrecords/' + query)
+        return keyset_paginate(request, Customer.objects.all(), ('registration_date', 'id'), default_per_page=3)
+
+    def test_walks_every_row_once_in_order(self):
+        seen, page = [], self.page()
+        while True:
+            seen += [c.pk for c in page]
+            if not page.has_next:
+                break
+            page = self.page(page.next_query)
+        expected = list(Customer.objects.order_by('-registration_date', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_previous_returns_the_earlier_page(self):
+        first = self.page()
+        second = self.page(first.next_query)
+        back = self.page(second.prev_query)
+        self.assertEqual([c.pk for c in back], [c.pk for c in first])
+        self.assertFalse(back.has_previous)
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        self.assertEqual([c.pk for c in self.page('?after=not-a-cursor')], [c.pk for c in self.page()])
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.farmer = make_farmer(1, farmer_name='Okello Janet', gender='F', location='Gulu')
+
+    def search(self, query):
+        return list(search_filter(Customer.objects.all(), 'farmer', query))
+
+    def test_prefix_tokens_all_required(self):
+        self.assertEqual(self.search('oke jan'), [self.farmer])
+        self.assertEqual(self.search('gulu'), [self.farmer])
+        self.assertEqual(self.search('okello mbale'), [])
+        self.assertEqual(self.search('!!'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.farmer.farmer_name = 'Achen Grace'
+        self.farmer.save()
+        self.assertEqual(self.search('okello'), [])
+        self.assertEqual(self.search('achen'), [self.farmer])
+        pk = self.farmer.pk
+        self.farmer.delete()
+        self.assertEqual(self.search('achen'), [])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM search_farmer WHERE rowid = %s', [pk])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class DashboardSnapshotTests(TestCase):
+    def allocate(self, chick_request, **fields):
+        return FeedAllocation.objects.create(chick_request=chick_request, feed_name='Starter', feed_type='mash',
+                                             feed_brand='Ugachick', amount_due=1000,
+                                             payment_due_date=date(2030, 1, 1), **fields)
+
+    def assertSnapshotMatches(self):
+        snap = dashboard.get_snapshot()
+        self.assertEqual({k: getattr(snap, k) for k in dashboard.compute_counters()}, dashboard.compute_counters())
+
+    def test_counters_follow_creates_status_changes_and_cascade_deletes(self):
+        dashboard.rebuild_snapshot()
+        farmers = [make_farmer(i) for i in range(3)]
+        requests = [make_chick_request(f) for f in farmers for _ in range(2)]
+        allocations = [self.allocate(r) for r in requests]
+        self.assertSnapshotMatches()
+        requests[0].status = 'approved'
+        requests[0].delivered = True
+        requests[0].save()
+        allocations[1].status = 'approved'
+        allocations[1].payment_status = 'paid'
+        allocations[1].save()
+        self.assertSnapshotMatches()
+        # Deletes settle farmers_with_feeds when the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            farmers[0].delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            ChickRequest.objects.filter(farmer=farmers[1]).delete()
+        self.assertSnapshotMatches()
+        # Losing the last allocation and getting a new one in one transaction leaves the farmer counted
+        with self.captureOnCommitCallbacks(execute=True):
+            FeedAllocation.objects.filter(chick_request__farmer=farmers[2]).delete()
+            self.allocate(requests[4])
+        self.assertSnapshotMatches()
+        self.assertEqual(dashboard.get_snapshot().farmers_with_feeds, 1)
+
+    def test_stock_edits_from_the_form(self):
+        dashboard.rebuild_snapshot()
+        batch = ChickStock.objects.create(batch_name='A', chick_type='layer', chick_breed='local', chick_age=1,
+                                          chick_price=1500, stock_quantity=10)
+        self.client.force_login(UserProfile.objects.create(username='manager', role='manager'))
+        response = self.client.post(f'/updatechickstock/{batch.pk}/', {
+            'batch_name': 'A', 'chick_type': 'layer', 'chick_breed': 'local', 'chick_price': '1500', 'stock_quantity': '50',
+        })
+        self.assertRedirects(response, '/chickstock/', fetch_redirect_response=False)
+        batch.refresh_from_db()
+        self.assertEqual(batch.stock_quantity, 50)
+        self.assertEqual(StockLevel.objects.get(chick_type='layer', chick_breed='local').quantity, 50)
+        self.assertSnapshotMatches()
+
+    def test_save_reads_the_stored_row_once(self):
+        # Dashboard, rollup and live handlers all diff against the same pre_save load
+        request = make_chick_request(make_farmer(1))
+        for row in (request, self.allocate(request)):
+            row.status = 'rejected'
+            with CaptureQueriesContext(connection) as ctx:
+                row.save()
+            table = f'FROM "{row._meta.db_table}"'
+            selects = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT') and table in q['sql']]
+            self.assertEqual(len(selects), 1, selects)
+
+
+class IdSequenceTests(TestCase):
+    def test_blocks_continue_after_ids_issued_before_the_sequence(self):
+        year = timezone.now().year
+        make_farmer(1, farmer_id=f'FARMER-{year}-0041')
+        IdSequence.objects.filter(prefix='FARMER').delete()
+        self.assertEqual(IdSequence.allocate('FARMER', 3), [f'FARMER-{year}-{n:04d}' for n in (42, 43, 44)])
+        self.assertEqual(IdSequence.allocate('FARMER'), [f'FARMER-{year}-0045'])
+        self.assertEqual(make_farmer(2).farmer_id, f'FARMER-{year}-0046')
+        # Each year numbers from its own sequence
+        self.assertEqual(IdSequence.allocate('FARMER', 2, year=year - 1), [f'FARMER-{year - 1}-0001', f'FARMER-{year - 1}-0002'])
+
+
+class FarmerImportTests(TestCase):
+    HEADER = 'farmer_name,date_of_birth,gender,location,nin,phone_number,recommender_name,recommender_nin,recommender_tel\n'
+
+    def setUp(self):
+        self.existing = make_farmer(1)
+        self.client.force_login(UserProfile.objects.create(username='manager', role='manager'))
+
+    def row(self, i, **fields):
+        values = {'farmer_name': f'Imported {i}', 'date_of_birth': '2000-01-01', 'gender': 'F', 'location': 'Gulu',
+                  'nin': f'CF{i:012d}', 'phone_number': f'078{i:07d}', 'recommender_name': 'R',
+                  'recommender_nin': 'CM000000000000', 'recommender_tel': '0700000000', **fields}
+        return ','.join(values.values()) + '\n'
+
+    def upload(self, content, name='farmers.csv'):
+        return self.client.post('/farmerrecords/import/', {'file': SimpleUploadedFile(name, content.encode())})
+
+    def test_valid_rows_are_saved_and_the_rest_reported(self):
+        response = self.upload(self.HEADER + self.row(2) + self.row(3, nin=self.existing.nin)
+                               + self.row(4, nin='CF000000000002') + self.row(5, gender='X', date_of_birth='1/1/2000'))
+        self.assertEqual(Customer.objects.filter(farmer_name__startswith='Imported').count(), 1)
+        self.assertEqual([(line, errors) for line, _, errors in response.context['rejected']], [
+            (3, ['A farmer with this NIN already exists.']),
+            (4, ['Duplicate NIN in this file.']),
+            (5, ['date_of_birth must be YYYY-MM-DD.', 'Gender must be M or F.']),
+        ])
+        self.assertEqual(dashboard.get_snapshot().total_users, UserProfile.objects.count())
+
+    def test_unreadable_file_and_database_error_are_reported_apart(self):
+        messages = [str(m) for m in self.upload('not a workbook', 'farmers.xlsx').context['messages']]
+        self.assertTrue(messages[0].startswith('Could not read file'))
+        # The second chunk fails; the first one stays saved and is counted
+        allocate = IdSequence.allocate
+        with mock.patch.object(IdSequence, 'allocate', side_effect=[allocate('FARMER', 1), DatabaseError('disk full')]):
+            with self.assertRaises(ImportInterrupted) as ctx:
+                import_farmers(load_rows(io.StringIO(self.HEADER + self.row(2) + self.row(3)), 'f.csv'), 'test', chunk_size=1)
+        self.assertEqual(ctx.exception.created, 1)
+        self.assertTrue(Customer.objects.filter(nin='CF000000000002').exists())
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = self.settings(EXPORT_ROOT=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        ChickStock.objects.create(batch_name='A', chick_type='layer', chick_breed='local', chick_age=1, stock_quantity=10)
+
+    def test_reuse_until_the_data_or_the_file_changes(self):
+        job = enqueue_export('chick_stock', 'xlsx', {'chick_type': 'layer'})
+        self.assertEqual(enqueue_export('chick_stock', 'xlsx', {'chick_type': 'layer'}).pk, job.pk)
+        self.assertNotEqual(enqueue_export('chick_stock', 'xlsx', {'chick_type': 'broiler'}).pk, job.pk)
+        self.assertEqual(claim_next_job().pk, job.pk)
+        self.assertTrue(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.rows_written), ('done', 100, 1))
+        self.assertEqual(enqueue_export('chick_stock', 'xlsx', {'chick_type': 'layer'}).pk, job.pk)
+        # A stock write bumps the data version the job was built against
+        ChickStock.objects.create(batch_name='B', chick_type='layer', chick_breed='local', chick_age=1, stock_quantity=5)
+        fresh = enqueue_export('chick_stock', 'xlsx', {'chick_type': 'layer'})
+        self.assertNotEqual(fresh.pk, job.pk)
+        run_job(fresh)
+        self.assertEqual(prune_stale_exports(), 1)
+        self.assertFalse(os.path.exists(job.file_path))
+        # A finished job whose file is gone is not handed out again
+        os.remove(ExportJob.objects.get(pk=fresh.pk).file_path)
+        self.assertNotIn(enqueue_export('chick_stock', 'xlsx', {'chick_type': 'layer'}).pk, (job.pk, fresh.pk))
+
+    def test_failed_writer_leaves_no_file(self):
+        def failing(sheets, path, on_row):
+            with open(path, 'w') as fh:
+                fh.write('partial')
+            raise OSError('disk full')
+
+        job = enqueue_export('chick_stock', 'xlsx', {})
+        with mock.patch.dict(WRITERS, {'xlsx': failing}), self.assertLogs('ChicksApp.jobs', 'ERROR'):
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'disk full'))
+        self.assertEqual(os.listdir(export_root()), [])
+        # Failed jobs are not reused
+        self.assertNotEqual(enqueue_export('chick_stock', 'xlsx', {}).pk, job.pk)
+
+    def test_failed_or_abandoned_runs_do_not_block_the_export(self):
+        job = enqueue_export('chick_stock', 'xlsx', {})
+        with mock.patch('ChicksApp.jobs.report_sheets', side_effect=ValueError('bad filter')), \
+                self.assertLogs('ChicksApp.jobs', 'ERROR'):
+            self.assertFalse(run_job(claim_next_job()))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'bad filter'))
+        # A worker that died mid-run leaves the job running; once its heartbeat is stale it is failed
+        stuck = enqueue_export('chick_stock', 'xlsx', {})
+        claim_next_job()
+        self.assertEqual(enqueue_export('chick_stock', 'xlsx', {}).pk, stuck.pk)
+        ExportJob.objects.filter(pk=stuck.pk).update(heartbeat_at=timezone.now() - STALE_AFTER - timedelta(seconds=1))
+        self.assertNotIn(enqueue_export('chick_stock', 'xlsx', {}).pk, (job.pk, stuck.pk))
+        self.assertEqual(ExportJob.objects.get(pk=stuck.pk).status, 'failed')
+
+
+class ReportCacheTests(TestCase):
+    def setUp(self):
+        caches[REPORTS_CACHE].clear()
+
+    async def test_writes_to_report_data_invalidate_the_entry(self):
+        builds = []
+
+        async def build(complete=True):
+            builds.append(1)
+            return {'n': len(builds)}, complete
+
+        self.assertEqual(await acached_report({'status': 'approved'}, build), {'n': 1})
+        self.assertEqual(await acached_report({'status': 'approved', 'start': ''}, build), {'n': 1})
+        self.assertEqual(await acached_report({'status': 'pending'}, build), {'n': 2})
+        await sync_to_async(make_farmer)(1)
+        self.assertEqual(await acached_report({'status': 'approved'}, build), {'n': 3})
+        # New or renamed agents appear in the report too; logging in changes nothing it shows
+        agent = await UserProfile.objects.acreate(username='agent', role='sales_agent')
+        self.assertEqual(await acached_report({'status': 'approved'}, build), {'n': 4})
+        await sync_to_async(self.client.force_login)(agent)
+        self.assertEqual(await acached_report({'status': 'approved'}, build), {'n': 4})
+        # A report with timed-out figures is served once but not kept
+        self.assertEqual(await acached_report({'status': 'rejected'}, lambda: build(complete=False)), {'n': 5})
+        self.assertEqual(await acached_report({'status': 'rejected'}, build), {'n': 6})
+
+
+class StockLevelTests(TestCase):
+    def level(self, chick_type, chick_breed):
+        return StockLevel.objects.get(chick_type=chick_type, chick_breed=chick_breed).quantity
+
+    def test_levels_follow_stock_writes(self):
+        a = ChickStock.objects.create(batch_name='A', chick_type='layer', chick_breed='local', chick_age=1, stock_quantity=100)
+        ChickStock.objects.create(batch_name='B', chick_type='layer', chick_breed='local', chick_age=1, stock_quantity=50)
+        self.assertEqual(self.level('layer', 'local'), 150)
+        a.stock_quantity = 80
+        a.chick_breed = 'exotic'
+        a.save()
+        self.assertEqual((self.level('layer', 'local'), self.level('layer', 'exotic')), (50, 80))
+        a.delete()
+        self.assertEqual(self.level('layer', 'exotic'), 0)
+        self.assertEqual(rebuild_levels(fix=False), {})
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        ChickStock.objects.create(batch_name='A', chick_type='layer', chick_breed='local', chick_age=1, stock_quantity=1000)
+        self.agent = UserProfile.objects.create(username='agent', role='sales_agent')
+        self.requests = []
+        for i, days_ago in enumerate((40, 40, 9, 2, 0)):
+            r = make_chick_request(make_farmer(i), quantity=10, created_by=self.agent)
+            # request_date is auto_now_add; back-date it past the signals
+            ChickRequest.objects.filter(pk=r.pk).update(request_date=timezone.now() - timedelta(days=days_ago))
+            self.requests.append(r.pk)
+
+    def assertMatchesSource(self, **filters):
+        filters = {**dict.fromkeys(rollups.ROLLUP_FILTERS, ''), 'start': None, 'end': None, **filters}
+        chick_qs = ChickRequest.objects.filter(**date_range('request_date', filters['start'], filters['end']))
+        if filters['status']:
+            chick_qs = chick_qs.filter(status=filters['status'])
+        feed_qs = FeedAllocation.objects.none()
+        for ours, source in ((rollups.activity_series, activity_series), (rollups.weekly_summary, weekly_summary),
+                             (rollups.agent_performance, agent_performance)):
+            self.assertEqual(ours(filters, chick_qs, feed_qs), source(chick_qs, feed_qs))
+
+    def test_reads_match_source_across_the_mark_and_late_writes(self):
+        rollups.roll_forward(timezone.localdate() - timedelta(days=5))
+        self.assertEqual(DailyActivity.objects.aggregate(n=Sum('chick_requests'))['n'], 3)
+        self.assertEqual(rollups.request_totals(timezone.localdate() - timedelta(days=30)), (3, 0))
+        # A late approval patches the rolled-up day; the sale line lands in the sales rollup
+        approve_chick_requests(self.requests[:3])
+        self.assertEqual(rollups.sales_amount(), SaleLine.objects.aggregate(total=Sum('amount'))['total'])
+        ChickRequest.objects.get(pk=self.requests[1]).delete()
+        self.assertMatchesSource()
+        self.assertMatchesSource(status='approved')
+        self.assertMatchesSource(start=timezone.localdate() - timedelta(days=10))
+        self.assertEqual(rollups.rebuild_rollups(fix=False), {})
+
+
+class ChickPriceTests(TestCase):
+    def test_sales_use_the_latest_price_set_not_the_batch_last_drawn_from(self):
+        old = ChickStock.objects.create(batch_name='Old', chick_type='layer', chick_breed='local', chick_age=1,
+                                        chick_price=1500, stock_quantity=1000)
+        ChickStock.objects.create(batch_name='New', chick_type='layer', chick_breed='local', chick_age=1,
+                                  chick_price=2500, stock_quantity=50)
+        for i in range(2):
+            approve_chick_requests([make_chick_request(make_farmer(i)).pk])
+        self.assertEqual(list(SaleLine.objects.values_list('unit_price', flat=True)), [2500, 2500])
+        self.assertEqual(current_chick_price('layer', 'local'), 2500)
+        # Editing anything but the price does not make a batch's price current
+        old.chick_age = 2
+        old.save()
+        self.assertEqual(current_chick_price('layer', 'local'), 2500)
+        old.chick_price = 1800
+        old.save()
+        self.assertEqual(current_chick_price('layer', 'local'), 1800)
+
+    def test_restocking_from_the_form_keeps_the_current_price(self):
+        old = ChickStock.objects.create(batch_name='Old', chick_type='layer', chick_breed='local', chick_age=1,
+                                        chick_price=1500, stock_quantity=10)
+        new = ChickStock.objects.create(batch_name='New', chick_type='layer', chick_breed='local', chick_age=1,
+                                        chick_price=2500, stock_quantity=10)
+        self.client.force_login(UserProfile.objects.create(username='manager', role='manager'))
+        self.client.post(f'/updatechickstock/{old.pk}/', {
+            'batch_name': 'Old', 'chick_type': 'layer', 'chick_breed': 'local', 'chick_price': '1500', 'stock_quantity': '90',
+        })
+        self.assertEqual(ChickStock.objects.get(pk=old.pk).stock_quantity, 90)
+        self.assertEqual(current_chick_price('layer', 'local'), 2500)
+        # Partial saves of the price still stamp it
+        old.chick_price = 1700
+        old.save(update_fields=['chick_price'])
+        self.assertEqual(current_chick_price('layer', 'local'), 1700)
+        new.stock_quantity = 5
+        new.save(update_fields=['stock_quantity'])
+        self.assertEqual(current_chick_price('layer', 'local'), 1700)
+
+
+class FeedApprovalTests(TestCase):
+    def test_only_pending_allocations_are_approved(self):
+        stock = FeedStock.objects.create(stock_name='Lot 1', feed_name='Starter', feed_type='mash', feed_brand='Ugachick',
+                                         feed_quantity=10, expiry_date=date(2030, 1, 1), purchase_price=1,
+                                         selling_price=2, supplier='S', supplier_contact='0700000000')
+        alloc = FeedAllocation.objects.create(chick_request=make_chick_request(make_farmer(1)), feed_stock=stock,
+                                              feed_name='Starter', feed_type='mash', feed_brand='Ugachick',
+                                              amount_due=1000, payment_due_date=date(2030, 1, 1), status='rejected')
+        self.assertEqual(approve_feed_allocation(alloc.pk)[1], 'Feed request is rejected, not pending.')
+        FeedAllocation.objects.filter(pk=alloc.pk).update(status='pending')
+        self.assertIsNone(approve_feed_allocation(alloc.pk)[1])
+        self.assertEqual(approve_feed_allocation(alloc.pk)[1], 'Feed request is approved, not pending.')
+        stock.refresh_from_db()
+        self.assertEqual(stock.feed_quantity, 8)
+
+
+class ConcurrentApprovalTests(TransactionTestCase):
+    """Parallel approvals drawing on the same stock must never oversell it."""
+
+    THREADS = 8
+
+    def setUp(self):
+        ChickStock.objects.create(batch_name='A', chick_type='layer', chick_breed='local', chick_age=1, stock_quantity=300)
+        ChickStock.objects.create(batch_name='B', chick_type='layer', chick_breed='local', chick_age=1, stock_quantity=200)
+        self.request_ids = []
+        for i in range(self.THREADS * 2):
+            self.request_ids.append(make_chick_request(make_farmer(i)).pk)
+
+    def approve_in_threads(self, batches):
+        results, barrier = [], threading.Barrier(len(batches))
+
+        def worker(ids):
+            try:
+                barrier.wait()
+                results.append(approve_chick_requests(ids))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(ids,)) for ids in batches]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_parallel_approvals_do_not_oversell(self):
+        # Every request is raced by two threads; 500 chicks cover five of the sixteen requests
+        ids = self.request_ids
+        batches = [ids[i::self.THREADS] for i in range(self.THREADS)] + [ids[i::self.THREADS][::-1] for i in range(self.THREADS)]
+        results = self.approve_in_threads(batches)
+
+        approved = [r.pk for ok, _ in results for r in ok]
+        self.assertEqual(len(approved), len(set(approved)), 'a request was approved twice')
+        self.assertEqual(len(approved), 5)
+        self.assertEqual(ChickRequest.objects.filter(status='approved').count(), 5)
+        self.assertEqual(sum(ChickStock.objects.values_list('stock_quantity', flat=True)), 0)
+        self.assertEqual(StockLevel.objects.get(chick_type='layer', chick_breed='local').quantity, 0)
+        self.assertEqual(rebuild_levels(fix=False), {})
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def test_reads_use_replica_until_the_first_write(self):
+        token = _routing.set(_Routing('replica'))
+        try:
+            self.assertEqual(self.router.db_for_read(ChickRequest), 'replica')
+            self.assertEqual(self.router.db_for_read(ExportJob), 'default')
+            self.assertEqual(self.router.db_for_write(ChickRequest), 'default')
+            self.assertIsNone(self.router.db_for_read(ChickRequest))
+        finally:
+            _routing.reset(token)
+
+    def test_unconfigured_replica_falls_back_to_default(self):
+        view = use_replica(alias='no_such_replica')(lambda request: self.router.db_for_read(ChickRequest))
+        self.assertIsNone(view(RequestFactory().get('/reports/')))
+        self.assertIsNone(self.router.db_for_read(ChickRequest))
+
+
+class ParallelQueriesTests(SimpleTestCase):
+    def test_queries_run_concurrently_and_slow_ones_time_out(self):
+        queries = {'a': lambda: time.sleep(0.2) or 1, 'b': lambda: time.sleep(0.2) or 2, 'slow': lambda: time.sleep(1)}
+        started = time.perf_counter()
+        results, timed_out = asyncio.run(gather_queries(queries, timeout=0.5))
+        self.assertLess(time.perf_counter() - started, 0.9)
+        self.assertEqual(results, {'a': 1, 'b': 2, 'slow': None})
+        self.assertEqual(timed_out, ['slow'])
+
+
+class QueryCaptureTests(TransactionTestCase):
+    def test_counts_queries_on_worker_threads(self):
+        queries = {'users': UserProfile.objects.count, 'farmers': Customer.objects.count}
+        with capture_queries() as outer:
+            with capture_queries() as inner:
+                UserProfile.objects.exists()
+                asyncio.run(gather_queries(queries))
+        self.assertEqual((inner.count, outer.count), (3, 3))
+
+
+class AgentApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = UserProfile.objects.create(username='agent', role='sales_agent')
+        for i in range(3):
+            make_farmer(i, sales_agent=cls.agent)
+
+    def setUp(self):
+        self.client.force_login(self.agent)
+
+    def test_fields_projection_and_cursor(self):
+        body = self.client.get('/api/v1/farmers/?fields=farmer_name&per_page=2').json()
+        self.assertEqual([list(row) for row in body['results']], [['farmer_name'], ['farmer_name']])
+        rest = self.client.get(body['next']).json()
+        self.assertEqual(len(rest['results']), 1)
+        self.assertEqual(self.client.get('/api/v1/farmers/?fields=password').status_code, 400)
+
+    def test_if_none_match_returns_304_until_data_changes(self):
+        etag = self.client.get('/api/v1/farmers/')['ETag']
+        self.assertEqual(self.client.get('/api/v1/farmers/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Customer.objects.filter(farmer_name='Farmer 0').get().save()
+        self.assertEqual(self.client.get('/api/v1/farmers/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_feed_taken_must_be_a_json_boolean(self):
+        ChickStock.objects.create(batch_name='A', chick_type='layer', chick_breed='local', chick_age=1, stock_quantity=100)
+        body = {'farmer': Customer.objects.get(farmer_name='Farmer 0').pk, 'farmer_type': 'starter', 'chick_type': 'layer',
+                'chick_breed': 'local', 'quantity': 10, 'payment_terms': 'cash', 'received_through': 'walk-in'}
+        for value in ('false', 0, None):
+            response = self.client.post('/api/v1/chick-request-form/', {**body, 'feed_taken': value}, content_type='application/json')
+            self.assertEqual(response.status_code, 400, value)
+        response = self.client.post('/api/v1/chick-request-form/', {**body, 'feed_taken': False}, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIs(response.json()['feed_taken'], False)
+
+
+class StockConditionalTests(TestCase):
+    def setUp(self):
+        self.client.force_login(UserProfile.objects.create(username='manager', role='manager'))
+        self.batch = ChickStock.objects.create(batch_name='A', chick_type='layer', chick_breed='local', chick_age=1, stock_quantity=100)
+
+    def test_unchanged_stock_answers_304(self):
+        for url in ('/chickstock/', '/export/chick-stock/'):
+            response = self.client.get(url)
+            etag = response['ETag']
+            self.assertTrue(response.has_header('Last-Modified'))
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ChickStock.objects.create(batch_name='B', chick_type='layer', chick_breed='local', chick_age=1, stock_quantity=5)
+        self.assertEqual(self.client.get('/export/chick-stock/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_stock_drawn_by_approvals_changes_the_validators(self):
+        # Approvals draw stock with conditional UPDATEs that skip signals; they stamp updated_at themselves
+        request = make_chick_request(make_farmer(1), quantity=10)
+        feed = FeedStock.objects.create(stock_name='Lot 1', feed_name='Starter', feed_type='mash', feed_brand='Ugachick',
+                                        feed_quantity=10, expiry_date=date(2030, 1, 1), purchase_price=1,
+                                        selling_price=2, supplier='S', supplier_contact='0700000000')
+        alloc = FeedAllocation.objects.create(chick_request=request, feed_stock=feed, feed_name='Starter', feed_type='mash',
+                                              feed_brand='Ugachick', amount_due=1000, payment_due_date=date(2030, 1, 1))
+        etags = {url: self.client.get(url)['ETag'] for url in ('/chickstock/', '/feedstock/')}
+        approve_chick_requests([request.pk])
+        approve_feed_allocation(alloc.pk)
+        for url, etag in etags.items():
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200, url)
+
+
+class LiveEventsTests(TransactionTestCase):
+    def test_wsgi_requests_are_told_not_to_reconnect(self):
+        self.client.force_login(UserProfile.objects.create(username='manager', role='manager'))
+        self.assertEqual(self.client.get('/live/events/').status_code, 204)
+
+    async def test_stream_catches_up_then_pushes(self):
+        user = await UserProfile.objects.acreate(username='manager', role='manager')
+        await self.async_client.aforce_login(user)
+        since = await sync_to_async(live.cursor)()
+        # Published after the page was rendered but before it connected
+        await sync_to_async(live.publish)('counters', {'chick_pending': 1})
+        response = await self.async_client.get(f'/live/events/?since={since}')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        self.assertIn(b'event: counters\ndata: {"chick_pending":1}', await anext(stream))
+        await sync_to_async(live.publish)('status', {'kind': 'chick', 'ids': [7], 'status': 'approved'})
+        self.assertIn(b'"status":"approved"', await asyncio.wait_for(anext(stream), 2))
+        await stream.aclose()
@@ -0,0 +1,28 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import ChickRequest, ChickStock, Customer, DataVersion, FeedAllocation, FeedStock, UserProfile
+
+# Models whose writes invalidate cached reports/exports (bumped from signals.py)
+VERSIONED_MODELS = (ChickRequest, FeedAllocation, Customer, ChickStock, FeedStock, UserProfile)
+
+
+def bump_version(name):
+    if DataVersion.objects.filter(name=name).update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(name=name, version=1)
+    except IntegrityError:
+        # Another writer created it first
+        DataVersion.objects.filter(name=name).update(version=F('version') + 1)
+
+
+def get_versions(names):
+    stored = dict(DataVersion.objects.filter(name__in=names).values_list('name', 'version'))
+    return {name: stored.get(name, 0) for name in names}
+
+
+def version_key(names):
+    """Compact ``name:version`` string for the given model names, e.g. ``chickstock:4|feedstock:2``."""
+    return '|'.join(f'{name}:{version}' for name, version in sorted(get_versions(names).items()))
@@ -1,16 +1,39 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count, F, Q
-from django.http import HttpResponse, HttpResponseBadRequest
+from django.db.models import Sum, Count, Q
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, FileResponse, Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.urls import reverse
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from datetime import datetime
+from importlib.util import find_spec
+from itertools import chain
+import os
 from django.utils import timezone
 from django.core.exceptions import PermissionDenied
-from .models import UserProfile, ChickRequest, FeedAllocation, ChickStock, FeedStock, Customer
+from .models import UserProfile, ChickRequest, FeedAllocation, ChickStock, FeedStock, Customer, SaleLine, ExportJob, StockLevel, FeedStockLevel
 from django.contrib.auth import authenticate, login, logout
 from django.db import transaction
 from django.contrib.auth.forms import AuthenticationForm
 from .forms import UserCreation
+from .dashboard import aget_snapshot
+from .exports import DATASET_MODELS, csv_lines, export_params, report_sheets, stream_rows, streaming_attachment, tsv_lines
+from .approvals import approve_chick_requests, approve_feed_allocation
+from .conditional import updated_at_condition
+from .farmer_import import (
+    OPTIONAL_COLUMNS, REQUIRED_COLUMNS, ImportInterrupted, UnreadableFile, import_farmers, load_rows,
+)
+from .jobs import enqueue_export
+from . import live, rollups
+from .pagination import keyset_paginate
+from .parallel_queries import gather_queries
+from .report_cache import acached_report, report_cache_stats
+from .reporting import activity_series, agent_performance, date_range, weekly_summary
+from .routers import use_replica
+from .search import search_filter
+from .stock_levels import chick_levels
+from .ledger import clear_chick_sale, clear_feed_sale, sale_lines, sales_total
 
 # Create your views here.
 # Landing page
@@ -19,21 +42,15 @@ def indexpage(request):
     search_query = request.GET.get('q', '')
     items_per_page = int(request.GET.get('per_page', 10))
 
-    # Get all chick requests, ordered by request date
-    chick_requests_qs = ChickRequest.objects.select_related('farmer').order_by('-request_date')
+    # Chick requests, newest first
+    chick_requests_qs = ChickRequest.objects.select_related('farmer')
 
-    # Apply search filter
+    # Apply search filter (full-text index, see search.py)
     if search_query:
-        chick_requests_qs = chick_requests_qs.filter(
-            Q(farmer__farmer_name__icontains=search_query) | 
-            Q(chick_request_id__icontains=search_query)
-        )
+        chick_requests_qs = search_filter(chick_requests_qs, 'chick_request', search_query)
 
-    # Paginate the results
-    from django.core.paginator import Paginator
-    paginator = Paginator(chick_requests_qs, items_per_page)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination: no COUNT(*) and no deep OFFSET
+    page_obj = keyset_paginate(request, chick_requests_qs, ('request_date', 'id'), default_per_page=items_per_page)
 
     # Create selection flags for the dropdown
     is_10_selected = items_per_page == 10
@@ -97,6 +114,16 @@ def _redirect_by_role(user):
 
 def role_required(role):
     def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            # Async views: resolve the user without a blocking session/user query
+            @login_required
+            async def _wrapped(request, *args, **kwargs):
+                user = await request.auser()
+                if getattr(user, 'role', None) != role:
+                    raise PermissionDenied
+                return await view_func(request, *args, **kwargs)
+            return _wrapped
+
         @login_required
         def _wrapped(request, *args, **kwargs):
             if getattr(request.user, 'role', None) != role:
@@ -109,73 +136,103 @@ def role_required(role):
 #For the Managers
 
 @role_required('manager')
-def Managersdashboard(request):
-    total_users = UserProfile.objects.count()
-    chick_stock = ChickStock.objects.aggregate(total=Sum('stock_quantity'))['total'] or 0
-    feed_stock = FeedStock.objects.aggregate(total=Sum('feed_quantity'))['total'] or 0
-    # Combine chick and feed request stats
-    chick_stats = ChickRequest.objects.values('status').annotate(c=Count('id'))
-    feed_stats = FeedAllocation.objects.values('status').annotate(c=Count('id'))
-    chick_map = {r['status']: r['c'] for r in chick_stats}
-    feed_map = {r['status']: r['c'] for r in feed_stats}
-    pending_requests = chick_map.get('pending', 0) + feed_map.get('pending', 0)
-    approved_requests = chick_map.get('approved', 0) + feed_map.get('approved', 0)
-    rejected_requests = chick_map.get('rejected', 0) + feed_map.get('rejected', 0)
-    # Total sales amount = feed (approved: bags*selling_price) + chicks (approved: qty*price)
-    feed_total = FeedAllocation.objects.filter(status='approved').aggregate(
-        total=Sum(F('bags_allocated') * F('feed_stock__selling_price'))
-    )['total'] or 0
-    # Latest price per type/breed: use the most recent updated stock entry
-    # For aggregate simplicity, iterate in Python (small datasets typical for dashboard)
-    chick_total = 0
-    for req in ChickRequest.objects.filter(status='approved').select_related('farmer'):
-        price = ChickStock.objects.filter(
-            chick_type=req.chick_type,
-            chick_breed=req.chick_breed
-        ).order_by('-updated_at').values_list('chick_price', flat=True).first() or 1650
-        chick_total += int(req.quantity or 0) * int(price)
-    total_sales = feed_total + chick_total
-    # Delivery stats combining chick and feed deliveries
-    delivered_chicks = ChickRequest.objects.filter(delivered=True).count()
-    delivered_feeds = FeedAllocation.objects.filter(delivered=True).count()
-    deliveries_made = delivered_chicks + delivered_feeds
-    pending_chick_deliv = ChickRequest.objects.filter(status='approved', delivered=False).count()
-    pending_feed_deliv = FeedAllocation.objects.filter(status='approved', delivered=False).count()
-    pending_deliveries = pending_chick_deliv + pending_feed_deliv
-    farmers_with_feeds = FeedAllocation.objects.values('chick_request__farmer').distinct().count()
-    farmers_paid = FeedAllocation.objects.filter(payment_status='paid').count()
-    pending_payments = FeedAllocation.objects.filter(payment_status='pending').count()
+async def Managersdashboard(request):
+    # Single-row read; counters are maintained incrementally (see dashboard.py / signals.py)
+    # Cursor first: live events after it are not in the snapshot yet (see live.py)
+    live_cursor = await sync_to_async(live.cursor)()
+    snap = await aget_snapshot()
+    deliveries_made = snap.chick_delivered + snap.feed_delivered
     context = {
-        'total_users': total_users,
-        'chick_stock': chick_stock,
-        'feed_stock': feed_stock,
-    'completed_requests': deliveries_made,
-        'approved_requests': approved_requests,
-        'pending_requests': pending_requests,
-        'rejected_requests': rejected_requests,
-        'total_sales': total_sales,
+        'total_users': snap.total_users,
+        'chick_stock': snap.chick_stock,
+        'feed_stock': snap.feed_stock,
+        'completed_requests': deliveries_made,
+        'approved_requests': snap.chick_approved + snap.feed_approved,
+        'pending_requests': snap.chick_pending + snap.feed_pending,
+        'rejected_requests': snap.chick_rejected + snap.feed_rejected,
+        'total_sales': snap.total_sales,
         'deliveries_made': deliveries_made,
-        'pending_deliveries': pending_deliveries,
-        'farmers_with_feeds': farmers_with_feeds,
-        'farmers_paid': farmers_paid,
-        'pending_payments': pending_payments,
+        'pending_deliveries': snap.chick_awaiting_delivery + snap.feed_awaiting_delivery,
+        'farmers_with_feeds': snap.farmers_with_feeds,
+        'farmers_paid': snap.payments_paid,
+        'pending_payments': snap.payments_pending,
+        'live_cursor': live_cursor,
     }
-    return render(request, 'managersdashboard.html', context)
+    return await sync_to_async(render)(request, 'managersdashboard.html', context)
 
 @role_required('manager')
 def ViewChickRequests(request):
-    requests_qs = ChickRequest.objects.select_related('farmer').order_by('-request_date')[:200]
-    return render(request, 'viewChickrequests.html', {'requests': requests_qs})
+    live_cursor = live.cursor()
+    requests_qs = ChickRequest.objects.select_related('farmer', 'created_by')
+    status = request.GET.get('status') or ''
+    if status:
+        requests_qs = requests_qs.filter(status=status)
+    page = keyset_paginate(request, requests_qs, ('request_date', 'id'))
+    return render(request, 'viewChickrequests.html', {
+        'requests': page, 'page': page, 'status': status, 'status_choices': ChickRequest.STATUS_CHOICES,
+        'live_cursor': live_cursor,
+    })
+
+@role_required('manager')
+def ChickRequestRows(request):
+    # Rows the live queue re-renders after an event (see _live_events.html); oldest first so
+    # prepending keeps the newest on top
+    rows = ChickRequest.objects.select_related('farmer', 'created_by').filter(
+        pk__in=_live_row_ids(request)).order_by('request_date', 'id')
+    return render(request, '_live_rows.html', {'rows': rows, 'row_template': '_chick_request_row.html'})
 
 @role_required('manager')
 def ViewFeedRequests(request):
-    feed_allocs = FeedAllocation.objects.select_related('chick_request', 'chick_request__farmer', 'feed_stock').order_by('-id')[:200]
-    return render(request, 'viewFeedAllocations.html', {'allocations': feed_allocs})
+    live_cursor = live.cursor()
+    feed_allocs = FeedAllocation.objects.select_related('chick_request', 'chick_request__farmer', 'feed_stock')
+    status = request.GET.get('status') or ''
+    if status:
+        feed_allocs = feed_allocs.filter(status=status)
+    page = keyset_paginate(request, feed_allocs, ('id',))
+    return render(request, 'viewFeedAllocations.html', {
+        'allocations': page, 'page': page, 'status': status, 'status_choices': FeedAllocation.STATUS_CHOICES,
+        'live_cursor': live_cursor,
+    })
+
+@role_required('manager')
+def FeedRequestRows(request):
+    rows = FeedAllocation.objects.select_related('chick_request', 'chick_request__farmer', 'feed_stock').filter(
+        pk__in=_live_row_ids(request)).order_by('id')
+    return render(request, '_live_rows.html', {'rows': rows, 'row_template': '_feed_allocation_row.html'})
+
+def _live_row_ids(request):
+    ids = []
+    for part in request.GET.get('ids', '').split(',')[:200]:
+        if part.strip().isdigit():
+            ids.append(int(part))
+    return ids
+
+# Events each role may stream: sales agents only get stock levels (for the new-request form)
+LIVE_EVENTS_BY_ROLE = {'manager': live.EVENTS, 'sales_agent': ('stock',)}
+
+@login_required
+async def live_events(request):
+    user = await request.auser()
+    names = LIVE_EVENTS_BY_ROLE.get(getattr(user, 'role', None))
+    if names is None:
+        raise PermissionDenied
+    # An open stream would pin a WSGI worker thread for good; only the ASGI app serves it.
+    # 204 tells EventSource to stop reconnecting, so the pages just stay static.
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    since = request.headers.get('Last-Event-ID') or request.GET.get('since') or ''
+    response = StreamingHttpResponse(
+        live.event_stream(int(since) if since.isdigit() else None, names), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 @role_required('manager')
 def FarmerReview(request):
-    requests = ChickRequest.objects.select_related('farmer').order_by('-request_date')
-    return render(request, 'farmerReview.html', {'requests': requests})
+    page = keyset_paginate(request, ChickRequest.objects.select_related('farmer'), ('request_date', 'id'))
+    return render(request, 'farmerReview.html', {'requests': page, 'page': page})
 
 @role_required('manager')
 def Approverequest(request):
@@ -184,15 +241,49 @@ def Approverequest(request):
 
 @role_required('manager')
 def FarmerRecords(request):
-    farmers = Customer.objects.order_by('-registration_date')[:500]
-    return render(request, 'farmerRecords.html', {'farmers': farmers})
+    farmers = Customer.objects.all()
+    search_query = request.GET.get('q', '').strip()
+    if search_query:
+        farmers = search_filter(farmers, 'farmer', search_query)
+    page = keyset_paginate(request, farmers, ('registration_date', 'id'))
+    return render(request, 'farmerRecords.html', {'farmers': page, 'page': page, 'search_query': search_query})
+
+@role_required('manager')
+def ImportFarmers(request):
+    # Bulk registration from a CSV/XLSX upload; valid rows are inserted, the rest reported back
+    context = {'columns': REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload or not upload.name.lower().endswith(('.csv', '.xlsx')):
+            messages.error(request, 'Please upload a .csv or .xlsx file.')
+        else:
+            try:
+                rows = load_rows(upload, upload.name)
+            except UnreadableFile as e:
+                messages.error(request, f'Could not read file: {e}')
+            else:
+                try:
+                    created, rejected = import_farmers(rows, request.user.username)
+                except ImportInterrupted as e:
+                    rejected = e.rejected
+                    messages.error(request, f'The import stopped on a database error after {e.created} '
+                                            f'farmer(s) were saved: {e.error}')
+                else:
+                    if created:
+                        messages.success(request, f'Imported {created} farmer(s).')
+                if rejected:
+                    messages.error(request, f'{len(rejected)} row(s) were rejected; see the report below.')
+                context['rejected'] = rejected
+    return render(request, 'importFarmers.html', context)
 
 @role_required('manager')
+@updated_at_condition(ChickStock)
 def chickStock(request):
     chick_stocks = ChickStock.objects.order_by('batch_name')
     return render(request, 'chickStock.html', {'chick_stocks': chick_stocks})
 
 @role_required('manager')
+@updated_at_condition(FeedStock)
 def feedStock(request):
     feed_stocks = FeedStock.objects.order_by('stock_name')
     return render(request, 'feedStock.html', {'feed_stocks': feed_stocks})
@@ -233,7 +324,9 @@ def UpdateChickStock(request, stock_id=None):
                 # preserve existing chick_age
                 existing_stock.chick_price = chick_price
                 existing_stock.stock_quantity = stock_quantity
-                existing_stock.save()
+                # Stock level rows are adjusted by signals; keep them in this transaction
+                with transaction.atomic():
+                    existing_stock.save()
                 messages.success(request, f"Stock '{batch_name}' updated successfully!")
             else:
                 # Create new stock entry
@@ -245,7 +338,8 @@ def UpdateChickStock(request, stock_id=None):
                     chick_price=chick_price,
                     stock_quantity=stock_quantity
                 )
-                new_stock.save()
+                with transaction.atomic():
+                    new_stock.save()
                 messages.success(request, f"New stock '{batch_name}' added successfully!")
             
             # Redirect to the stock listing page
@@ -322,7 +416,9 @@ def UpdateFeedStock(request, stock_id=None):
                 )
             
             feed_stock.full_clean()
-            feed_stock.save()
+            # Stock level rows are adjusted by signals; keep them in this transaction
+            with transaction.atomic():
+                feed_stock.save()
             
             if stock_id:
                 messages.success(request, 'Feed stock updated successfully!')
@@ -335,13 +431,9 @@ def UpdateFeedStock(request, stock_id=None):
     return render(request, 'updateFeedStock.html', {'feed_stock': feed_stock})
 
 @role_required('manager')
-def Reports(request):
+@use_replica
+async def Reports(request):
     # Filters
-    def parse_date(s):
-        try:
-            return datetime.strptime(s, '%Y-%m-%d').date()
-        except Exception:
-            return None
     filters = {
         'start': request.GET.get('start') or '',
         'end': request.GET.get('end') or '',
@@ -353,8 +445,32 @@ def Reports(request):
         'farmer': request.GET.get('farmer') or '',
         'q': request.GET.get('q') or '',
     }
-    start_date = parse_date(filters['start'])
-    end_date = parse_date(filters['end'])
+
+    async def build():
+        # The report's queries are independent; run them side by side (see parallel_queries.py)
+        results, timed_out = await gather_queries(_report_queries(filters))
+        if timed_out:
+            messages.warning(request, "Some report figures took too long to load and are left blank. Reload to try again.")
+        return _reports_context(filters, results), not timed_out
+
+    # The computed report is cached per filter set and invalidated by data versions (see report_cache.py)
+    context = await acached_report(filters, build)
+    return await sync_to_async(render)(request, 'reports.html', {**context, 'filters': filters})
+
+@role_required('manager')
+def ReportsCacheStats(request):
+    return JsonResponse(report_cache_stats())
+
+def _parse_report_date(s):
+    try:
+        return datetime.strptime(s, '%Y-%m-%d').date()
+    except Exception:
+        return None
+
+def _report_queries(filters):
+    """Every query behind the Reports page as ``{name: callable}``; building this runs nothing."""
+    start_date = _parse_report_date(filters['start'])
+    end_date = _parse_report_date(filters['end'])
 
     # Base querysets
     chick_requests_qs = ChickRequest.objects.select_related('farmer', 'created_by').order_by('-request_date')
@@ -364,14 +480,10 @@ def Reports(request):
     feed_stock_qs = FeedStock.objects.order_by('stock_name')
 
     # Apply filters
-    if start_date:
-        chick_requests_qs = chick_requests_qs.filter(request_date__date__gte=start_date)
-        feed_allocations_qs = feed_allocations_qs.filter(chick_request__request_date__date__gte=start_date)
-        farmers_qs = farmers_qs.filter(registration_date__date__gte=start_date)
-    if end_date:
-        chick_requests_qs = chick_requests_qs.filter(request_date__date__lte=end_date)
-        feed_allocations_qs = feed_allocations_qs.filter(chick_request__request_date__date__lte=end_date)
-        farmers_qs = farmers_qs.filter(registration_date__date__lte=end_date)
+    # Datetime bounds rather than __date lookups so the date indexes apply
+    chick_requests_qs = chick_requests_qs.filter(**date_range('request_date', start_date, end_date))
+    feed_allocations_qs = feed_allocations_qs.filter(**date_range('chick_request__request_date', start_date, end_date))
+    farmers_qs = farmers_qs.filter(**date_range('registration_date', start_date, end_date))
     if filters['chick_type']:
         chick_requests_qs = chick_requests_qs.filter(chick_type=filters['chick_type'])
         chick_stock_qs = chick_stock_qs.filter(chick_type=filters['chick_type'])
@@ -392,41 +504,81 @@ def Reports(request):
         feed_allocations_qs = feed_allocations_qs.filter(chick_request__farmer_id=filters['farmer'])
     if filters['q']:
         q = filters['q']
-        chick_requests_qs = chick_requests_qs.filter(
-            Q(chick_request_id__icontains=q) | Q(farmer__farmer_name__icontains=q) | Q(created_by__username__icontains=q)
-        )
-        feed_allocations_qs = feed_allocations_qs.filter(
-            Q(feed_request_id__icontains=q) | Q(chick_request__chick_request_id__icontains=q) | Q(chick_request__farmer__farmer_name__icontains=q)
-        )
-        farmers_qs = farmers_qs.filter(Q(farmer_id__icontains=q) | Q(farmer_name__icontains=q))
-
-    # Totals and stats
-    chick_stock_total = chick_stock_qs.aggregate(total=Sum('stock_quantity'))['total'] or 0
-    feed_stock_total = feed_stock_qs.aggregate(total=Sum('feed_quantity'))['total'] or 0
-
-    # Sales totals
-    feed_total = feed_allocations_qs.filter(status='approved').aggregate(
-        total=Sum(F('bags_allocated') * F('feed_stock__selling_price'))
-    )['total'] or 0
-    chick_total = 0
-    for req in chick_requests_qs.filter(status='approved'):
-        price = ChickStock.objects.filter(
-            chick_type=req.chick_type,
-            chick_breed=req.chick_breed
-        ).order_by('-updated_at').values_list('chick_price', flat=True).first() or 1650
-        chick_total += int(req.quantity or 0) * int(price)
-    total_sales = feed_total + chick_total
+        chick_requests_qs = search_filter(chick_requests_qs, 'chick_request', q)
+        feed_allocations_qs = search_filter(feed_allocations_qs, 'feed_allocation', q)
+        farmers_qs = search_filter(farmers_qs, 'farmer', q)
 
-    # Use the same sliced datasets for tables and stats to keep summaries in sync with what's shown
-    chick_requests_display = list(chick_requests_qs[:1000])
-    feed_allocations_display = list(feed_allocations_qs[:1000])
+    # Stock totals come from the level tables (a handful of rows) rather than summing every batch
+    chick_levels_qs = StockLevel.objects.all()
+    if filters['chick_type']:
+        chick_levels_qs = chick_levels_qs.filter(chick_type=filters['chick_type'])
+    if filters['chick_breed']:
+        chick_levels_qs = chick_levels_qs.filter(chick_breed=filters['chick_breed'])
+    feed_levels_qs = FeedStockLevel.objects.all()
+    if filters['feed_type']:
+        feed_levels_qs = feed_levels_qs.filter(feed_type=filters['feed_type'])
+
+    # Sales totals: ledger lines belonging to the filtered requests/allocations
+    sales_qs = SaleLine.objects.filter(
+        Q(kind='chick', chick_request__in=chick_requests_qs.filter(status='approved').values('id')) |
+        Q(kind='feed', feed_allocation__in=feed_allocations_qs.filter(status='approved').values('id'))
+    )
+
+    queries = {
+        'chick_stock': lambda: list(chick_stock_qs),
+        'feed_stock': lambda: list(feed_stock_qs),
+        'chick_stock_total': lambda: chick_levels_qs.aggregate(total=Sum('quantity'))['total'] or 0,
+        'feed_stock_total': lambda: feed_levels_qs.aggregate(total=Sum('quantity'))['total'] or 0,
+        'total_sales': lambda: sales_total(sales_qs),
+        # Tables and their status stats share the same sliced datasets
+        'chick_requests': lambda: list(chick_requests_qs[:1000]),
+        'feed_allocations': lambda: list(feed_allocations_qs[:1000]),
+        'farmers': lambda: list(farmers_qs[:1000]),
+        'total_farmers': lambda: farmers_qs.count(),
+        'pending_chick_requests': lambda: chick_requests_qs.filter(status='pending').count(),
+        'pending_feed_payments': lambda: feed_allocations_qs.filter(payment_status='pending').count(),
+        'low_chick_stock': lambda: ChickStock.objects.filter(stock_quantity__lt=100).count(),
+        'low_feed_stock': lambda: FeedStock.objects.filter(feed_quantity__lt=50).count(),
+        # Activity charts (daily buckets), weekly summary and agent performance: GROUP BY queries over
+        # the full filtered querysets (see reporting.py)
+        'activity': lambda: activity_series(chick_requests_qs, feed_allocations_qs),
+        'weekly_summary': lambda: weekly_summary(chick_requests_qs, feed_allocations_qs),
+        'agent_perf': lambda: agent_performance(chick_requests_qs, feed_allocations_qs),
+        # Choices and aux lists
+        'feed_types': lambda: list(FeedStock.objects.values_list('feed_type', flat=True).distinct()),
+        'agents': lambda: list(UserProfile.objects.filter(role='sales_agent').order_by('username')),
+        'farmers_all': lambda: list(Customer.objects.order_by('farmer_name')),
+    }
+
+    # Without farmer or search filters the same figures come from the daily rollups, plus the
+    # source rows of the days not rolled up yet (see rollups.py)
+    if rollups.covers(filters):
+        rollup_filters = {**filters, 'start': start_date, 'end': end_date}
+        queries.update({
+            'activity': lambda: rollups.activity_series(rollup_filters, chick_requests_qs, feed_allocations_qs),
+            'weekly_summary': lambda: rollups.weekly_summary(rollup_filters, chick_requests_qs, feed_allocations_qs),
+            'agent_perf': lambda: rollups.agent_performance(rollup_filters, chick_requests_qs, feed_allocations_qs),
+        })
+
+    # Trends (last 30 days vs previous 30), only when no explicit date filter; read from the rollups
+    if not start_date and not end_date:
+        from datetime import timedelta
+        today = timezone.localdate()
+        cur_start = today - timedelta(days=30)
+        prev_start = today - timedelta(days=60)
+        prev_last = today - timedelta(days=31)
+        queries.update({
+            'requests_cur': lambda: rollups.request_totals(cur_start),
+            'requests_prev': lambda: rollups.request_totals(prev_start, prev_last),
+            'sales_cur': lambda: rollups.sales_amount(cur_start),
+            'sales_prev': lambda: rollups.sales_amount(prev_start, prev_last),
+        })
+    return queries
 
-    total_chick_requests = len(chick_requests_display)
-    total_feed_allocations = len(feed_allocations_display)
-    total_farmers = farmers_qs.count()
-    pending_chick_requests = chick_requests_qs.filter(status='pending').count()
-    pending_feed_payments = feed_allocations_qs.filter(payment_status='pending').count()
-    low_stock_items = ChickStock.objects.filter(stock_quantity__lt=100).count() + FeedStock.objects.filter(feed_quantity__lt=50).count()
+def _reports_context(filters, results):
+    """Template context from the results of :func:`_report_queries`; timed-out results are ``None``."""
+    chick_requests_display = results['chick_requests'] or []
+    feed_allocations_display = results['feed_allocations'] or []
 
     # Status stats for block (compute from the same displayed lists)
     from collections import Counter
@@ -441,133 +593,52 @@ def Reports(request):
         'fa_rejected': sf_counter.get('rejected', 0),
     }
 
-    # Activity charts (daily buckets) and weekly summary
-    from collections import OrderedDict
-    buckets = OrderedDict()
-    def date_key(dt):
-        d = dt.date() if hasattr(dt, 'date') else dt
-        return d.strftime('%Y-%m-%d')
-    for r in chick_requests_qs:
-        k = date_key(r.request_date)
-        buckets.setdefault(k, {'chicks':0,'feeds':0})
-        buckets[k]['chicks'] += 1
-    for a in feed_allocations_qs:
-        k = date_key(a.chick_request.request_date)
-        buckets.setdefault(k, {'chicks':0,'feeds':0})
-        buckets[k]['feeds'] += 1
+    buckets = results['activity'] or {}
     activity_labels = list(buckets.keys())
     activity_chicks = [buckets[k]['chicks'] for k in activity_labels]
     activity_feeds = [buckets[k]['feeds'] for k in activity_labels]
     # Status mix for chicks (used by charts/summary); derive from same displayed counts
     status_mix = {k: sc_counter.get(k, 0) for k in ['pending','approved','rejected','completed']}
 
-    # Weekly summary: ISO year-week
-    from collections import defaultdict
-    wk = defaultdict(lambda: {'chicks':0,'feeds':0})
-    for r in chick_requests_qs:
-        y, w, _ = r.request_date.isocalendar()
-        wk[(y,w)]['chicks'] += 1
-    for a in feed_allocations_qs:
-        y, w, _ = a.chick_request.request_date.isocalendar()
-        wk[(y,w)]['feeds'] += 1
-    weekly_summary = [
-        {
-            'label': f"{y}-W{w:02d}",
-            'chicks': v['chicks'],
-            'feeds': v['feeds'],
-            'total': v['chicks'] + v['feeds'],
-        }
-        for (y,w), v in sorted(wk.items())
-    ]
-
-    # Agent performance
-    agent_perf_map = {}
-    # Chick requests contribution
-    for r in chick_requests_display:
-        key = getattr(r.created_by, 'username', 'N/A')
-        d = agent_perf_map.setdefault(key, {'total':0,'approved':0,'rejected':0,'delivered':0})
-        d['total'] += 1
-        if r.status=='approved': d['approved'] += 1
-        if r.status=='rejected': d['rejected'] += 1
-        if r.delivered: d['delivered'] += 1
-    # Feed allocations contribution (by request owner)
-    for a in feed_allocations_display:
-        key = getattr(getattr(a.chick_request, 'created_by', None), 'username', 'N/A')
-        d = agent_perf_map.setdefault(key, {'total':0,'approved':0,'rejected':0,'delivered':0})
-        d['total'] += 1
-        if a.status=='approved': d['approved'] += 1
-        if a.status=='rejected': d['rejected'] += 1
-        if a.delivered: d['delivered'] += 1
-    agent_perf = [{'agent':k, **v} for k,v in sorted(agent_perf_map.items())]
-
-    # Choices and aux lists
-    chick_type_choices = ChickStock._meta.get_field('chick_type').choices
-    chick_breed_choices = ChickStock._meta.get_field('chick_breed').choices
-    feed_types = list(FeedStock.objects.values_list('feed_type', flat=True).distinct())
-    agents = UserProfile.objects.filter(role='sales_agent').order_by('username')
-    farmers_all = Customer.objects.order_by('farmer_name')
-
-    # Trends (last 30 days vs previous 30), only when no explicit date filter
+    low_stock_items = None
+    if results['low_chick_stock'] is not None and results['low_feed_stock'] is not None:
+        low_stock_items = results['low_chick_stock'] + results['low_feed_stock']
+
     trends = None
-    if not start_date and not end_date:
-        from datetime import timedelta
-        today = timezone.now().date()
-        cur_start = today - timedelta(days=30)
-        prev_start = today - timedelta(days=60)
-        prev_end = today - timedelta(days=30)
-        # counts
-        cr_cur = ChickRequest.objects.filter(request_date__date__gte=cur_start).count()
-        cr_prev = ChickRequest.objects.filter(request_date__date__gte=prev_start, request_date__date__lt=prev_end).count()
-        fa_cur = FeedAllocation.objects.filter(chick_request__request_date__date__gte=cur_start).count()
-        fa_prev = FeedAllocation.objects.filter(chick_request__request_date__date__gte=prev_start, chick_request__request_date__date__lt=prev_end).count()
-        # sales
-        def calc_sales(start_d, end_d=None):
-            feed_qs = FeedAllocation.objects.filter(status='approved', chick_request__request_date__date__gte=start_d)
-            if end_d:
-                feed_qs = feed_qs.filter(chick_request__request_date__date__lt=end_d)
-            feed_t = feed_qs.aggregate(total=Sum(F('bags_allocated') * F('feed_stock__selling_price')))['total'] or 0
-            chick_qs2 = ChickRequest.objects.filter(status='approved', request_date__date__gte=start_d)
-            if end_d:
-                chick_qs2 = chick_qs2.filter(request_date__date__lt=end_d)
-            ct = 0
-            for r in chick_qs2:
-                price = ChickStock.objects.filter(chick_type=r.chick_type, chick_breed=r.chick_breed).order_by('-updated_at').values_list('chick_price', flat=True).first() or 1650
-                ct += int(r.quantity or 0) * int(price)
-            return (feed_t or 0) + (ct or 0)
-        sales_cur = calc_sales(cur_start, None)
-        sales_prev = calc_sales(prev_start, prev_end)
+    trend_inputs = ('sales_cur', 'sales_prev', 'requests_cur', 'requests_prev')
+    if all(results.get(k) is not None for k in trend_inputs):
+        (cr_cur, fa_cur), (cr_prev, fa_prev) = results['requests_cur'], results['requests_prev']
         def pct(cur, prev):
             try:
                 return round(((cur - prev) / prev) * 100.0, 1) if prev else (100.0 if cur and not prev else 0.0)
             except Exception:
                 return 0.0
         trends = {
-            'sales': pct(sales_cur, sales_prev),
+            'sales': pct(results['sales_cur'], results['sales_prev']),
             'chick_requests': pct(cr_cur, cr_prev),
             'feed_allocations': pct(fa_cur, fa_prev),
         }
 
-    context = {
-        'filters': filters,
-        'chick_stock': list(chick_stock_qs),
-        'feed_stock': list(feed_stock_qs),
-        'chick_stock_total': chick_stock_total,
-        'feed_stock_total': feed_stock_total,
-    'chick_requests': chick_requests_display,
-    'feed_allocations': feed_allocations_display,
-        'farmers': list(farmers_qs[:1000]),
+    return {
+        'chick_stock': results['chick_stock'] or [],
+        'feed_stock': results['feed_stock'] or [],
+        'chick_stock_total': results['chick_stock_total'],
+        'feed_stock_total': results['feed_stock_total'],
+        'chick_requests': chick_requests_display,
+        'feed_allocations': feed_allocations_display,
+        'farmers': results['farmers'] or [],
         'stats': stats,
-        'chick_type_choices': chick_type_choices,
-        'chick_breed_choices': chick_breed_choices,
-        'feed_types': feed_types,
-        'agents': agents,
-        'farmers_all': farmers_all,
-        'total_sales': total_sales,
-        'total_chick_requests': total_chick_requests,
-        'total_feed_allocations': total_feed_allocations,
-        'total_farmers': total_farmers,
-        'pending_chick_requests': pending_chick_requests,
-        'pending_feed_payments': pending_feed_payments,
+        'chick_type_choices': ChickStock._meta.get_field('chick_type').choices,
+        'chick_breed_choices': ChickStock._meta.get_field('chick_breed').choices,
+        'feed_types': results['feed_types'] or [],
+        'agents': results['agents'] or [],
+        'farmers_all': results['farmers_all'] or [],
+        'total_sales': results['total_sales'],
+        'total_chick_requests': len(chick_requests_display),
+        'total_feed_allocations': len(feed_allocations_display),
+        'total_farmers': results['total_farmers'],
+        'pending_chick_requests': results['pending_chick_requests'],
+        'pending_feed_payments': results['pending_feed_payments'],
         'low_stock_items': low_stock_items,
         'charts': {
             'activity_labels': activity_labels,
@@ -575,317 +646,73 @@ def Reports(request):
             'activity_feeds': activity_feeds,
             'status_mix': status_mix,
         },
-    'trends': trends,
-    'weekly_summary': weekly_summary,
-    'agent_perf': agent_perf,
+        'trends': trends,
+        'weekly_summary': results['weekly_summary'] or [],
+        'agent_perf': results['agent_perf'] or [],
     }
-    return render(request, 'reports.html', context)
 
 @role_required('manager')
+@use_replica
 def reports_export(request):
     dataset = request.GET.get('dataset')
     fmt = request.GET.get('format', 'csv')
-
-    # Reuse Reports filters logic to build filtered querysets (without rendering)
-    # We'll factor minimal parts here
-    def parse_date(s):
-        try:
-            return datetime.strptime(s, '%Y-%m-%d').date()
-        except Exception:
-            return None
-    start = parse_date(request.GET.get('start') or '')
-    end = parse_date(request.GET.get('end') or '')
-    status = request.GET.get('status') or ''
-    chick_type = request.GET.get('chick_type') or ''
-    chick_breed = request.GET.get('chick_breed') or ''
-    feed_type = request.GET.get('feed_type') or ''
-    agent = request.GET.get('agent') or ''
-    farmer = request.GET.get('farmer') or ''
-    location = request.GET.get('location') or ''
-    q = request.GET.get('q') or ''
-
-    # Build datasets
-    if dataset == 'chick_stock':
-        qs = ChickStock.objects.all()
-        if chick_type: qs = qs.filter(chick_type=chick_type)
-        if chick_breed: qs = qs.filter(chick_breed=chick_breed)
-        rows = [['Batch','Type','Breed','Age','Price','Qty']]
-        for s in qs.order_by('batch_name'):
-            rows.append([s.batch_name,s.chick_type,s.chick_breed,s.chick_age,s.chick_price,s.stock_quantity])
-        filename = 'chick_stock'
-    elif dataset == 'feed_stock':
-        qs = FeedStock.objects.all()
-        if feed_type: qs = qs.filter(feed_type=feed_type)
-        rows = [['Stock','Feed','Type','Brand','Qty','Unit Price']]
-        for s in qs.order_by('stock_name'):
-            rows.append([s.stock_name,s.feed_name,s.feed_type,s.feed_brand,s.feed_quantity,s.selling_price])
-        filename = 'feed_stock'
-    elif dataset == 'chick_requests':
-        qs = ChickRequest.objects.select_related('farmer','created_by')
-        if start: qs = qs.filter(request_date__date__gte=start)
-        if end: qs = qs.filter(request_date__date__lte=end)
-        if status: qs = qs.filter(status=status)
-        if chick_type: qs = qs.filter(chick_type=chick_type)
-        if chick_breed: qs = qs.filter(chick_breed=chick_breed)
-        if agent: qs = qs.filter(created_by_id=agent)
-        if farmer: qs = qs.filter(farmer_id=farmer)
-        if location: qs = qs.filter(farmer__location__icontains=location)
-        if q: qs = qs.filter(Q(chick_request_id__icontains=q) | Q(farmer__farmer_name__icontains=q))
-        rows = [['Req ID','Farmer','Type','Breed','Qty','Status','Date']]
-        for r in qs.order_by('-request_date'):
-            rows.append([r.chick_request_id, r.farmer.farmer_name, r.chick_type, r.chick_breed, r.quantity, r.status, r.request_date.strftime('%Y-%m-%d %H:%M')])
-        filename = 'chick_requests'
-    elif dataset == 'feed_allocations':
-        qs = FeedAllocation.objects.select_related('chick_request','chick_request__farmer','feed_stock')
-        if start: qs = qs.filter(chick_request__request_date__date__gte=start)
-        if end: qs = qs.filter(chick_request__request_date__date__lte=end)
-        if status: qs = qs.filter(status=status)
-        if feed_type: qs = qs.filter(feed_type=feed_type)
-        if agent: qs = qs.filter(chick_request__created_by_id=agent)
-        if farmer: qs = qs.filter(chick_request__farmer_id=farmer)
-        if location: qs = qs.filter(chick_request__farmer__location__icontains=location)
-        if q: qs = qs.filter(Q(feed_request_id__icontains=q) | Q(chick_request__chick_request_id__icontains=q))
-        rows = [['Feed ID','Req ID','Feed','Brand','Bags','Status','Payment']]
-        for a in qs.order_by('-id'):
-            rows.append([a.feed_request_id, a.chick_request.chick_request_id, a.feed_name, a.feed_brand, a.bags_allocated, a.status, a.payment_status])
-        filename = 'feed_allocations'
-    elif dataset == 'farmers':
-        qs = Customer.objects.all()
-        if start: qs = qs.filter(registration_date__date__gte=start)
-        if end: qs = qs.filter(registration_date__date__lte=end)
-        if location: qs = qs.filter(location__icontains=location)
-        if q: qs = qs.filter(Q(farmer_id__icontains=q) | Q(farmer_name__icontains=q))
-        rows = [['Farmer ID','Name','Gender','Age','Phone','Location','Registered']]
-        for f in qs.order_by('-registration_date'):
-            rows.append([f.farmer_id, f.farmer_name, f.gender, f.age, f.phone_number, f.location, f.registration_date.strftime('%Y-%m-%d %H:%M')])
-        filename = 'farmers'
-    elif dataset == 'agent_performance':
-        # Aggregate from ChickRequest
-        perf = {}
-        qs = ChickRequest.objects.select_related('created_by')
-        if start: qs = qs.filter(request_date__date__gte=start)
-        if end: qs = qs.filter(request_date__date__lte=end)
-        for r in qs:
-            key = getattr(r.created_by, 'username', 'N/A')
-            d = perf.setdefault(key, {'total':0,'approved':0,'rejected':0,'delivered':0})
-            d['total'] += 1
-            if r.status=='approved': d['approved'] += 1
-            if r.status=='rejected': d['rejected'] += 1
-            if r.delivered: d['delivered'] += 1
-        rows = [['Agent','Requests','Approved','Rejected','Delivered']]
-        for k,v in sorted(perf.items()):
-            rows.append([k, v['total'], v['approved'], v['rejected'], v['delivered']])
-        filename = 'agent_performance'
-    elif dataset == 'activity_daily':
-        # Build daily activity counts
-        from collections import OrderedDict
-        qsR = ChickRequest.objects.all()
-        qsA = FeedAllocation.objects.all()
-        if start: qsR = qsR.filter(request_date__date__gte=start)
-        if end: qsR = qsR.filter(request_date__date__lte=end)
-        if start: qsA = qsA.filter(chick_request__request_date__date__gte=start)
-        if end: qsA = qsA.filter(chick_request__request_date__date__lte=end)
-        buckets = OrderedDict()
-        def key(d):
-            return d.strftime('%Y-%m-%d')
-        for r in qsR:
-            buckets[key(r.request_date.date())] = buckets.get(key(r.request_date.date()), {'chicks':0,'feeds':0})
-            buckets[key(r.request_date.date())]['chicks'] += 1
-        for a in qsA:
-            d = a.chick_request.request_date.date()
-            buckets[key(d)] = buckets.get(key(d), {'chicks':0,'feeds':0})
-            buckets[key(d)]['feeds'] += 1
-        rows = [['Date','Chick Requests','Feed Allocations']]
-        for k,v in buckets.items():
-            rows.append([k, v['chicks'], v['feeds']])
-        filename = 'activity_daily'
-    elif dataset == 'activity_weekly':
-        from collections import defaultdict
-        qsR = ChickRequest.objects.all()
-        qsA = FeedAllocation.objects.all()
-        if start: qsR = qsR.filter(request_date__date__gte=start)
-        if end: qsR = qsR.filter(request_date__date__lte=end)
-        if start: qsA = qsA.filter(chick_request__request_date__date__gte=start)
-        if end: qsA = qsA.filter(chick_request__request_date__date__lte=end)
-        wk = defaultdict(lambda: {'chicks':0,'feeds':0})
-        for r in qsR:
-            y, w, _ = r.request_date.isocalendar()
-            wk[(y,w)]['chicks'] += 1
-        for a in qsA:
-            y, w, _ = a.chick_request.request_date.isocalendar()
-            wk[(y,w)]['feeds'] += 1
-        rows = [['Year-Week','Chick Requests','Feed Allocations','Total']]
-        for (y,w), v in sorted(wk.items()):
-            rows.append([f"{y}-W{w:02d}", v['chicks'], v['feeds'], v['chicks']+v['feeds']])
-        filename = 'activity_weekly'
-    elif dataset == 'general':
-        # Build a combined representation using same filters as the page
-        # Reuse minimal parse/query bits from above
-        # Chick stock
-        cs = ChickStock.objects.all()
-        if chick_type: cs = cs.filter(chick_type=chick_type)
-        if chick_breed: cs = cs.filter(chick_breed=chick_breed)
-        chick_stock_rows = [['Batch','Type','Breed','Age','Price','Qty']]
-        for s in cs.order_by('batch_name'):
-            chick_stock_rows.append([s.batch_name,s.chick_type,s.chick_breed,s.chick_age,s.chick_price,s.stock_quantity])
-        # Feed stock
-        fs = FeedStock.objects.all()
-        if feed_type: fs = fs.filter(feed_type=feed_type)
-        feed_stock_rows = [['Stock','Feed','Type','Brand','Qty','Unit Price']]
-        for s in fs.order_by('stock_name'):
-            feed_stock_rows.append([s.stock_name,s.feed_name,s.feed_type,s.feed_brand,s.feed_quantity,s.selling_price])
-        # Chick requests
-        cr = ChickRequest.objects.select_related('farmer','created_by')
-        if start: cr = cr.filter(request_date__date__gte=start)
-        if end: cr = cr.filter(request_date__date__lte=end)
-        if status: cr = cr.filter(status=status)
-        if chick_type: cr = cr.filter(chick_type=chick_type)
-        if chick_breed: cr = cr.filter(chick_breed=chick_breed)
-        if agent: cr = cr.filter(created_by_id=agent)
-        if farmer: cr = cr.filter(farmer_id=farmer)
-        if q: cr = cr.filter(Q(chick_request_id__icontains=q) | Q(farmer__farmer_name__icontains=q))
-        chick_req_rows = [['Req ID','Farmer','Type','Breed','Qty','Status','Date']]
-        for r in cr.order_by('-request_date'):
-            chick_req_rows.append([r.chick_request_id, r.farmer.farmer_name, r.chick_type, r.chick_breed, r.quantity, r.status, r.request_date.strftime('%Y-%m-%d %H:%M')])
-        # Feed allocations
-        fa = FeedAllocation.objects.select_related('chick_request','chick_request__farmer','feed_stock')
-        if start: fa = fa.filter(chick_request__request_date__date__gte=start)
-        if end: fa = fa.filter(chick_request__request_date__date__lte=end)
-        if status: fa = fa.filter(status=status)
-        if feed_type: fa = fa.filter(feed_type=feed_type)
-        if agent: fa = fa.filter(chick_request__created_by_id=agent)
-        if farmer: fa = fa.filter(chick_request__farmer_id=farmer)
-        if q: fa = fa.filter(Q(feed_request_id__icontains=q) | Q(chick_request__chick_request_id__icontains=q))
-        feed_alloc_rows = [['Feed ID','Req ID','Feed','Brand','Bags','Status','Payment']]
-        for a in fa.order_by('-id'):
-            feed_alloc_rows.append([a.feed_request_id, a.chick_request.chick_request_id, a.feed_name, a.feed_brand, a.bags_allocated, a.status, a.payment_status])
-
-        # Agent performance (aggregate across both datasets)
-        perf = {}
-        for r in cr:
-            key = getattr(r.created_by, 'username', 'N/A')
-            d = perf.setdefault(key, {'total':0,'approved':0,'rejected':0,'delivered':0})
-            d['total'] += 1
-            if r.status=='approved': d['approved'] += 1
-            if r.status=='rejected': d['rejected'] += 1
-            if r.delivered: d['delivered'] += 1
-        for a in fa:
-            key = getattr(getattr(a.chick_request, 'created_by', None), 'username', 'N/A')
-            d = perf.setdefault(key, {'total':0,'approved':0,'rejected':0,'delivered':0})
-            d['total'] += 1
-            if a.status=='approved': d['approved'] += 1
-            if a.status=='rejected': d['rejected'] += 1
-            if a.delivered: d['delivered'] += 1
-        agent_rows = [['Agent','Requests','Approved','Rejected','Delivered']]
-        for k,v in sorted(perf.items()):
-            agent_rows.append([k, v['total'], v['approved'], v['rejected'], v['delivered']])
-
-        # Output formats
-        if fmt == 'xlsx':
-            try:
-                from openpyxl import Workbook
-            except Exception:
-                return HttpResponse('Install openpyxl to enable Excel export: pip install openpyxl', content_type='text/plain')
-            wb = Workbook()
-            ws1 = wb.active; ws1.title = 'Chick Stock'
-            for r in chick_stock_rows: ws1.append(r)
-            ws2 = wb.create_sheet('Feed Stock')
-            for r in feed_stock_rows: ws2.append(r)
-            ws3 = wb.create_sheet('Chick Requests')
-            for r in chick_req_rows: ws3.append(r)
-            ws4 = wb.create_sheet('Feed Allocations')
-            for r in feed_alloc_rows: ws4.append(r)
-            ws5 = wb.create_sheet('Agent Performance')
-            for r in agent_rows: ws5.append(r)
-            from io import BytesIO
-            buff = BytesIO(); wb.save(buff); buff.seek(0)
-            resp = HttpResponse(buff.read(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            resp['Content-Disposition'] = 'attachment; filename="general.xlsx"'
-            return resp
-        elif fmt == 'pdf':
-            try:
-                from reportlab.lib.pagesizes import A4
-                from reportlab.pdfgen import canvas
-            except Exception:
-                return HttpResponse('Install reportlab to enable PDF export: pip install reportlab', content_type='text/plain')
-            from io import BytesIO
-            buff = BytesIO(); c = canvas.Canvas(buff, pagesize=A4)
-            width, height = A4; x0, y = 40, height-50
-            def write_section(title, rows):
-                nonlocal y
-                c.setFont('Helvetica-Bold', 12); c.drawString(x0, y, title); y -= 18
-                c.setFont('Helvetica', 10)
-                for row in rows:
-                    line = '  '.join(str(x) for x in row)
-                    c.drawString(x0, y, line[:120]); y -= 14
-                    if y < 60:
-                        c.showPage(); y = height-50
-            write_section('Chick Stock', chick_stock_rows)
-            write_section('Feed Stock', feed_stock_rows)
-            write_section('Chick Requests', chick_req_rows)
-            write_section('Feed Allocations', feed_alloc_rows)
-            write_section('Agent Performance', agent_rows)
-            c.save(); buff.seek(0)
-            resp = HttpResponse(buff.read(), content_type='application/pdf')
-            resp['Content-Disposition'] = 'attachment; filename="general.pdf"'
-            return resp
-        else:
-            return HttpResponseBadRequest('Unknown format')
-    else:
+    params = export_params(request.GET)
+    if dataset not in DATASET_MODELS:
         return HttpResponseBadRequest('Unknown dataset')
 
-    # Writers per format
-    if fmt == 'csv':
-        import csv
-        resp = HttpResponse(content_type='text/csv')
-        resp['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        writer = csv.writer(resp)
-        for row in rows:
-            writer.writerow(row)
-        return resp
-    elif fmt == 'xlsx':
-        try:
-            from openpyxl import Workbook
-        except Exception:
-            return HttpResponse('Install openpyxl to enable Excel export: pip install openpyxl', content_type='text/plain')
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'Report'
-        for r in rows:
-            ws.append(r)
-        from io import BytesIO
-        buff = BytesIO()
-        wb.save(buff)
-        buff.seek(0)
-        resp = HttpResponse(buff.read(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        resp['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
-        return resp
-    elif fmt == 'pdf':
-        try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.pdfgen import canvas
-        except Exception:
-            return HttpResponse('Install reportlab to enable PDF export: pip install reportlab', content_type='text/plain')
-        from io import BytesIO
-        buff = BytesIO()
-        c = canvas.Canvas(buff, pagesize=A4)
-        width, height = A4
-        x0, y = 40, height - 50
-        for i,row in enumerate(rows):
-            line = '  '.join(str(x) for x in row)
-            c.drawString(x0, y, line[:120])
-            y -= 16
-            if y < 60:
-                c.showPage(); y = height - 50
-        c.save()
-        buff.seek(0)
-        resp = HttpResponse(buff.read(), content_type='application/pdf')
-        resp['Content-Disposition'] = f'attachment; filename="{filename}.pdf"'
-        return resp
-    else:
+    # CSV is streamed straight from the DB (not available for the multi-sheet general report)
+    if fmt == 'csv' and dataset != 'general':
+        (_, header, body), = report_sheets(dataset, params)
+        return streaming_attachment(csv_lines(chain([header], body)), f'{dataset}.csv', content_type='text/csv')
+    if fmt not in ('xlsx', 'pdf'):
         return HttpResponseBadRequest('Unknown format')
 
+    # Excel/PDF files are built by the export worker (manage.py run_export_worker)
+    if fmt == 'xlsx' and not find_spec('openpyxl'):
+        return HttpResponse('Install openpyxl to enable Excel export: pip install openpyxl', content_type='text/plain')
+    if fmt == 'pdf' and not find_spec('reportlab'):
+        return HttpResponse('Install reportlab to enable PDF export: pip install reportlab', content_type='text/plain')
+    job = enqueue_export(dataset, fmt, params, user=request.user)
+    if _wants_json(request):
+        return JsonResponse(_export_job_payload(job), status=202)
+    return redirect('export_job', job_id=job.pk)
+
+
+def _wants_json(request):
+    return 'application/json' in request.headers.get('Accept', '')
+
+
+def _export_job_payload(job):
+    return {
+        'job_id': str(job.pk),
+        'dataset': job.dataset,
+        'format': job.format,
+        'status': job.status,
+        'progress': job.progress,
+        'rows_written': job.rows_written,
+        'error': job.error,
+        'status_url': reverse('export_job', args=[job.pk]),
+        'download_url': reverse('export_job_download', args=[job.pk]) if job.status == 'done' else None,
+    }
+
+
+@role_required('manager')
+def ExportJobStatus(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id)
+    if _wants_json(request):
+        return JsonResponse(_export_job_payload(job))
+    return render(request, 'exportJob.html', {'job': job})
+
+
+@role_required('manager')
+def ExportJobDownload(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id, status='done')
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise Http404('Export file is no longer available.')
+    return FileResponse(open(job.file_path, 'rb'), as_attachment=True, filename=job.filename)
+
 @role_required('manager')
+@use_replica
 def Sales(request):
     # Filters: optional start/end date (YYYY-MM-DD)
     start = request.GET.get('start')
@@ -898,55 +725,38 @@ def Sales(request):
     start_date = parse_date(start)
     end_date = parse_date(end)
 
-    # Feed sales rows: approved allocations with amounts = bags * selling_price
-    feed_qs = FeedAllocation.objects.filter(status='approved').select_related('chick_request__farmer', 'feed_stock').order_by('-id')
-    if start_date:
-        feed_qs = feed_qs.filter(chick_request__request_date__date__gte=start_date)
-    if end_date:
-        feed_qs = feed_qs.filter(chick_request__request_date__date__lte=end_date)
+    # Feed sales rows: ledger lines priced at approval (bags * selling_price)
+    feed_qs = sale_lines(start_date, end_date, kind='feed').select_related('chick_request__farmer', 'feed_allocation').order_by('-feed_allocation_id')
     feed_rows = []
-    feed_total = 0
-    for a in feed_qs:
-        price = getattr(a.feed_stock, 'selling_price', 0) or 0
-        amount = int(a.bags_allocated or 0) * int(price)
-        feed_total += amount
+    for line in feed_qs:
         feed_rows.append({
-            'feed_request_id': a.feed_request_id,
-            'req_id': a.chick_request.chick_request_id,
-            'farmer': a.chick_request.farmer.farmer_name,
-            'feed_name': a.feed_name,
-            'brand': a.feed_brand,
-            'bags': a.bags_allocated,
-            'unit_price': price,
-            'amount': amount,
-            'date': a.chick_request.request_date,
+            'feed_request_id': line.feed_allocation.feed_request_id,
+            'req_id': line.chick_request.chick_request_id,
+            'farmer': line.chick_request.farmer.farmer_name,
+            'feed_name': line.item,
+            'brand': line.feed_allocation.feed_brand,
+            'bags': line.quantity,
+            'unit_price': line.unit_price,
+            'amount': line.amount,
+            'date': line.sale_date,
         })
+    feed_total = sales_total(feed_qs)
 
-    # Chick sales rows: approved chick requests with amount = qty * price (latest for type/breed)
-    chick_qs = ChickRequest.objects.filter(status='approved').select_related('farmer').order_by('-request_date')
-    if start_date:
-        chick_qs = chick_qs.filter(request_date__date__gte=start_date)
-    if end_date:
-        chick_qs = chick_qs.filter(request_date__date__lte=end_date)
+    # Chick sales rows: ledger lines priced at approval (qty * price)
+    chick_qs = sale_lines(start_date, end_date, kind='chick').select_related('chick_request__farmer').order_by('-sale_date')
     chick_rows = []
-    chick_total = 0
-    for r in chick_qs:
-        price = ChickStock.objects.filter(
-            chick_type=r.chick_type,
-            chick_breed=r.chick_breed
-        ).order_by('-updated_at').values_list('chick_price', flat=True).first() or 1650
-        amount = int(r.quantity or 0) * int(price)
-        chick_total += amount
+    for line in chick_qs:
         chick_rows.append({
-            'req_id': r.chick_request_id,
-            'farmer': r.farmer.farmer_name,
-            'type': r.chick_type,
-            'breed': r.chick_breed,
-            'qty': r.quantity,
-            'unit_price': price,
-            'amount': amount,
-            'date': r.request_date,
+            'req_id': line.chick_request.chick_request_id,
+            'farmer': line.chick_request.farmer.farmer_name,
+            'type': line.chick_request.chick_type,
+            'breed': line.chick_request.chick_breed,
+            'qty': line.quantity,
+            'unit_price': line.unit_price,
+            'amount': line.amount,
+            'date': line.sale_date,
         })
+    chick_total = sales_total(chick_qs)
 
     total_sales = feed_total + chick_total
 
@@ -978,27 +788,20 @@ def ApproveFeedRequest(request, request_id):
                 messages.error(request, 'Invalid action.')
                 return redirect('Viewfeedrequests')
 
+            if action == 'approve':
+                _, error = approve_feed_allocation(feed_allocation.pk)
+                if error:
+                    messages.error(request, error)
+                else:
+                    messages.success(request, 'Feed request approved successfully!')
+                return redirect('Viewfeedrequests')
+
             with transaction.atomic():
-                if action == 'approve':
-                    # Ensure linked stock and enough quantity
-                    stock = feed_allocation.feed_stock
-                    bags = int(feed_allocation.bags_allocated or 0)
-                    if stock and (stock.feed_quantity or 0) >= bags:
-                        # Deduct inventory
-                        stock.feed_quantity = (stock.feed_quantity or 0) - bags
-                        stock.save(update_fields=['feed_quantity'])
-                        # Update allocation status only (do not force payment status)
-                        feed_allocation.status = 'approved'
-                        feed_allocation.save(update_fields=['status'])
-                        messages.success(request, 'Feed request approved successfully!')
-                    else:
-                        messages.error(request, 'Insufficient stock to approve this request.')
-                        return redirect('Viewfeedrequests')
-                else:  # reject
-                    feed_allocation.status = 'rejected'
-                    feed_allocation.payment_status = 'rejected'
-                    feed_allocation.save(update_fields=['status', 'payment_status'])
-                    messages.success(request, 'Feed request rejected successfully!')
+                feed_allocation.status = 'rejected'
+                feed_allocation.payment_status = 'rejected'
+                feed_allocation.save(update_fields=['status', 'payment_status'])
+                clear_feed_sale(feed_allocation)
+            messages.success(request, 'Feed request rejected successfully!')
 
         return redirect('Viewfeedrequests')
 
@@ -1039,17 +842,14 @@ def ViewSalesAgentFarmers(request):
     # Include both new linkage via sales_agent and legacy via registered_by username
     base_qs = Customer.objects.filter(
         Q(sales_agent=request.user) | Q(registered_by=request.user.username)
-    ).select_related('sales_agent').order_by('-registration_date')
+    ).select_related('sales_agent')
 
     search_query = request.GET.get('q', '').strip()
     if search_query:
-        base_qs = base_qs.filter(
-            Q(farmer_name__icontains=search_query) |
-            Q(phone_number__icontains=search_query) |
-            Q(farmer_id__icontains=search_query)
-        )
+        base_qs = search_filter(base_qs, 'farmer', search_query)
 
-    return render(request, '1viewfarmers.html', {'farmers': base_qs})
+    page = keyset_paginate(request, base_qs, ('registration_date', 'id'))
+    return render(request, '1viewfarmers.html', {'farmers': page, 'page': page})
 
 @role_required('sales_agent')
 def EditFarmer(request, farmer_id):
@@ -1224,17 +1024,14 @@ def AddChickRequest(request):
         chick_request__created_by=request.user,
         status='approved'
     ).order_by('-id')
-    # Build stock counts for dynamic breed display
-    def count_for(t, b):
-        return sum(s.stock_quantity or 0 for s in ChickStock.objects.filter(chick_type=t, chick_breed=b))
-    stock_counts = {
-        'layer': {'local': count_for('layer', 'local'), 'exotic': count_for('layer', 'exotic')},
-        'broiler': {'local': count_for('broiler', 'local'), 'exotic': count_for('broiler', 'exotic')},
-    }
+    # Stock counts for dynamic breed display, kept current by live stock events
+    live_cursor = live.cursor()
+    stock_counts = chick_levels()
     return render(request, '1addChickRequests.html', {
         'farmers': farmers,
         'approved_feeds': approved_feeds,
         'stock_counts': stock_counts,
+        'live_cursor': live_cursor,
     })
 
 @role_required('sales_agent')
@@ -1275,13 +1072,15 @@ def AddFeedRequest(request):
 
 @role_required('sales_agent')
 def ViewSalesAgentChickRequests(request):
-    my_requests = ChickRequest.objects.filter(created_by=request.user).select_related('farmer').order_by('-request_date')
-    return render(request, '1viewchickrequests.html', {'chick_requests': my_requests})
+    my_requests = ChickRequest.objects.filter(created_by=request.user).select_related('farmer')
+    page = keyset_paginate(request, my_requests, ('request_date', 'id'))
+    return render(request, '1viewchickrequests.html', {'chick_requests': page, 'page': page})
 
 @role_required('sales_agent')
 def ViewSalesAgentFeedRequests(request):
-    my_feed = FeedAllocation.objects.filter(chick_request__created_by=request.user).select_related('chick_request', 'chick_request__farmer', 'feed_stock').order_by('-id')
-    return render(request, '1viewfeedrequests.html', {'allocations': my_feed})
+    my_feed = FeedAllocation.objects.filter(chick_request__created_by=request.user).select_related('chick_request', 'chick_request__farmer', 'feed_stock')
+    page = keyset_paginate(request, my_feed, ('id',))
+    return render(request, '1viewfeedrequests.html', {'allocations': page, 'page': page})
 
 
 @role_required('manager')
@@ -1294,110 +1093,112 @@ def ApproveChickRequest(request, request_id: int):
             messages.error(request, 'Invalid action.')
             return redirect('Viewchickrequests')
         if action == 'reject':
-            req.status = 'rejected'
-            req.save(update_fields=['status'])
+            with transaction.atomic():
+                req.status = 'rejected'
+                req.save(update_fields=['status'])
+                clear_chick_sale(req)
             messages.success(request, 'Chick request rejected successfully!')
             return redirect('Viewchickrequests')
-        # approve
-        with transaction.atomic():
-            # Sum available stock for the requested type/breed
-            stocks = list(ChickStock.objects.select_for_update().filter(
-                chick_type=req.chick_type,
-                chick_breed=req.chick_breed
-            ).order_by('-stock_quantity'))
-            needed = int(req.quantity or 0)
-            available = sum(s.stock_quantity or 0 for s in stocks)
-            if available < needed:
-                messages.error(request, 'Insufficient chick stock for the requested type/breed.')
-                return redirect('Viewchickrequests')
-            remaining = needed
-            for s in stocks:
-                if remaining <= 0:
-                    break
-                take = min(remaining, s.stock_quantity or 0)
-                s.stock_quantity = (s.stock_quantity or 0) - take
-                s.save(update_fields=['stock_quantity'])
-                remaining -= take
-            req.status = 'approved'
-            req.approved_on = timezone.now()
-            req.save(update_fields=['status', 'approved_on'])
+        # approve: conditional stock decrements, no row locks (see approvals.py)
+        approved, failures = approve_chick_requests([req.pk])
+        if approved:
             messages.success(request, 'Chick request approved and stock updated!')
+        else:
+            messages.error(request, failures.get(req.pk, 'Insufficient chick stock for the requested type/breed.'))
+    return redirect('Viewchickrequests')
+
+
+@role_required('manager')
+def BatchApproveChickRequests(request):
+    """Approve the selected chick requests in one pass; unfilled requests are reported back."""
+    if request.method != 'POST':
+        return redirect('Viewchickrequests')
+    ids = [i for i in request.POST.getlist('request_ids') if i.isdigit()]
+    if not ids:
+        messages.error(request, 'Select at least one request to approve.')
+        return redirect('Viewchickrequests')
+    approved, failures = approve_chick_requests(ids)
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'approved': [r.pk for r in approved],
+            'failed': [{'id': pk, 'reason': reason} for pk, reason in sorted(failures.items())],
+        })
+    if approved:
+        messages.success(request, f'{len(approved)} chick request(s) approved and stock updated!')
+    labels = dict(ChickRequest.objects.filter(pk__in=failures).values_list('pk', 'chick_request_id'))
+    for pk, reason in sorted(failures.items()):
+        messages.error(request, f'{labels.get(pk, pk)}: {reason}')
     return redirect('Viewchickrequests')
 
 
 # --- TXT Export endpoints (manager) ---
+# Streamed in chunks from values_list iterators so memory stays flat regardless of table size
 @role_required('manager')
+@use_replica
 def export_sales_txt(request):
-    # Build combined sales export from approved feed allocations and chick requests
-    lines = ['TYPE\tREQ_ID\tFARMER\tITEM\tQTY/BAGS\tUNIT_PRICE\tAMOUNT\tDATE\n']
-    # Feed
-    for a in FeedAllocation.objects.filter(status='approved').select_related('chick_request__farmer', 'feed_stock').order_by('id'):
-        price = getattr(a.feed_stock, 'selling_price', 0) or 0
-        amount = int(a.bags_allocated or 0) * int(price)
-        lines.append(f"FEED\t{a.chick_request.chick_request_id}\t{a.chick_request.farmer.farmer_name}\t{a.feed_name}\t{a.bags_allocated}\t{price}\t{amount}\t{a.chick_request.request_date.date()}\n")
-    # Chicks
-    for r in ChickRequest.objects.filter(status='approved').select_related('farmer').order_by('request_date'):
-        price = ChickStock.objects.filter(chick_type=r.chick_type, chick_breed=r.chick_breed).order_by('-updated_at').values_list('chick_price', flat=True).first() or 1650
-        amount = int(r.quantity or 0) * int(price)
-        lines.append(f"CHICKS\t{r.chick_request_id}\t{r.farmer.farmer_name}\t{r.chick_type}/{r.chick_breed}\t{r.quantity}\t{price}\t{amount}\t{r.request_date.date()}\n")
-    resp = HttpResponse(''.join(lines), content_type='text/plain')
-    resp['Content-Disposition'] = 'attachment; filename="sales.txt"'
-    return resp
+    # Build combined sales export from the sales ledger (feed lines, then chick lines)
+    def rows():
+        fields = ('chick_request__chick_request_id', 'chick_request__farmer__farmer_name', 'item', 'quantity', 'unit_price', 'amount', 'sale_date')
+        for label, kind, order in (('FEED', 'feed', 'feed_allocation_id'), ('CHICKS', 'chick', 'sale_date')):
+            for *vals, sale_date in stream_rows(sale_lines(kind=kind).order_by(order), *fields):
+                yield [label, *vals, sale_date.date()]
+    lines = chain(['TYPE\tREQ_ID\tFARMER\tITEM\tQTY/BAGS\tUNIT_PRICE\tAMOUNT\tDATE\n'], tsv_lines(rows()))
+    return streaming_attachment(lines, 'sales.txt')
 
 @role_required('manager')
+@use_replica
 def export_chick_requests_txt(request):
     header = 'REQ_ID\tFARMER\tTYPE\tBREED\tQTY\tSTATUS\tDATE\n'
-    rows = [
-        f"{r.chick_request_id}\t{r.farmer.farmer_name}\t{r.chick_type}\t{r.chick_breed}\t{r.quantity}\t{r.status}\t{r.request_date.date()}\n"
-        for r in ChickRequest.objects.select_related('farmer').order_by('request_date')
-    ]
-    resp = HttpResponse(header + ''.join(rows), content_type='text/plain')
-    resp['Content-Disposition'] = 'attachment; filename="chick_requests.txt"'
-    return resp
+    rows = (
+        [*vals, request_date.date()]
+        for *vals, request_date in stream_rows(
+            ChickRequest.objects.order_by('request_date'),
+            'chick_request_id', 'farmer__farmer_name', 'chick_type', 'chick_breed', 'quantity', 'status', 'request_date',
+        )
+    )
+    return streaming_attachment(chain([header], tsv_lines(rows)), 'chick_requests.txt')
 
 @role_required('manager')
+@use_replica
 def export_feed_allocations_txt(request):
     header = 'FEED_ID\tREQ_ID\tFEED\tBAGS\tSTATUS\tPAYMENT\n'
-    rows = [
-        f"{a.feed_request_id}\t{a.chick_request.chick_request_id}\t{a.feed_name}\t{a.bags_allocated}\t{a.status}\t{a.payment_status}\n"
-        for a in FeedAllocation.objects.select_related('chick_request').order_by('id')
-    ]
-    resp = HttpResponse(header + ''.join(rows), content_type='text/plain')
-    resp['Content-Disposition'] = 'attachment; filename="feed_allocations.txt"'
-    return resp
+    rows = stream_rows(
+        FeedAllocation.objects.order_by('id'),
+        'feed_request_id', 'chick_request__chick_request_id', 'feed_name', 'bags_allocated', 'status', 'payment_status',
+    )
+    return streaming_attachment(chain([header], tsv_lines(rows)), 'feed_allocations.txt')
 
 @role_required('manager')
+@use_replica
+@updated_at_condition(ChickStock)
 def export_chick_stock_txt(request):
     header = 'BATCH\tTYPE\tBREED\tAGE\tPRICE\tQTY\n'
-    rows = [
-        f"{s.batch_name}\t{s.chick_type}\t{s.chick_breed}\t{s.chick_age}\t{s.chick_price}\t{s.stock_quantity}\n"
-        for s in ChickStock.objects.order_by('batch_name')
-    ]
-    resp = HttpResponse(header + ''.join(rows), content_type='text/plain')
-    resp['Content-Disposition'] = 'attachment; filename="chick_stock.txt"'
-    return resp
+    rows = stream_rows(
+        ChickStock.objects.order_by('batch_name'),
+        'batch_name', 'chick_type', 'chick_breed', 'chick_age', 'chick_price', 'stock_quantity',
+    )
+    return streaming_attachment(chain([header], tsv_lines(rows)), 'chick_stock.txt')
 
 @role_required('manager')
+@use_replica
+@updated_at_condition(FeedStock)
 def export_feed_stock_txt(request):
     header = 'STOCK\tFEED\tTYPE\tBRAND\tQTY\tPRICE\n'
-    rows = [
-        f"{s.stock_name}\t{s.feed_name}\t{s.feed_type}\t{s.feed_brand}\t{s.feed_quantity}\t{s.selling_price}\n"
-        for s in FeedStock.objects.order_by('stock_name')
-    ]
-    resp = HttpResponse(header + ''.join(rows), content_type='text/plain')
-    resp['Content-Disposition'] = 'attachment; filename="feed_stock.txt"'
-    return resp
+    rows = stream_rows(
+        FeedStock.objects.order_by('stock_name'),
+        'stock_name', 'feed_name', 'feed_type', 'feed_brand', 'feed_quantity', 'selling_price',
+    )
+    return streaming_attachment(chain([header], tsv_lines(rows)), 'feed_stock.txt')
 
 @role_required('manager')
+@use_replica
 def export_farmers_txt(request):
     header = 'FARMER_ID\tNAME\tGENDER\tAGE\tPHONE\tLOCATION\n'
-    rows = [
-        f"{c.farmer_id}\t{c.farmer_name}\t{c.gender}\t{c.age}\t{c.phone_number}\t{c.location}\n"
-        for c in Customer.objects.order_by('farmer_id')
-    ]
-    resp = HttpResponse(header + ''.join(rows), content_type='text/plain')
-    resp['Content-Disposition'] = 'attachment; filename="farmers.txt"'
-    return resp
+    rows = stream_rows(
+        Customer.objects.order_by('farmer_id'),
+        'farmer_id', 'farmer_name', 'gender', 'age', 'phone_number', 'location',
+    )
+    return streaming_attachment(chain([header], tsv_lines(rows)), 'farmers.txt')
 
 
 def Logout(request):
@@ -1420,8 +1221,13 @@ def Logout(request):
 # --- Deliveries Management (manager) ---
 @role_required('manager')
 def Deliveries(request):
-    approved_chicks = ChickRequest.objects.filter(status='approved').select_related('farmer').order_by('-approved_on')
-    approved_feeds = FeedAllocation.objects.filter(status='approved').select_related('chick_request__farmer').order_by('-id')
+    # Two independently paged lists; cursors are namespaced by prefix
+    approved_chicks = keyset_paginate(
+        request, ChickRequest.objects.filter(status='approved').select_related('farmer'), ('request_date', 'id'), prefix='chicks_',
+    )
+    approved_feeds = keyset_paginate(
+        request, FeedAllocation.objects.filter(status='approved').select_related('chick_request__farmer'), ('id',), prefix='feeds_',
+    )
     return render(request, 'deliveries.html', {
         'approved_chicks': approved_chicks,
         'approved_feeds': approved_feeds,
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,6 +49,8 @@ AUTH_USER_MODEL = 'ChicksApp.UserProfile'
 LOGIN_URL = '/login/'
 
 MIDDLEWARE = [
+    # First, so it times and counts the queries of every other middleware too
+    'ChicksApp.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,17 +82,126 @@ TEMPLATES = [
 STATIC_URL = '/static/'  # ensure leading slash so {% static %} builds absolute path
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+# Generated XLSX/PDF report files (written by `manage.py run_export_worker`)
+EXPORT_ROOT = BASE_DIR / 'exports'
+
+# The 'reports' cache holds computed Reports pages (ChicksApp.report_cache). LocMemCache evicts
+# least-recently-used entries beyond MAX_ENTRIES and expires them after TIMEOUT seconds.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reports': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'reports',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 100},
+    },
+}
+
+# Per-request SQL/timing instrumentation (ChicksApp.middleware); slow requests are logged to ChicksApp.perf
+QUERY_INSTRUMENTATION = {
+    'SAMPLE_RATE': 1.0,
+    'SLOW_REQUEST_MS': 500,
+    'MAX_QUERIES': 50,
+    'TOP_FINGERPRINTS': 3,
+}
+
 WSGI_APPLICATION = 'XChicks.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite unless XCHICKS_DB_ENGINE=postgresql. For PostgreSQL, either keep connections open across
+# requests (XCHICKS_DB_CONN_MAX_AGE seconds, checked before reuse) or, with XCHICKS_DB_POOL=1, borrow
+# them from a psycopg pool (needs `psycopg[pool]`; Django requires CONN_MAX_AGE=0 when pooling).
+DB_ENGINE = os.environ.get('XCHICKS_DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    DB_POOL = os.environ.get('XCHICKS_DB_POOL', '0') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('XCHICKS_DB_NAME', 'xchicks'),
+            'USER': os.environ.get('XCHICKS_DB_USER', 'xchicks'),
+            'PASSWORD': os.environ.get('XCHICKS_DB_PASSWORD', ''),
+            'HOST': os.environ.get('XCHICKS_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('XCHICKS_DB_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('XCHICKS_DB_CONN_MAX_AGE', '600')),
+            'CONN_HEALTH_CHECKS': not DB_POOL,
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('XCHICKS_DB_CONNECT_TIMEOUT', '5')),
+            },
+        }
+    }
+    if DB_POOL:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('XCHICKS_DB_POOL_MIN', '2')),
+            'max_size': int(os.environ.get('XCHICKS_DB_POOL_MAX', '10')),
+            # Seconds a request waits for a free connection before failing
+            'timeout': int(os.environ.get('XCHICKS_DB_POOL_TIMEOUT', '10')),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('XCHICKS_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so busy_timeout applies instead of
+                # failing immediately when a read transaction tries to upgrade to a write
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
+
+# Optional read replica for the report/export views (ChicksApp.routers.use_replica): a second SQLite
+# file refreshed by `manage.py sync_replica` (XCHICKS_REPLICA_NAME), or a PostgreSQL standby
+# (XCHICKS_REPLICA_HOST, same credentials as the primary). Tests mirror it onto the default database.
+if os.environ.get('XCHICKS_REPLICA_NAME') or os.environ.get('XCHICKS_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('XCHICKS_REPLICA_NAME', DATABASES['default']['NAME']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DB_ENGINE == 'postgresql':
+        DATABASES['replica']['HOST'] = os.environ.get('XCHICKS_REPLICA_HOST', DATABASES['default']['HOST'])
+        DATABASES['replica']['PORT'] = os.environ.get('XCHICKS_REPLICA_PORT', DATABASES['default']['PORT'])
+
+DATABASE_ROUTERS = ['ChicksApp.routers.ReplicaRouter']
+
+READ_REPLICA = {
+    'ALIAS': 'replica',
+    'MAX_LAG_SECONDS': 30,
+    'CHECK_INTERVAL': 5,
+}
+
+# Thread pool for the concurrent queries of the async dashboard/Reports views (ChicksApp.parallel_queries).
+# Each worker holds its own database connections, so keep MAX_WORKERS within the database's limits.
+PARALLEL_QUERIES = {
+    'MAX_WORKERS': 8,
+    'TIMEOUT': 5.0,
+}
+
+# Live updates for the manager pages (ChicksApp.live), streamed from the ASGI app. With more than one
+# worker process set XCHICKS_LIVE_BROADCASTER=ChicksApp.live.DatabaseBroadcaster so every worker's
+# streams see every write.
+LIVE_EVENTS = {
+    'BROADCASTER': os.environ.get('XCHICKS_LIVE_BROADCASTER', 'ChicksApp.live.LocalBroadcaster'),
+    'KEEPALIVE': 15,
+    'POLL_INTERVAL': 1.0,
+}
+
+# Pragmas for every SQLite connection (ChicksApp.sqlite_tuning); None drops a default.
+# Run `manage.py sqlite_maintenance` regularly (e.g. nightly from cron) for ANALYZE, WAL checkpoints
+# and incremental vacuum.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
 }
 
 
@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include 
 from ChicksApp.views import * 
-from ChicksApp import views
+from ChicksApp import api, views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -33,9 +33,14 @@ urlpatterns = [
     path('managersdashboard/', views.Managersdashboard, name='Managersdashboard'),
     path('chickrequests/', views.ViewChickRequests, name='Viewchickrequests'),
     path('feedrequests/', views.ViewFeedRequests, name='Viewfeedrequests'),
+    path('chickrequests/rows/', views.ChickRequestRows, name='Chickrequestrows'),
+    path('feedrequests/rows/', views.FeedRequestRows, name='Feedrequestrows'),
+    path('live/events/', views.live_events, name='live_events'),
     path('approvechickrequest/<int:request_id>/', views.ApproveChickRequest, name='Approvechickrequest'),
+    path('approvechickrequests/batch/', views.BatchApproveChickRequests, name='Batchapprovechickrequests'),
     path('farmerreview/', views.FarmerReview, name='Farmerreview'),
     path('farmerrecords/', views.FarmerRecords, name='Farmerrecords'),
+    path('farmerrecords/import/', views.ImportFarmers, name='Importfarmers'),
     path('chickstock/', views.chickStock, name='Chickstock'),
     path('feedstock/', views.feedStock, name='Feedstock'),
     path('updatechickstock/', views.UpdateChickStock, name='Updatechickstock'),
@@ -44,7 +49,10 @@ urlpatterns = [
     path('updatefeedstock/<int:stock_id>/', views.UpdateFeedStock, name='Updatefeedstock_edit'),
     path('approvefeedrequest/<int:request_id>/', views.ApproveFeedRequest, name='Approvefeedrequest'),
     path('reports/', views.Reports, name='Reports'),
+    path('reports/cache-stats/', views.ReportsCacheStats, name='reports_cache_stats'),
     path('reports/export', views.reports_export, name='reports_export'),
+    path('reports/export/jobs/<uuid:job_id>/', views.ExportJobStatus, name='export_job'),
+    path('reports/export/jobs/<uuid:job_id>/download/', views.ExportJobDownload, name='export_job_download'),
     path('sales/', views.Sales, name='Sales'),
     path('deliveries/', views.Deliveries, name='Deliveries'),
     path('deliveries/mark/chick/<int:req_id>/', views.MarkChickDelivered, name='mark_chick_delivered'),
@@ -67,4 +75,10 @@ urlpatterns = [
     path('salesagentfarmers/', views.ViewSalesAgentFarmers, name='salesagentfarmers'),
     path('editfarmer/<int:farmer_id>/', views.EditFarmer, name='edit_farmer'),
     path('deletefarmer/<int:farmer_id>/', views.DeleteFarmer, name='delete_farmer'),
+
+    # JSON API for sales-agent clients (ChicksApp/api.py)
+    path('api/v1/chick-requests/', api.chick_requests, name='api_chick_requests'),
+    path('api/v1/feed-requests/', api.feed_requests, name='api_feed_requests'),
+    path('api/v1/farmers/', api.farmers, name='api_farmers'),
+    path('api/v1/chick-request-form/', api.chick_request_form, name='api_chick_request_form'),
 ]